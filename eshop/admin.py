@@ -1,42 +1,245 @@
-from django.contrib import admin
-from .models import Client, Category, Product, Review, Order, OrderItem, Profile
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin.helpers import ActionForm
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Round
+from django.utils import timezone
 
+from .cache import bump_catalogue_version
+from .models import (Client, Category, Product, Review, Order, OrderItem, Profile, OutgoingEmail, Cart,
+                     StockReservation, ImageDerivativeJob)
+from .pagination import CappedCountPaginator
 
-class ProductAdmin(admin.ModelAdmin):
+
+class RangeListFilter(admin.SimpleListFilter):
+    """
+    Filtras pagal iš anksto nustatytus reikšmių intervalus. Skirtingai nei
+    filtras pagal lauką, jis nerenka visų skirtingų reikšmių iš lentelės.
+    Intervalai aprašomi (raktas, pavadinimas, nuo, iki) įrašais, kur
+    'iki' neįskaičiuojamas, o None reiškia, kad ribos nėra.
+    """
+    field = None
+    ranges = ()
+
+    def lookups(self, request, model_admin):
+        return [(key, label) for key, label, _, _ in self.ranges]
+
+    def queryset(self, request, queryset):
+        for key, _, lower, upper in self.ranges:
+            if self.value() == key:
+                if lower is not None:
+                    queryset = queryset.filter(**{f'{self.field}__gte': lower})
+                if upper is not None:
+                    queryset = queryset.filter(**{f'{self.field}__lt': upper})
+                return queryset
+        return queryset
+
+
+class StockFilter(RangeListFilter):
+    title = 'stock quantity'
+    parameter_name = 'stock'
+    field = 'stock_quantity'
+    ranges = (
+        ('out', 'Out of stock', None, 1),
+        ('low', '1-10', 1, 11),
+        ('medium', '11-100', 11, 101),
+        ('high', 'More than 100', 101, None),
+    )
+
+
+class PriceFilter(RangeListFilter):
+    title = 'price'
+    parameter_name = 'price'
+    field = 'one_price'
+    ranges = (
+        ('0-10', 'Under 10', None, 10),
+        ('10-50', '10-50', 10, 50),
+        ('50-100', '50-100', 50, 100),
+        ('100+', '100 and more', 100, None),
+    )
+
+
+class ProductActionForm(ActionForm):
+    amount = forms.FloatField(required=False, help_text='Used by price and stock actions')
+
+
+class ScalableAdmin(admin.ModelAdmin):
+    """
+    Bendri nustatymai didelėms lentelėms: rezultatų skaičius ribojamas
+    CappedCountPaginator, o bendras eilučių skaičius neskaičiuojamas.
+    """
+    paginator = CappedCountPaginator
+    show_full_result_count = False
+
+
+class ProductAdmin(ScalableAdmin):
     """
     Django administratoriaus sąsajos konfigūracija produktams:
     rodoma produkto ID, pavadinimas, kaina ir sandėlio kiekis,
-    galimybė redaguoti kainą ir kiekį, filtruoti pagal sandėlio kiekį
-    ir ieškoti pagal produkto pavadinimą.
+    galimybė redaguoti kainą ir kiekį, filtruoti pagal sandėlio kiekio ir
+    kainos intervalus, ieškoti pagal pavadinimą ar SKU bei keisti kelių
+    produktų kainas ir kiekius vienu veiksmu.
     """
-    list_display = ('id', 'name', 'one_price', 'stock_quantity')
+    list_display = ('id', 'name', 'sku', 'categories', 'one_price', 'stock_quantity')
     list_editable = ('one_price', 'stock_quantity')
-    list_filter = ('stock_quantity',)
-    search_fields = ('product__name',)
+    list_filter = (StockFilter, PriceFilter)
+    list_select_related = ('categories',)
+    search_fields = ('name', '=sku')
+    autocomplete_fields = ('categories',)
+    action_form = ProductActionForm
+    actions = ('change_price_by_percent', 'add_stock', 'set_stock')
+
+    def get_amount(self, request):
+        try:
+            return float(request.POST['amount'])
+        except (KeyError, ValueError):
+            self.message_user(request, 'Enter an amount for this action.', messages.ERROR)
+            return None
+
+    def bulk_update(self, request, queryset, **values):
+        updated = queryset.update(updated_date=timezone.now(), **values)
+        transaction.on_commit(bump_catalogue_version)
+        self.message_user(request, f'{updated} products updated.')
+
+    @admin.action(description='Change price by amount (percent)')
+    def change_price_by_percent(self, request, queryset):
+        amount = self.get_amount(request)
+        if amount is not None:
+            if amount <= -100:
+                self.message_user(request, 'Price cannot be reduced by 100% or more.', messages.ERROR)
+                return
+            self.bulk_update(request, queryset, one_price=Round(F('one_price') * (1 + amount / 100), 2))
+
+    @admin.action(description='Add amount to stock quantity')
+    def add_stock(self, request, queryset):
+        amount = self.get_amount(request)
+        if amount is not None:
+            self.bulk_update(request, queryset.filter(stock_quantity__gte=-int(amount)),
+                             stock_quantity=F('stock_quantity') + int(amount))
 
+    @admin.action(description='Set stock quantity to amount')
+    def set_stock(self, request, queryset):
+        amount = self.get_amount(request)
+        if amount is not None:
+            if amount < 0:
+                self.message_user(request, 'Stock quantity cannot be negative.', messages.ERROR)
+                return
+            self.bulk_update(request, queryset, stock_quantity=int(amount))
 
-class ClientAdmin(admin.ModelAdmin):
+
+class CategoryAdmin(admin.ModelAdmin):
+    """
+    Django administratoriaus sąsajos konfigūracija kategorijoms:
+    paieška pagal pavadinimą naudojama ir produktų formos automatiniam
+    užbaigimui.
+    """
+    list_display = ('id', 'name')
+    search_fields = ('name',)
+
+
+class ClientAdmin(ScalableAdmin):
     """
     Django administratoriaus sąsajos konfigūracija klientams:
     rodoma kliento vardas, pavardė ir susijęs vartotojas.
     """
     list_display = ('first_name', 'last_name', 'user')
+    list_select_related = ('user',)
+    search_fields = ('first_name', 'last_name', 'user__username', 'user__email')
+    autocomplete_fields = ('user',)
+
 
+class OrderAdmin(ScalableAdmin):
+    """
+    Django administratoriaus sąsajos konfigūracija užsakymams:
+    rodomas užsakymas, klientas, būsena ir data, galimybė filtruoti
+    pagal būseną.
+    """
+    list_display = ('id', 'clients', 'status', 'created_date', 'item_count', 'total')
+    list_filter = ('status',)
+    list_select_related = ('clients__user',)
+    search_fields = ('=id', 'clients__user__email')
+    autocomplete_fields = ('clients',)
 
-class OrderItemsAdmin(admin.ModelAdmin):
+
+class OrderItemsAdmin(ScalableAdmin):
     """
     Django administratoriaus sąsajos konfigūracija užsakymo prekėms:
     rodoma prekė, jos kiekis ir susijęs užsakymas, galimybė filtruoti
-    pagal užsakymo kliento informaciją.
+    pagal užsakymo būseną.
+    """
+    list_display = ('products', 'quantity', 'unit_price', 'orders')
+    list_filter = ('orders__status',)
+    list_select_related = ('products', 'orders__clients__user')
+    autocomplete_fields = ('products', 'orders')
+
+
+class ReviewAdmin(ScalableAdmin):
+    """
+    Django administratoriaus sąsajos konfigūracija atsiliepimams:
+    rodomas produktas, klientas, įvertinimas ir data.
+    """
+    list_display = ('products', 'clients', 'rating', 'created_date')
+    list_select_related = ('products', 'clients__user')
+    autocomplete_fields = ('products', 'clients')
+
+
+class ProfileAdmin(ScalableAdmin):
+    """
+    Django administratoriaus sąsajos konfigūracija vartotojų profiliams.
+    """
+    list_display = ('user', 'picture')
+    list_select_related = ('user',)
+    autocomplete_fields = ('user',)
+
+
+class OutgoingEmailAdmin(ScalableAdmin):
+    """
+    Django administratoriaus sąsajos konfigūracija el. laiškų eilei:
+    rodoma laiško tema, gavėjai, būsena ir bandymų skaičius, galimybė
+    filtruoti pagal būseną.
+    """
+    list_display = ('subject', 'recipients', 'status', 'attempts', 'next_attempt_date', 'sent_date')
+    list_filter = ('status',)
+
+
+class ImageDerivativeJobAdmin(ScalableAdmin):
+    """
+    Django administratoriaus sąsajos konfigūracija paveikslėlių kopijų
+    užduotims: rodoma būsena, bandymų skaičius ir paskutinė klaida.
+    """
+    list_display = ('name', 'status', 'attempts', 'next_attempt_date', 'last_error')
+    list_filter = ('status',)
+
+
+class CartAdmin(ScalableAdmin):
+    """
+    Django administratoriaus sąsajos konfigūracija krepšeliams.
+    """
+    list_display = ('id', 'user', 'updated_date')
+    list_select_related = ('user',)
+    autocomplete_fields = ('user',)
+
+
+class StockReservationAdmin(ScalableAdmin):
+    """
+    Django administratoriaus sąsajos konfigūracija prekių rezervacijoms:
+    rodomas krepšelis, prekė, kiekis ir galiojimo laikas.
     """
-    list_display = ('products', 'quantity', 'orders')
-    list_filter = ('orders__clients',)
+    list_display = ('carts', 'products', 'quantity', 'expires_date')
+    list_select_related = ('carts', 'products')
+    autocomplete_fields = ('products',)
+    raw_id_fields = ('carts',)
 
 
 admin.site.register(Client, ClientAdmin)
-admin.site.register(Category)
+admin.site.register(Category, CategoryAdmin)
 admin.site.register(Product, ProductAdmin)
-admin.site.register(Review)
-admin.site.register(Order)
+admin.site.register(Review, ReviewAdmin)
+admin.site.register(Order, OrderAdmin)
 admin.site.register(OrderItem, OrderItemsAdmin)
-admin.site.register(Profile)
+admin.site.register(Profile, ProfileAdmin)
+admin.site.register(OutgoingEmail, OutgoingEmailAdmin)
+admin.site.register(ImageDerivativeJob, ImageDerivativeJobAdmin)
+admin.site.register(Cart, CartAdmin)
+admin.site.register(StockReservation, StockReservationAdmin)
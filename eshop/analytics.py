@@ -0,0 +1,148 @@
+from datetime import datetime, time, timedelta
+
+from django.db import connections, router
+from django.db.models import Count, F, Sum
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from .models import DailyCategorySales, DailyProductSales, OrderItem
+
+SOLD_STATUSES = ('Completed', 'Shipped')
+ROLLUP_BATCH_SIZE = 2000
+
+
+def is_sold(status):
+    return status in SOLD_STATUSES
+
+
+def _line_revenue():
+    return F('quantity') * Coalesce('unit_price', 'products__one_price')
+
+
+def _upsert_sql(model, key):
+    table = model._meta.db_table
+    return (
+        f'INSERT INTO {table} (date, {key}, units, revenue, order_count) VALUES (%s, %s, %s, %s, %s) '
+        f'ON CONFLICT (date, {key}) DO UPDATE SET '
+        f'units = {table}.units + excluded.units, '
+        f'revenue = {table}.revenue + excluded.revenue, '
+        f'order_count = {table}.order_count + excluded.order_count'
+    )
+
+
+def record_order_sales(order, sign=1):
+    """
+    Funkcija prideda (sign=1) arba atima (sign=-1) užsakymo eilutes iš
+    dienos suvestinių. Užsakymo eilutės sugrupuojamos viena užklausa, o
+    suvestinės atnaujinamos INSERT ... ON CONFLICT užklausomis, todėl
+    lygiagretūs atnaujinimai vienas kito neperrašo. Atimant pašalinamos
+    tuščios (be užsakymų) suvestinių eilutės.
+    """
+    lines = (OrderItem.objects.filter(orders=order)
+             .values('products_id', 'products__categories_id')
+             .annotate(units=Sum('quantity'), revenue=Sum(_line_revenue()))
+             .order_by())
+    connection = connections[router.db_for_write(DailyProductSales)]
+    date = connection.ops.adapt_datefield_value(timezone.localdate(order.created_date))
+
+    product_rows = []
+    categories = {}
+    for line in lines:
+        product_rows.append((date, line['products_id'], sign * line['units'], sign * line['revenue'], sign))
+        units, revenue = categories.get(line['products__categories_id'], (0, 0))
+        categories[line['products__categories_id']] = (units + line['units'], revenue + line['revenue'])
+    category_rows = [(date, category_id, sign * units, sign * revenue, sign)
+                     for category_id, (units, revenue) in categories.items()]
+
+    with connection.cursor() as cursor:
+        if product_rows:
+            cursor.executemany(_upsert_sql(DailyProductSales, 'products_id'), product_rows)
+        if category_rows:
+            cursor.executemany(_upsert_sql(DailyCategorySales, 'categories_id'), category_rows)
+    if sign < 0:
+        day = timezone.localdate(order.created_date)
+        DailyProductSales.objects.filter(date=day, order_count=0).delete()
+        DailyCategorySales.objects.filter(date=day, order_count=0).delete()
+
+
+def _date_bounds(date_from, date_to):
+    filters = {}
+    if date_from:
+        filters['orders__created_date__gte'] = timezone.make_aware(datetime.combine(date_from, time.min))
+    if date_to:
+        filters['orders__created_date__lt'] = timezone.make_aware(
+            datetime.combine(date_to + timedelta(days=1), time.min))
+    return filters
+
+
+def rebuild_sales_rollups(date_from=None, date_to=None, batch_size=ROLLUP_BATCH_SIZE):
+    """
+    Funkcija iš naujo apskaičiuoja dienos suvestines nurodytam datų
+    intervalui (None - be ribos): ištrina senas eilutes ir įrašo naujas,
+    sugrupuotas duomenų bazėje. Kviečiama transakcijos viduje. Grąžina
+    įrašytų prekių ir kategorijų eilučių skaičių.
+    """
+    dates = {}
+    if date_from:
+        dates['date__gte'] = date_from
+    if date_to:
+        dates['date__lte'] = date_to
+    DailyProductSales.objects.filter(**dates).delete()
+    DailyCategorySales.objects.filter(**dates).delete()
+
+    sold = (OrderItem.objects
+            .filter(orders__status__in=SOLD_STATUSES, **_date_bounds(date_from, date_to))
+            .annotate(date=TruncDate('orders__created_date')))
+    totals = dict(units=Sum('quantity'), revenue=Sum(_line_revenue()),
+                  order_count=Count('orders_id', distinct=True))
+    products = (sold.values('date', 'products_id').annotate(**totals).order_by()
+                .iterator(chunk_size=batch_size))
+    categories = (sold.values('date', 'products__categories_id').annotate(**totals).order_by()
+                  .iterator(chunk_size=batch_size))
+
+    product_rows = _write_rows(DailyProductSales, (
+        DailyProductSales(date=row['date'], products_id=row['products_id'], units=row['units'],
+                          revenue=row['revenue'], order_count=row['order_count'])
+        for row in products
+    ), batch_size)
+    category_rows = _write_rows(DailyCategorySales, (
+        DailyCategorySales(date=row['date'], categories_id=row['products__categories_id'], units=row['units'],
+                           revenue=row['revenue'], order_count=row['order_count'])
+        for row in categories
+    ), batch_size)
+    return product_rows, category_rows
+
+
+def _write_rows(model, rows, batch_size):
+    written = 0
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == batch_size:
+            model.objects.bulk_create(batch)
+            written += len(batch)
+            batch = []
+    if batch:
+        model.objects.bulk_create(batch)
+        written += len(batch)
+    return written
+
+
+def sales_report(date_from, date_to, limit=10):
+    """
+    Funkcija grąžina ataskaitą iš dienos suvestinių: pardavimus kiekvieną
+    dieną ir populiariausias prekes bei kategorijas pagal pajamas.
+    Užsakymų eilutės neskaitomos.
+    """
+    totals = dict(units=Sum('units'), revenue=Sum('revenue'))
+    days = (DailyCategorySales.objects.filter(date__gte=date_from, date__lte=date_to)
+            .values('date').annotate(**totals).order_by('date'))
+    products = (DailyProductSales.objects.filter(date__gte=date_from, date__lte=date_to)
+                .values('products_id', 'products__name')
+                .annotate(order_count=Sum('order_count'), **totals)
+                .order_by('-revenue')[:limit])
+    categories = (DailyCategorySales.objects.filter(date__gte=date_from, date__lte=date_to)
+                  .values('categories_id', 'categories__name')
+                  .annotate(order_count=Sum('order_count'), **totals)
+                  .order_by('-revenue')[:limit])
+    return {'days': list(days), 'products': list(products), 'categories': list(categories)}
@@ -0,0 +1,147 @@
+from django.db.models import Count
+from django.shortcuts import get_object_or_404
+from rest_framework import status
+from rest_framework.authentication import SessionAuthentication
+from rest_framework.decorators import api_view, authentication_classes, permission_classes
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+
+from .cart import CartError, get_cart, apply_cart_operations, cart_lines, cart_total
+from .conditional import api_products_condition, api_categories_condition, api_product_condition
+from .models import Category, Product
+from .pagination import ApiCursorPagination
+from .serializers import (ProductSerializer, CategorySerializer, CartItemSerializer, CartItemInputSerializer,
+                          CartOperationsSerializer)
+
+
+class CsrfSessionAuthentication(SessionAuthentication):
+    """
+    Sesijos autentifikacija, kuri tikrina CSRF žetoną ir anoniminiams
+    vartotojams. Įprasta SessionAuthentication CSRF tikrina tik
+    prisijungusiems, todėl bet kuri svetainė galėtų keisti anonimo krepšelį.
+    """
+    def authenticate(self, request):
+        self.enforce_csrf(request)
+        user = getattr(request._request, 'user', None)
+        if not user or not user.is_active:
+            return None
+        return (user, None)
+
+
+def product_queryset(request):
+    """
+    Funkcija sudaro produktų užklausą tik su ?fields= prašomais laukais.
+    Kategorija prijungiama JOIN, tik kai reikia jos pavadinimo.
+    """
+    paths = ProductSerializer(context={'request': request}).model_fields()
+    queryset = Product.objects.only('id', *paths)
+    if any(path.startswith('categories__') for path in paths):
+        queryset = queryset.select_related('categories')
+    return queryset
+
+
+def paginated(request, queryset, serializer_class):
+    paginator = ApiCursorPagination()
+    page = paginator.paginate_queryset(queryset, request)
+    serializer = serializer_class(page, many=True, context={'request': request})
+    return paginator.get_paginated_response(serializer.data)
+
+
+@api_view(['GET'])
+@api_products_condition
+def products(request):
+    """
+    Produktų sąrašas, puslapiuojamas pagal raktą. Galima filtruoti pagal
+    kategoriją (?category=) ir pasirinkti laukus (?fields=id,name).
+    """
+    queryset = product_queryset(request)
+    category = request.query_params.get('category')
+    if category:
+        if not category.isdigit():
+            raise ValidationError({'category': 'Must be a category ID.'})
+        queryset = queryset.filter(categories_id=category)
+    return paginated(request, queryset, ProductSerializer)
+
+
+@api_view(['GET'])
+@api_product_condition
+def product_detail(request, pk):
+    """
+    Vieno produkto duomenys.
+    """
+    product = get_object_or_404(product_queryset(request), pk=pk)
+    return Response(ProductSerializer(product, context={'request': request}).data)
+
+
+@api_view(['GET'])
+@api_categories_condition
+def categories(request):
+    """
+    Kategorijų sąrašas su produktų skaičiumi, puslapiuojamas pagal raktą.
+    """
+    queryset = Category.objects.annotate(product_count=Count('products'))
+    return paginated(request, queryset, CategorySerializer)
+
+
+def cart_response(cart, request, status_code=status.HTTP_200_OK):
+    items = CartItemSerializer(cart_lines(cart), many=True, context={'request': request}).data
+    return Response({'items': items, 'count': len(items), 'total': cart_total(cart)}, status=status_code)
+
+
+def apply_operations(request, operations, status_code=status.HTTP_200_OK):
+    """
+    Pritaiko krepšelio operacijas ir grąžina atnaujintą krepšelį. Jei bent
+    viena operacija netinkama, grąžinama 400 klaida ir krepšelis nekeičiamas.
+    """
+    user_cart = get_cart(request, create=True)
+    try:
+        apply_cart_operations(user_cart, operations)
+    except CartError as error:
+        raise ValidationError({'operations': error.messages})
+    return cart_response(user_cart, request, status_code)
+
+
+@api_view(['GET', 'POST'])
+@authentication_classes([CsrfSessionAuthentication])
+@permission_classes([AllowAny])
+def cart(request):
+    """
+    GET grąžina krepšelio eilutes ir sumą. POST ({"product": ID,
+    "quantity": N}) prideda prekę į krepšelį, bet ne daugiau nei yra
+    sandėlyje.
+    """
+    if request.method == 'GET':
+        return cart_response(get_cart(request), request)
+
+    data = CartItemInputSerializer(data=request.data)
+    data.is_valid(raise_exception=True)
+    operation = {'product_id': data.validated_data['product'], 'quantity': data.validated_data['quantity']}
+    return apply_operations(request, [operation], status.HTTP_201_CREATED)
+
+
+@api_view(['POST'])
+@authentication_classes([CsrfSessionAuthentication])
+@permission_classes([AllowAny])
+def cart_operations(request):
+    """
+    Pritaiko kelias krepšelio operacijas viena užklausa:
+    {"operations": [{"product_id": 1, "quantity": 5, "op": "set"}, ...]}.
+    op gali būti "increment" (numatyta) arba "set".
+    """
+    data = CartOperationsSerializer(data=request.data)
+    data.is_valid(raise_exception=True)
+    return apply_operations(request, data.validated_data['operations'])
+
+
+@api_view(['DELETE'])
+@authentication_classes([CsrfSessionAuthentication])
+@permission_classes([AllowAny])
+def cart_item(request, product_id):
+    """
+    Pašalina prekę iš krepšelio.
+    """
+    user_cart = get_cart(request)
+    if user_cart is None or not user_cart.items.filter(products_id=product_id).exists():
+        return Response({'detail': 'Product is not in the cart.'}, status=status.HTTP_404_NOT_FOUND)
+    return apply_operations(request, [{'product_id': product_id, 'quantity': 0, 'op': 'set'}])
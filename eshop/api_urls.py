@@ -0,0 +1,11 @@
+from django.urls import path
+from . import api
+
+urlpatterns = [
+    path('products/', api.products, name='api_products'),
+    path('products/<int:pk>/', api.product_detail, name='api_product_detail'),
+    path('categories/', api.categories, name='api_categories'),
+    path('cart/', api.cart, name='api_cart'),
+    path('cart/operations/', api.cart_operations, name='api_cart_operations'),
+    path('cart/<int:product_id>/', api.cart_item, name='api_cart_item'),
+]
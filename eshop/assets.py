@@ -0,0 +1,210 @@
+import mimetypes
+import os
+import re
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.http import http_date, parse_etags
+from django.views.decorators.http import require_safe
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+REVALIDATE_CACHE_CONTROL = 'public, max-age=0, must-revalidate'
+HASHED_NAME = re.compile(r'\.[0-9a-f]{12}\.[^/.]+$')
+RANGE_CHUNK_SIZE = 64 * 1024
+
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+def _file_etag(stat):
+    return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+
+def _byte_range(header, size):
+    """
+    Funkcija išnagrinėja vieną baitų intervalą (bytes=pradžia-pabaiga,
+    bytes=pradžia- arba bytes=-ilgis). Grąžina (pradžia, pabaiga), None,
+    jei antraštės nepaisoma (keli arba netaisyklingi intervalai, pvz.
+    bytes=5-3), arba False, jei intervalas už failo ribų.
+    """
+    match = re.fullmatch(r'bytes=(\d*)-(\d*)', header.strip())
+    if not match or match.group(1) == match.group(2) == '':
+        return None
+    start, end = match.groups()
+    if start == '':
+        length = int(end)
+        if length == 0:
+            return False
+        return max(size - length, 0), size - 1
+    start = int(start)
+    if end and int(end) < start:
+        return None
+    if start >= size:
+        return False
+    return start, min(int(end), size - 1) if end else size - 1
+
+
+def _read_range(file, start, length):
+    with file:
+        file.seek(start)
+        while length > 0:
+            chunk = file.read(min(RANGE_CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def _accepted_encodings(header):
+    """
+    Funkcija išnagrinėja Accept-Encoding antraštę ir grąžina {kodavimas:
+    q reikšmė} žodyną. Netaisyklinga q reikšmė laikoma 0.
+    """
+    accepted = {}
+    for item in header.split(','):
+        coding, *parameters = [part.strip() for part in item.split(';')]
+        if not coding:
+            continue
+        quality = 1.0
+        for parameter in parameters:
+            name, _, value = parameter.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[coding.lower()] = quality
+    return accepted
+
+
+def _precompressed(request, path):
+    accepted = _accepted_encodings(request.headers.get('Accept-Encoding', ''))
+    for encoding, suffix in ENCODINGS:
+        if accepted.get(encoding, accepted.get('*', 0)) > 0:
+            variant = path.with_name(path.name + suffix)
+            if variant.is_file():
+                return encoding, variant
+    return None, path
+
+
+def _offload(path, location, response):
+    """
+    Perduoda failo siuntimą priekiniam serveriui: nginx gauna
+    X-Accel-Redirect su vidine vieta, Apache/lighttpd - X-Sendfile su
+    failo keliu. Range ir sąlyginius atsakus tada tvarko pats serveris.
+    """
+    backend = settings.ESHOP_SENDFILE['BACKEND']
+    if backend == 'x-accel-redirect':
+        response['X-Accel-Redirect'] = location
+    else:
+        response['X-Sendfile'] = str(path)
+    return response
+
+
+def serve_file(request, path, location, cache_control):
+    """
+    Funkcija grąžina failą su ETag, Last-Modified ir Cache-Control
+    antraštėmis. Palaikomi If-None-Match (304), vieno intervalo Range
+    (206) ir iš anksto suspausti .br/.gz variantai. Jei nustatytas
+    ESHOP_SENDFILE, failo turinį siunčia priekinis serveris.
+    """
+    content_type, encoding = mimetypes.guess_type(path.name)
+    content_type = content_type or 'application/octet-stream'
+    if settings.ESHOP_SENDFILE['BACKEND']:
+        response = HttpResponse(content_type=content_type)
+        response['Cache-Control'] = cache_control
+        return _offload(path, location, response)
+
+    content_encoding, source = (None, path) if encoding else _precompressed(request, path)
+    stat = source.stat()
+    etag = _file_etag(stat)
+    if content_encoding:
+        etag = f'{etag[:-1]}-{content_encoding}"'
+    headers = {
+        'ETag': etag,
+        'Last-Modified': http_date(stat.st_mtime),
+        'Cache-Control': cache_control,
+        'Vary': 'Accept-Encoding',
+        'Accept-Ranges': 'bytes',
+    }
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match and (if_none_match.strip() == '*' or etag in parse_etags(if_none_match)):
+        response = HttpResponseNotModified()
+        for header, value in headers.items():
+            response[header] = value
+        return response
+
+    byte_range = None
+    if 'Range' in request.headers and not content_encoding:
+        if_range = request.headers.get('If-Range')
+        if if_range is None or if_range == etag:
+            byte_range = _byte_range(request.headers['Range'], stat.st_size)
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{stat.st_size}'
+        return response
+
+    file = open(source, 'rb')
+    if byte_range:
+        start, end = byte_range
+        response = StreamingHttpResponse(_read_range(file, start, end - start + 1),
+                                         status=206, content_type=content_type)
+        response['Content-Range'] = f'bytes {start}-{end}/{stat.st_size}'
+        response['Content-Length'] = str(end - start + 1)
+    else:
+        response = FileResponse(file, content_type=content_type)
+        if content_encoding:
+            response['Content-Encoding'] = content_encoding
+    for header, value in headers.items():
+        response[header] = value
+    return response
+
+
+def _resolve(root, path):
+    try:
+        full_path = Path(safe_join(root, path))
+    except SuspiciousFileOperation:
+        raise Http404('File not found')
+    if not full_path.is_file():
+        raise Http404('File not found')
+    return full_path
+
+
+@require_safe
+def serve_media(request, path):
+    """
+    Įkeltų failų (MEDIA_ROOT) pateikimas. Ištrynus failą, Django saugykla
+    tą patį vardą gali suteikti naujam failui, todėl nekintamais laikomi
+    tik failai su turinio maišu pavadinime (pvz., sumažintos kopijos), o
+    kiti visada pertikrinami.
+    """
+    full_path = _resolve(settings.MEDIA_ROOT, path)
+    cache_control = IMMUTABLE_CACHE_CONTROL if HASHED_NAME.search(path) else REVALIDATE_CACHE_CONTROL
+    location = settings.ESHOP_SENDFILE['MEDIA_LOCATION'] + path
+    return serve_file(request, full_path, location, cache_control)
+
+
+@require_safe
+def serve_static(request, path):
+    """
+    Statinių failų pateikimas. Gamybos režime (ESHOP_STATIC_MANIFEST)
+    failai imami iš STATIC_ROOT, o failai su turinio maišu pavadinime
+    laikomi nekintamais. Kūrimo metu failai ieškomi programų static
+    kataloguose ir visada pertikrinami.
+    """
+    if settings.ESHOP_STATIC_MANIFEST:
+        full_path = _resolve(settings.STATIC_ROOT, path)
+    else:
+        try:
+            found = finders.find(os.path.normpath(path).lstrip('/\\'))
+        except SuspiciousFileOperation:
+            found = None
+        if not found:
+            raise Http404('File not found')
+        full_path = Path(found)
+    cache_control = IMMUTABLE_CACHE_CONTROL if HASHED_NAME.search(path) else REVALIDATE_CACHE_CONTROL
+    location = settings.ESHOP_SENDFILE['STATIC_LOCATION'] + path
+    return serve_file(request, full_path, location, cache_control)
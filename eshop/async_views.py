@@ -0,0 +1,114 @@
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.views import redirect_to_login
+from django.db.models import Count, OuterRef, Q, Subquery
+from django.http import Http404
+from django.shortcuts import render
+
+from .cache import cache_catalogue_page
+from .conditional import catalogue_condition, category_products_condition, product_detail_condition
+from .models import Category, Product, Review
+from .pagination import apaginate, apaginate_catalogue
+from .search import search_products
+from .views import PRODUCT_SORTS
+
+# Asynchronous versions of the read-heavy catalogue views, used instead of
+# eshop.views when ESHOP_ASYNC_VIEWS is on (ASGI deployments).
+
+arender = sync_to_async(render)
+
+
+def _is_authenticated(request):
+    return request.user.is_authenticated
+
+
+def login_required(view):
+    """
+    Asinchroninis login_required: vartotojas (sesija ir User eilutė)
+    įkeliamas per sync_to_async, todėl vėliau šablonas request.user
+    naudoja be užklausų duomenų bazei.
+    """
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if not await sync_to_async(_is_authenticated)(request):
+            return redirect_to_login(request.get_full_path())
+        return await view(request, *args, **kwargs)
+    return wrapper
+
+
+@login_required
+@catalogue_condition
+@cache_catalogue_page
+async def products(request):
+    """
+    Visų produktų sąrašas su puslapiavimu ir ?sort=rating rikiavimu, kaip
+    views.products.
+    """
+    sort = request.GET.get('sort')
+    paged_products = await apaginate_catalogue(request, Product.objects.all(), 8,
+                                               PRODUCT_SORTS.get(sort, ('id',)))
+    context = {'products': paged_products, 'sort': sort if sort in PRODUCT_SORTS else None}
+    return await arender(request, 'products.html', context)
+
+
+@login_required
+@category_products_condition
+@cache_catalogue_page
+async def category_products(request, category_id):
+    """
+    Kategorijos produktai po 8 vnt. Django 4.2 asinchroninės ORM užklausos
+    vykdomos po vieną toje pačioje gijoje, todėl jos laukiamos paeiliui.
+    """
+    category = await Category.objects.filter(id=category_id).afirst()
+    if category is None:
+        raise Http404('No Category matches the given query.')
+    products = await apaginate_catalogue(request, Product.objects.filter(categories_id=category_id), 8)
+    return await arender(request, 'category_products.html', {'category': category, 'products': products})
+
+
+@login_required
+@cache_catalogue_page
+async def categories(request):
+    """
+    Kategorijų sąrašas su produktų skaičiais ir paveikslėliu, kaip
+    views.categories.
+    """
+    cover = (Product.objects.filter(categories=OuterRef('pk'))
+             .exclude(foto='').exclude(foto__isnull=True)
+             .order_by('id').values('foto')[:1])
+    categories = (Category.objects
+                  .annotate(product_count=Count('products'),
+                            in_stock_count=Count('products', filter=Q(products__stock_quantity__gt=0)),
+                            product_foto=Subquery(cover))
+                  .order_by('name', 'id'))
+    context = {'categories': [category async for category in categories]}
+    return await arender(request, 'categories.html', context)
+
+
+@login_required
+@product_detail_condition
+async def product_detail(request, id):
+    """
+    Produkto puslapis su atsiliepimų puslapiu, kaip views.product_detail.
+    """
+    product = await Product.objects.select_related('categories').filter(id=id).afirst()
+    if product is None:
+        raise Http404('No Product matches the given query.')
+    reviews = (Review.objects.filter(products_id=id)
+               .select_related('clients__user')
+               .order_by('-created_date', '-id'))
+    paged_reviews = await apaginate(reviews, 5, request.GET.get('reviews_page'))
+    context = {'product': product, 'reviews': paged_reviews}
+    return await arender(request, 'product_detail.html', context)
+
+
+@login_required
+async def search(request):
+    """
+    Produktų paieška pagal pavadinimą ir aprašymą, kaip views.search.
+    """
+    query = request.GET.get('search_text', '').strip()
+    paged_products = await apaginate(search_products(query), 8, request.GET.get('page'))
+    context = {'query': query, 'products': paged_products}
+    return await arender(request, 'products.html', context)
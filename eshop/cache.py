@@ -0,0 +1,116 @@
+import hashlib
+import time
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.http import HttpResponse
+
+from .cart import cart_count
+
+CATALOGUE_VERSION_KEY = 'eshop:catalogue-version'
+CATALOGUE_REPLICATING_KEY = 'eshop:catalogue-replicating'
+
+
+def catalogue_version():
+    """
+    Funkcija grąžina dabartinę katalogo versiją. Jei versijos keše nėra
+    (pvz. ji buvo išmesta), pradedama nauja versija pagal laiką, kad
+    nebūtų pakartotinai panaudoti seni raktai. Kol po pakeitimo nepraėjo
+    REPLICA_PIN_SECONDS, versija pažymima, nes kopijos dar gali rodyti
+    senus duomenis; tada sugeneruoti puslapiai po šio laiko nebenaudojami.
+    """
+    values = cache.get_many([CATALOGUE_VERSION_KEY, CATALOGUE_REPLICATING_KEY])
+    version = values.get(CATALOGUE_VERSION_KEY)
+    if version is None:
+        version = time.time_ns()
+        cache.add(CATALOGUE_VERSION_KEY, version, None)
+        version = cache.get(CATALOGUE_VERSION_KEY, version)
+    if CATALOGUE_REPLICATING_KEY in values:
+        return version, 'replicating'
+    return version
+
+
+def bump_catalogue_version():
+    """
+    Funkcija padidina katalogo versiją, todėl visi anksčiau išsaugoti
+    katalogo puslapiai tampa nebenaudojami.
+    """
+    try:
+        cache.incr(CATALOGUE_VERSION_KEY)
+    except ValueError:
+        cache.set(CATALOGUE_VERSION_KEY, time.time_ns(), None)
+    if settings.DATABASE_REPLICAS:
+        cache.set(CATALOGUE_REPLICATING_KEY, True, settings.REPLICA_PIN_SECONDS)
+
+
+def page_variant(request):
+    """
+    Funkcija grąžina vartotojui būdingas puslapio dalis (navigacijos juosta,
+    krepšelio dydis, CSRF žetonas), į kurias turi atsižvelgti kešo raktas.
+    Grąžina None, jei puslapio kešuoti negalima.
+    """
+    if len(get_messages(request)):
+        return None
+    csrf_secret = request.META.get('CSRF_COOKIE')
+    if not csrf_secret:
+        return None
+    return (
+        request.user.pk,
+        cart_count(request),
+        csrf_secret,
+    )
+
+
+def _page_key(request):
+    variant = page_variant(request) if request.method == 'GET' else None
+    if variant is None:
+        return None
+    key_source = repr((catalogue_version(), request.get_full_path(), variant))
+    return 'eshop:page:' + hashlib.sha256(key_source.encode()).hexdigest()
+
+
+def cache_catalogue_page(view):
+    """
+    Dekoratorius, kuris kešuoja katalogo puslapio HTML pagal katalogo
+    versiją, užklausos adresą ir vartotojo variantą. Puslapiai su
+    laukiančiomis žinutėmis nekešuojami. Tinka ir asinchroniniams
+    rodiniams: vartotojo variantas (sesija, krepšelis) tada skaičiuojamas
+    per sync_to_async.
+    """
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            key = await sync_to_async(_page_key)(request)
+            if key is None:
+                return await view(request, *args, **kwargs)
+
+            cached = await cache.aget(key)
+            if cached is not None:
+                content, content_type = cached
+                return HttpResponse(content, content_type=content_type)
+
+            response = await view(request, *args, **kwargs)
+            if response.status_code == 200 and not response.streaming:
+                await cache.aset(key, (response.content, response['Content-Type']), settings.CATALOGUE_CACHE_TIMEOUT)
+            return response
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        key = _page_key(request)
+        if key is None:
+            return view(request, *args, **kwargs)
+
+        cached = cache.get(key)
+        if cached is not None:
+            content, content_type = cached
+            return HttpResponse(content, content_type=content_type)
+
+        response = view(request, *args, **kwargs)
+        if response.status_code == 200 and not response.streaming:
+            cache.set(key, (response.content, response['Content-Type']), settings.CATALOGUE_CACHE_TIMEOUT)
+        return response
+    return wrapper
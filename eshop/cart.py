@@ -0,0 +1,203 @@
+from django.db import transaction
+from django.db.models import F, Sum, OuterRef, Subquery
+
+from .models import Cart, CartItem, Product
+from .reservations import held_by_others, hold_stock
+
+SESSION_CART_KEY = 'cart_id'
+MAX_CART_OPERATIONS = 500
+
+
+def get_cart(request, create=False):
+    """
+    Funkcija grąžina dabartinio vartotojo krepšelį. Prisijungusio vartotojo
+    krepšelis randamas pagal vartotoją, anonimo - pagal sesijoje išsaugotą
+    krepšelio ID. Jei krepšelio nėra ir create=False, grąžinamas None.
+    """
+    if request.user.is_authenticated:
+        if create:
+            cart, _ = Cart.objects.get_or_create(user=request.user)
+        else:
+            cart = Cart.objects.filter(user=request.user).first()
+    else:
+        cart_id = request.session.get(SESSION_CART_KEY)
+        cart = Cart.objects.filter(pk=cart_id, user=None).first() if cart_id else None
+        if cart is None and create:
+            cart = Cart.objects.create()
+            request.session[SESSION_CART_KEY] = cart.pk
+
+    legacy_cart = request.session.pop('cart', None)
+    if legacy_cart and cart is None:
+        cart = get_cart(request, create=True)
+    if legacy_cart:
+        import_session_cart(cart, legacy_cart)
+    return cart
+
+
+def import_session_cart(cart, legacy_cart):
+    """
+    Funkcija perkelia seno formato sesijos krepšelį ({produkto ID: {...}})
+    į duomenų bazės krepšelį. Jau esančios eilutės nekeičiamos.
+    """
+    product_ids = Product.objects.filter(pk__in=[int(pk) for pk in legacy_cart]).values_list('pk', flat=True)
+    CartItem.objects.bulk_create(
+        [CartItem(carts=cart, products_id=pk, quantity=legacy_cart[str(pk)]['quantity']) for pk in product_ids],
+        ignore_conflicts=True,
+    )
+
+
+class CartError(Exception):
+    """
+    Klaida, kai bent viena krepšelio operacija negali būti įvykdyta.
+    Saugo pranešimus kiekvienai netinkamai operacijai.
+    """
+    def __init__(self, messages):
+        super().__init__(messages)
+        self.messages = messages
+
+
+def apply_cart_operations(cart, operations):
+    """
+    Funkcija pritaiko krepšeliui operacijų sąrašą. Kiekviena operacija yra
+    žodynas {product_id, quantity, op}, kur op - 'increment' (numatyta,
+    kiekis pridedamas, gali būti neigiamas) arba 'set' (nustatomas tikslus
+    kiekis, 0 pašalina eilutę). Prekės, jų kiekiai krepšelyje ir laisvas
+    kiekis (sandėlio kiekis, atėmus kitų krepšelių rezervacijas) gaunami
+    viena užklausa, o likutis tikrinamas visoms eilutėms prieš rašant.
+    Prekių eilutės užrakinamos iki transakcijos pabaigos, todėl keli
+    procesai negali rezervuoti to paties vieneto. Pakeistoms eilutėms
+    įrašomos rezervacijos su nauju galiojimo laiku. Jei bent viena operacija
+    netinkama, iškeliama CartError ir krepšelis nekeičiamas. Grąžina
+    (prekė, naujas kiekis) poras; prekės in_cart atributas rodo ankstesnį
+    kiekį (None, jei prekės nebuvo).
+    """
+    product_ids = {int(operation['product_id']) for operation in operations}
+    in_cart = CartItem.objects.filter(carts=cart, products=OuterRef('pk')).values('quantity')[:1]
+    with transaction.atomic():
+        products = (Product.objects.select_for_update(of=('self',))
+                    .filter(pk__in=product_ids)
+                    .only('id', 'name', 'stock_quantity')
+                    .annotate(in_cart=Subquery(in_cart),
+                              available_stock=F('stock_quantity') - held_by_others(cart)))
+        products = {product.pk: product for product in products}
+
+        errors = []
+        quantities = {}
+        for operation in operations:
+            product = products.get(int(operation['product_id']))
+            if product is None:
+                errors.append(f"Product {operation['product_id']} does not exist.")
+                continue
+            quantity = int(operation['quantity'])
+            current = quantities.get(product.pk, product.in_cart or 0)
+            if operation.get('op', 'increment') == 'set':
+                if quantity < 0:
+                    errors.append(f"Quantity of {product.name} cannot be negative.")
+                    continue
+                quantities[product.pk] = quantity
+            else:
+                quantities[product.pk] = max(current + quantity, 0)
+
+        for product_id, quantity in quantities.items():
+            product = products[product_id]
+            if quantity > product.available_stock and quantity > (product.in_cart or 0):
+                if product.available_stock <= 0:
+                    errors.append(f"Sorry, {product.name} is out of stock.")
+                else:
+                    errors.append(f"Sorry, you can't add more of {product.name}. "
+                                  f"Only {product.available_stock} is available.")
+        if errors:
+            raise CartError(errors)
+
+        changed = {product_id: quantity for product_id, quantity in quantities.items()
+                   if quantity != (products[product_id].in_cart or 0)}
+        removed = [product_id for product_id, quantity in changed.items() if quantity == 0]
+        if removed:
+            CartItem.objects.filter(carts=cart, products_id__in=removed).delete()
+        CartItem.objects.bulk_create(
+            [CartItem(carts=cart, products_id=product_id, quantity=quantity)
+             for product_id, quantity in changed.items() if quantity > 0],
+            update_conflicts=True,
+            unique_fields=['carts', 'products'],
+            update_fields=['quantity'],
+        )
+        hold_stock(cart, quantities)
+    return [(products[product_id], quantity) for product_id, quantity in quantities.items()]
+
+
+def cart_lines(cart):
+    """
+    Funkcija grąžina krepšelio eilutes su prekėmis ir eilutės suma,
+    apskaičiuota duomenų bazėje pagal dabartinę prekės kainą.
+    """
+    if cart is None:
+        return CartItem.objects.none()
+    return (CartItem.objects.filter(carts=cart)
+            .select_related('products')
+            .annotate(line_total=F('quantity') * F('products__one_price'))
+            .order_by('id'))
+
+
+def cart_total(cart):
+    """
+    Funkcija apskaičiuoja krepšelio vertę viena SQL užklausa.
+    """
+    if cart is None:
+        return 0
+    total = CartItem.objects.filter(carts=cart).aggregate(
+        total=Sum(F('quantity') * F('products__one_price'))
+    )['total']
+    return total or 0
+
+
+def cart_count(request):
+    """
+    Funkcija grąžina krepšelio eilučių skaičių navigacijos juostai.
+    Rezultatas įsimenamas užklausos objekte.
+    """
+    if not hasattr(request, '_cart_count'):
+        if request.user.is_authenticated:
+            items = CartItem.objects.filter(carts__user=request.user)
+        else:
+            items = CartItem.objects.filter(carts_id=request.session.get(SESSION_CART_KEY), carts__user=None)
+        request._cart_count = items.count()
+    return request._cart_count
+
+
+def merge_carts(source, target):
+    """
+    Funkcija perkelia source krepšelio eilutes į target krepšelį (kiekiai
+    sumuojami) ir ištrina source krepšelį kartu su jo rezervacijomis.
+    Sujungtas kiekis ribojamas laisvu kiekiu, bet nemažinamas žemiau jau
+    esančio target krepšelyje, o rezervacijos įrašomos per
+    apply_cart_operations, todėl sujungtas krepšelis laiko visą savo kiekį.
+    """
+    with transaction.atomic():
+        items = dict(CartItem.objects.filter(carts=source).values_list('products_id', 'quantity'))
+        source.delete()
+        if not items:
+            return
+        in_cart = CartItem.objects.filter(carts=target, products=OuterRef('pk')).values('quantity')[:1]
+        products = (Product.objects.select_for_update(of=('self',))
+                    .filter(pk__in=items)
+                    .annotate(in_cart=Subquery(in_cart),
+                              available_stock=F('stock_quantity') - held_by_others(target))
+                    .values_list('pk', 'in_cart', 'available_stock'))
+        operations = [
+            {'product_id': product_id, 'op': 'set',
+             'quantity': max(min((current or 0) + items[product_id], available), current or 0)}
+            for product_id, current, available in products
+        ]
+        apply_cart_operations(target, operations)
+
+
+def merge_session_cart(request, user):
+    """
+    Funkcija prisijungimo metu sujungia anoniminį sesijos krepšelį su
+    vartotojo krepšeliu.
+    """
+    cart_id = request.session.pop(SESSION_CART_KEY, None)
+    anonymous_cart = Cart.objects.filter(pk=cart_id, user=None).first() if cart_id else None
+    if anonymous_cart is not None:
+        user_cart, _ = Cart.objects.get_or_create(user=user)
+        merge_carts(anonymous_cart, user_cart)
@@ -0,0 +1,160 @@
+import hashlib
+from datetime import timezone as dt_timezone
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from django.views.decorators import http
+
+from .cache import catalogue_version, page_variant
+from .models import Category, Product
+
+
+def _etag(*parts):
+    return hashlib.sha256(repr(parts).encode()).hexdigest()
+
+
+def _latest(*dates):
+    dates = [date for date in dates if date is not None]
+    return max(dates) if dates else None
+
+
+def _validators(request, etag_func, last_modified_func, args, kwargs):
+    last_modified = last_modified_func(request, *args, **kwargs) if last_modified_func else None
+    if last_modified:
+        if not timezone.is_aware(last_modified):
+            last_modified = timezone.make_aware(last_modified, dt_timezone.utc)
+        last_modified = int(last_modified.timestamp())
+    etag = etag_func(request, *args, **kwargs) if etag_func else None
+    return (quote_etag(etag) if etag is not None else None), last_modified
+
+
+def condition(etag_func=None, last_modified_func=None):
+    """
+    Django condition() dekoratorius, tinkantis ir asinchroniniams
+    rodiniams (Django 4.2 jų nepalaiko). ETag ir pakeitimo laikas
+    asinchroniniam rodiniui skaičiuojami viena sync_to_async užklausa.
+    """
+    sync_decorator = http.condition(etag_func=etag_func, last_modified_func=last_modified_func)
+
+    def decorator(view):
+        if not iscoroutinefunction(view):
+            return sync_decorator(view)
+
+        @wraps(view)
+        async def inner(request, *args, **kwargs):
+            etag, last_modified = await sync_to_async(_validators)(
+                request, etag_func, last_modified_func, args, kwargs)
+            response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if response is None:
+                response = await view(request, *args, **kwargs)
+            if request.method in ('GET', 'HEAD'):
+                if last_modified and not response.has_header('Last-Modified'):
+                    response.headers['Last-Modified'] = http_date(last_modified)
+                if etag:
+                    response.headers.setdefault('ETag', etag)
+            return response
+        return inner
+    return decorator
+
+
+def products_etag(request, *args, **kwargs):
+    """
+    Katalogo sąrašų ETag: katalogo versija, užklausos adresas ir vartotojo
+    variantas. Duomenų bazės užklausų nereikia. Kai vartotojas turi
+    laukiančių žinučių, validatorius negrąžinamas ir puslapis visada
+    sugeneruojamas iš naujo.
+    """
+    variant = page_variant(request)
+    if variant is None:
+        return None
+    return _etag(catalogue_version(), request.get_full_path(), variant)
+
+
+def products_last_modified(request, *args, **kwargs):
+    """
+    Naujausias produkto pakeitimo laikas. Naudojamas indeksas, todėl
+    užklausa nenuskaito visos lentelės.
+    """
+    if page_variant(request) is None:
+        return None
+    return Product.objects.aggregate(latest=Max('updated_date'))['latest']
+
+
+def category_products_last_modified(request, category_id):
+    """
+    Naujausias kategorijos ar jos produktų pakeitimo laikas.
+    """
+    if page_variant(request) is None:
+        return None
+    row = (Category.objects.filter(pk=category_id)
+           .annotate(latest=Max('products__updated_date'))
+           .values_list('updated_date', 'latest').first())
+    return _latest(*row) if row else None
+
+
+def product_detail_last_modified(request, id):
+    """
+    Produkto ar jo kategorijos pakeitimo laikas. Rezultatas įsimenamas
+    užklausos objekte, nes jo reikia ir ETag reikšmei.
+    """
+    if page_variant(request) is None:
+        return None
+    if not hasattr(request, '_product_last_modified'):
+        row = Product.objects.filter(pk=id).values_list('updated_date', 'categories__updated_date').first()
+        request._product_last_modified = _latest(*row) if row else None
+    return request._product_last_modified
+
+
+def product_detail_etag(request, id):
+    """
+    Produkto puslapio ETag: produkto ID, pakeitimo laikas ir vartotojo
+    variantas.
+    """
+    last_modified = product_detail_last_modified(request, id)
+    if last_modified is None:
+        return None
+    return _etag(id, last_modified.isoformat(), page_variant(request))
+
+
+catalogue_condition = condition(etag_func=products_etag, last_modified_func=products_last_modified)
+category_products_condition = condition(etag_func=products_etag,
+                                        last_modified_func=category_products_last_modified)
+product_detail_condition = condition(etag_func=product_detail_etag,
+                                     last_modified_func=product_detail_last_modified)
+
+
+def api_products_etag(request, *args, **kwargs):
+    """
+    API produktų sąrašo ETag: katalogo versija, naujausias produkto
+    pakeitimo laikas ir užklausos adresas (puslapis, filtrai, laukai).
+    Atsakymas nepriklauso nuo vartotojo.
+    """
+    latest = Product.objects.aggregate(latest=Max('updated_date'))['latest']
+    return _etag(catalogue_version(), latest, request.get_full_path())
+
+
+def api_categories_etag(request, *args, **kwargs):
+    """
+    API kategorijų sąrašo ETag: katalogo versija ir užklausos adresas.
+    """
+    return _etag(catalogue_version(), request.get_full_path())
+
+
+def api_product_etag(request, pk):
+    """
+    API produkto ETag: produkto ar jo kategorijos pakeitimo laikas ir
+    užklausos adresas.
+    """
+    row = Product.objects.filter(pk=pk).values_list('updated_date', 'categories__updated_date').first()
+    if row is None:
+        return None
+    return _etag(pk, _latest(*row), request.get_full_path())
+
+
+api_products_condition = condition(etag_func=api_products_etag)
+api_categories_condition = condition(etag_func=api_categories_etag)
+api_product_condition = condition(etag_func=api_product_etag)
@@ -0,0 +1,11 @@
+from django.utils.functional import SimpleLazyObject
+
+from .cart import cart_count
+
+
+def cart(request):
+    """
+    Konteksto procesorius, perduodantis krepšelio eilučių skaičių
+    navigacijos juostai. Skaičius apskaičiuojamas tik jį atvaizduojant.
+    """
+    return {'cart_count': SimpleLazyObject(lambda: cart_count(request))}
@@ -0,0 +1,98 @@
+import csv
+import json
+from datetime import datetime, time, timedelta
+
+from django.db.models import F
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from .models import Order, OrderItem
+
+EXPORT_CHUNK_SIZE = 2000
+
+ORDER_EXPORT_COLUMNS = [
+    'order_id', 'order_date', 'status', 'client_id', 'first_name', 'last_name', 'email',
+    'line_id', 'product_id', 'sku', 'product_name', 'quantity', 'unit_price', 'line_total',
+]
+
+
+class Echo:
+    """
+    Pseudo buferis, kurio write() tiesiog grąžina eilutę. Leidžia csv.writer
+    naudoti srautiniam atsakui be tarpinio buferio.
+    """
+    def write(self, value):
+        return value
+
+
+def order_export_filters(date_from=None, date_to=None, status=None):
+    """
+    Funkcija paverčia eksporto parametrus (datos YYYY-MM-DD formatu ir
+    būsena) užklausos filtrais. Netinkamos reikšmės sukelia ValueError.
+    """
+    filters = {}
+    if date_from:
+        day = parse_date(date_from)
+        if day is None:
+            raise ValueError(f'Invalid date_from: {date_from}')
+        filters['orders__created_date__gte'] = timezone.make_aware(datetime.combine(day, time.min))
+    if date_to:
+        day = parse_date(date_to)
+        if day is None:
+            raise ValueError(f'Invalid date_to: {date_to}')
+        filters['orders__created_date__lt'] = timezone.make_aware(datetime.combine(day + timedelta(days=1), time.min))
+    if status:
+        if status not in dict(Order.STATUS_ORDER):
+            raise ValueError(f'Invalid status: {status}')
+        filters['orders__status'] = status
+    return filters
+
+
+def iter_order_rows(filters, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Funkcija grąžina užsakymų eilutes kartu su užsakymo, kliento ir prekės
+    duomenimis. Kaina imama iš eilutės (pirkimo metu), o senoms eilutėms be
+    kainos - dabartinė prekės kaina. Eilutės skaitomos iš duomenų bazės
+    dalimis per iterator(), todėl atmintyje vienu metu laikoma tik viena
+    dalis.
+    """
+    rows = (OrderItem.objects
+            .filter(**filters)
+            .annotate(price=Coalesce('unit_price', 'products__one_price'))
+            .annotate(line_total=F('quantity') * F('price'))
+            .order_by('orders_id', 'id')
+            .values_list(
+                'orders_id', 'orders__created_date', 'orders__status', 'orders__clients_id',
+                'orders__clients__first_name', 'orders__clients__last_name', 'orders__clients__user__email',
+                'id', 'products_id', 'products__sku', 'products__name', 'quantity', 'price',
+                'line_total',
+            ))
+    for row in rows.iterator(chunk_size=chunk_size):
+        yield dict(zip(ORDER_EXPORT_COLUMNS, row))
+
+
+def render_csv(rows):
+    """
+    Funkcija grąžina CSV eilutes po vieną, pradedant antrašte.
+    """
+    writer = csv.writer(Echo())
+    yield writer.writerow(ORDER_EXPORT_COLUMNS)
+    for row in rows:
+        row['order_date'] = row['order_date'].isoformat()
+        yield writer.writerow(row.values())
+
+
+def render_jsonl(rows):
+    """
+    Funkcija grąžina po vieną JSON objektą kiekvienai eilutei.
+    """
+    for row in rows:
+        row['order_date'] = row['order_date'].isoformat()
+        yield json.dumps(row) + '\n'
+
+
+EXPORT_FORMATS = {
+    'csv': (render_csv, 'text/csv'),
+    'jsonl': (render_jsonl, 'application/x-ndjson'),
+}
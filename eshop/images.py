@@ -0,0 +1,159 @@
+import hashlib
+import logging
+import posixpath
+from datetime import timedelta
+from io import BytesIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.utils import timezone
+from PIL import Image, ImageOps, features
+
+from .models import ImageDerivativeJob
+from .outbox import retry_delay
+
+logger = logging.getLogger(__name__)
+
+
+def derivative_formats():
+    """
+    Funkcija grąžina nustatymuose nurodytus išvestinių paveikslėlių
+    formatus, kuriuos palaiko įdiegta Pillow versija.
+    """
+    return [fmt for fmt in settings.IMAGE_DERIVATIVE_FORMATS if features.check(fmt)]
+
+
+def source_digest(name, storage=default_storage):
+    """
+    Funkcija grąžina originalo versijos maišą pagal jo pavadinimą ir
+    pakeitimo laiką saugykloje. Ištrynus failą, saugykla tą patį vardą
+    gali suteikti naujam failui, todėl vien pavadinimo neužtenka. Jei
+    originalo nėra, grąžina None.
+    """
+    try:
+        modified = storage.get_modified_time(name)
+    except (OSError, NotImplementedError):
+        return None
+    return hashlib.sha1(f'{name}:{modified.isoformat()}'.encode()).hexdigest()[:12]
+
+
+def derivative_name(name, size, fmt, digest):
+    """
+    Funkcija grąžina išvestinio paveikslėlio pavadinimą su originalo
+    versijos maišu (source_digest). Pasikeitus originalui, pasikeičia ir
+    pavadinimas, todėl failą galima kešuoti neribotą laiką.
+    """
+    stem = posixpath.splitext(posixpath.basename(name))[0]
+    return f'{settings.IMAGE_DERIVATIVE_DIR}/{stem}-{size}.{digest}.{fmt}'
+
+
+def build_derivatives(name, storage=default_storage):
+    """
+    Funkcija sukuria visų dydžių ir formatų išvestinius paveikslėlius iš
+    originalo. Jau sukurti failai praleidžiami.
+    """
+    digest = source_digest(name, storage)
+    if digest is None:
+        raise FileNotFoundError(f'{name} does not exist')
+    with storage.open(name) as source:
+        image = Image.open(source)
+        image.load()
+    image = ImageOps.exif_transpose(image)
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA')
+
+    created = 0
+    for size, pixels in settings.IMAGE_DERIVATIVE_SIZES.items():
+        for fmt in derivative_formats():
+            target = derivative_name(name, size, fmt, digest)
+            if storage.exists(target):
+                continue
+            thumbnail = image.copy()
+            thumbnail.thumbnail((pixels, pixels))
+            buffer = BytesIO()
+            thumbnail.save(buffer, fmt.upper(), quality=settings.IMAGE_DERIVATIVE_QUALITY)
+            storage.save(target, ContentFile(buffer.getvalue()))
+            created += 1
+    return created
+
+
+def schedule_derivatives(name):
+    """
+    Funkcija įrašo išvestinių paveikslėlių kūrimo užduotį. Kviečiama
+    paveikslėlio išsaugojimo transakcijoje, o užduotis atlieka
+    build_image_derivatives --queue procesas.
+    """
+    ImageDerivativeJob.objects.update_or_create(
+        name=name,
+        defaults={'status': 'Pending', 'attempts': 0, 'next_attempt_date': timezone.now(), 'last_error': ''},
+    )
+
+
+def claim_jobs(batch_size):
+    """
+    Funkcija paima paketą užduočių, kaip outbox.claim_batch: kiekviena
+    užduotis paimama sąlyginiu UPDATE ir IMAGE_DERIVATIVE_CLAIM_TIMEOUT
+    sekundėms atidedama kitiems procesams.
+    """
+    now = timezone.now()
+    lease = now + timedelta(seconds=settings.IMAGE_DERIVATIVE_CLAIM_TIMEOUT)
+    due = ImageDerivativeJob.objects.filter(status='Pending', next_attempt_date__lte=now)
+    candidates = list(due.order_by('next_attempt_date', 'id').values_list('pk', flat=True)[:batch_size])
+    claimed = [pk for pk in candidates if due.filter(pk=pk).update(next_attempt_date=lease)]
+    jobs = ImageDerivativeJob.objects.in_bulk(claimed)
+    return [jobs[pk] for pk in claimed]
+
+
+def build_queued_derivatives(batch_size, max_attempts=None):
+    """
+    Funkcija atlieka vieną užduočių paketą. Atlikta užduotis ištrinama, o
+    nepavykusi atidedama kaip neišsiųstas laiškas (outbox.retry_delay) ir
+    išnaudojus bandymus pažymima "Failed". Grąžina (atlikta, nepavyko).
+    """
+    max_attempts = max_attempts or settings.IMAGE_DERIVATIVE_MAX_ATTEMPTS
+    built = failed = 0
+    for job in claim_jobs(batch_size):
+        try:
+            build_derivatives(job.name)
+        except Exception as error:
+            logger.warning('Could not build image derivatives for %s: %s', job.name, error)
+            job.attempts += 1
+            job.last_error = str(error)
+            if job.attempts >= max_attempts:
+                job.status = 'Failed'
+            else:
+                job.next_attempt_date = timezone.now() + retry_delay(job.attempts)
+            job.save(update_fields=['status', 'attempts', 'next_attempt_date', 'last_error'])
+            failed += 1
+        else:
+            job.delete()
+            built += 1
+    return built, failed
+
+
+def _ready_key(digest):
+    return f'eshop:derivatives:{digest}'
+
+
+def derivatives_ready(name, storage=default_storage):
+    """
+    Funkcija grąžina originalo versijos maišą, jei sukurti visi šios
+    versijos išvestiniai paveikslėliai, kitu atveju None. Teigiamas
+    atsakymas kešuojamas, todėl failų sistema tikrinama tik kol jie kuriami.
+    """
+    digest = source_digest(name, storage)
+    if digest is None:
+        return None
+    if cache.get(_ready_key(digest)):
+        return digest
+    ready = all(
+        storage.exists(derivative_name(name, size, fmt, digest))
+        for size in settings.IMAGE_DERIVATIVE_SIZES
+        for fmt in derivative_formats()
+    )
+    if not ready:
+        return None
+    cache.set(_ready_key(digest), True, None)
+    return digest
@@ -0,0 +1,38 @@
+import csv
+import json
+
+
+JSONL_SUFFIXES = ('.jsonl', '.json', '.ndjson')
+
+
+def guess_format(path):
+    return 'jsonl' if path.suffix in JSONL_SUFFIXES else 'csv'
+
+
+def read_rows(path, file_format):
+    """
+    Skaito CSV arba JSONL failą eilutė po eilutės ir grąžina (eilutės numeris,
+    žodynas) poras, todėl viso failo į atmintį nereikia.
+    """
+    with open(path, newline='', encoding='utf-8') as file:
+        if file_format == 'csv':
+            for number, row in enumerate(csv.DictReader(file), start=2):
+                yield number, row
+        else:
+            for number, line in enumerate(file, start=1):
+                if line.strip():
+                    try:
+                        yield number, json.loads(line)
+                    except json.JSONDecodeError as error:
+                        yield number, error
+
+
+def first(row, *keys):
+    """
+    Grąžina pirmą netuščią eilutės reikšmę iš nurodytų stulpelių arba None.
+    """
+    for key in keys:
+        value = row.get(key)
+        if value not in (None, ''):
+            return value
+    return None
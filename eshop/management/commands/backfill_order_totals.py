@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F, OuterRef, Subquery, Sum
+
+from eshop.models import Order, OrderItem, Product
+
+
+class Command(BaseCommand):
+    help = ('Fills OrderItem.unit_price (from the current product price) where it is missing and '
+            'recalculates Order.item_count and Order.total from the lines, in batches of orders.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--start-id', type=int, default=0,
+                            help='Resume from this order ID.')
+
+    def handle(self, *args, **options):
+        last_id = options['start_id'] - 1
+        processed = 0
+        while True:
+            order_ids = list(Order.objects.filter(id__gt=last_id).order_by('id')
+                             .values_list('id', flat=True)[:options['batch_size']])
+            if not order_ids:
+                break
+            with transaction.atomic():
+                self.backfill(order_ids)
+            last_id = order_ids[-1]
+            processed += len(order_ids)
+            self.stdout.write(f'{processed} orders, last ID {last_id}')
+        self.stdout.write(self.style.SUCCESS(f'Backfilled {processed} orders.'))
+
+    def backfill(self, order_ids):
+        """
+        Užpildo trūkstamas eilučių kainas viena UPDATE užklausa ir
+        perskaičiuoja paketo užsakymų sumas viena agreguojančia užklausa.
+        """
+        price = Product.objects.filter(pk=OuterRef('products_id')).values('one_price')[:1]
+        OrderItem.objects.filter(orders_id__in=order_ids, unit_price__isnull=True).update(unit_price=Subquery(price))
+
+        totals = (OrderItem.objects.filter(orders_id__in=order_ids)
+                  .values('orders_id')
+                  .annotate(item_count=Sum('quantity'), total=Sum(F('quantity') * F('unit_price'))))
+        totals = {row['orders_id']: row for row in totals}
+        orders = []
+        for order_id in order_ids:
+            row = totals.get(order_id, {})
+            orders.append(Order(id=order_id, item_count=row.get('item_count') or 0,
+                                total=round(row.get('total') or 0, 2)))
+        Order.objects.bulk_update(orders, ['item_count', 'total'])
@@ -0,0 +1,233 @@
+import json
+import math
+import subprocess
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+from django.urls import reverse
+
+from eshop import urls
+from eshop.cache import bump_catalogue_version
+from eshop.models import Category, Order, OrderItem, Product
+
+# Routes behind staff_member_required; they are measured as a staff user.
+STAFF_ROUTES = {'export_orders', 'sales_dashboard'}
+
+
+def percentile(values, fraction):
+    """
+    Grąžina procentilį pagal artimiausio rango metodą.
+    """
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+class Rollback(Exception):
+    pass
+
+
+@contextmanager
+def test_environment():
+    """
+    Paruošia testų aplinką (testserver, atminties el. paštas) testų
+    klientui. Jei ji jau paruošta, pvz., komandą kviečiant iš testų,
+    paliekama tokia, kokia yra.
+    """
+    try:
+        setup_test_environment()
+    except RuntimeError:
+        yield
+        return
+    try:
+        yield
+    finally:
+        teardown_test_environment()
+
+
+class Command(BaseCommand):
+    help = ('Measures latency (p50/p95/p99), queries per request and peak memory of every eshop route '
+            'through the test client and prints the results as JSON. All changes are rolled back.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--username', help='User to log in as (defaults to the first seeded user).')
+        parser.add_argument('--staff-username',
+                            help='Staff user for staff-only routes (defaults to the first active staff user). '
+                                 'Without one those routes are skipped.')
+        parser.add_argument('--cart-size', type=int, default=30)
+        parser.add_argument('--cold', action='store_true',
+                            help='Invalidate the catalogue page cache before every request.')
+        parser.add_argument('--output', help='Write the JSON report to this file instead of stdout.')
+
+    def handle(self, *args, **options):
+        self.options = options
+        user = self.get_user(options['username'])
+        staff_user = self.get_staff_user(options['staff_username'])
+        product = Product.objects.filter(stock_quantity__gt=0).order_by('id').first()
+        category = Category.objects.order_by('id').first()
+        if product is None or category is None:
+            raise CommandError('The database has no products; run seed_catalogue first.')
+
+        try:
+            with test_environment(), transaction.atomic():
+                report = self.run(user, staff_user, product, category)
+                raise Rollback
+        except Rollback:
+            pass
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                file.write(output)
+        else:
+            self.stdout.write(output)
+
+    def get_user(self, username):
+        users = User.objects.filter(client__isnull=False)
+        user = users.filter(username=username).first() if username else users.order_by('id').first()
+        if user is None:
+            raise CommandError('No user with a client profile found; run seed_catalogue first.')
+        return user
+
+    def get_staff_user(self, username):
+        users = User.objects.filter(is_staff=True, is_active=True)
+        if username:
+            user = users.filter(username=username).first()
+            if user is None:
+                raise CommandError(f'No active staff user named {username}.')
+            return user
+        return users.order_by('id').first()
+
+    def routes(self, product, category, order):
+        """
+        Sudaro kiekvieno eshop/urls.py maršruto užklausą: metodą, adresą ir
+        parengimo funkciją, kuri vykdoma prieš matavimą.
+        """
+        arguments = {
+            'product_detail': [product.id],
+            'category_products': [category.id],
+            'add_to_cart': [product.id],
+            'remove_from_cart': [product.id],
+            'order_detail': [order.id],
+        }
+        methods = {'add_to_cart': 'post', 'register': 'get'}
+        prepare = {
+            'remove_from_cart': self.add_one,
+            'checkout': self.fill_cart,
+        }
+        data = {'search': {'search_text': product.name.split()[0]}}
+        for pattern in urls.urlpatterns:
+            name = pattern.name
+            yield (name, methods.get(name, 'get'), reverse(name, args=arguments.get(name, [])),
+                   data.get(name), prepare.get(name))
+
+    def add_one(self, client, product_ids):
+        client.post(reverse('add_to_cart', args=[product_ids[0]]))
+
+    def fill_cart(self, client, product_ids):
+        for product_id in product_ids:
+            client.post(reverse('add_to_cart', args=[product_id]))
+
+    def get_order(self, user, product):
+        """
+        Grąžina naujausią vartotojo užsakymą, o jei jo nėra, sukuria
+        užsakymą su viena preke (jis atšaukiamas kartu su kitais pakeitimais).
+        """
+        order = Order.objects.filter(clients__user=user).order_by('-id').first()
+        if order is None:
+            order = Order.objects.create(clients=user.client, item_count=1, total=product.one_price)
+            OrderItem.objects.create(orders=order, products=product, quantity=1, unit_price=product.one_price)
+        return order
+
+    def run(self, user, staff_user, product, category):
+        client = Client()
+        client.force_login(user)
+        staff_client = None
+        if staff_user is not None:
+            staff_client = Client()
+            staff_client.force_login(staff_user)
+        order = self.get_order(user, product)
+        in_stock = Product.objects.filter(stock_quantity__gte=self.options['iterations'] + 2).order_by('id')
+        cart_products = list(in_stock.values_list('id', flat=True)[:self.options['cart_size']]) or [product.id]
+        results = {}
+        for name, method, url, data, prepare in self.routes(product, category, order):
+            route_client = client
+            if name in STAFF_ROUTES:
+                if staff_client is None:
+                    results[name] = {'method': method.upper(), 'url': url,
+                                     'skipped': 'Staff-only route and no staff user to log in as.'}
+                    continue
+                route_client = staff_client
+            latencies, queries = [], []
+            for _ in range(self.options['iterations'] + 1):
+                if prepare:
+                    prepare(route_client, cart_products)
+                if self.options['cold']:
+                    bump_catalogue_version()
+                with CaptureQueriesContext(connection) as captured:
+                    started = time.perf_counter()
+                    response = self.request(route_client, method, url, data)
+                    elapsed = time.perf_counter() - started
+                latencies.append(elapsed * 1000)
+                queries.append(len(captured))
+            # The first request warms up caches and is not counted.
+            latencies, queries = latencies[1:], queries[1:]
+
+            if prepare:
+                prepare(route_client, cart_products)
+            tracemalloc.start()
+            self.request(route_client, method, url, data)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            results[name] = {
+                'method': method.upper(),
+                'url': url,
+                'status': response.status_code,
+                'p50_ms': round(percentile(latencies, 0.50), 3),
+                'p95_ms': round(percentile(latencies, 0.95), 3),
+                'p99_ms': round(percentile(latencies, 0.99), 3),
+                'mean_ms': round(sum(latencies) / len(latencies), 3),
+                'queries': max(queries),
+                'peak_memory_kb': round(peak / 1024, 1),
+            }
+        return {
+            'meta': self.meta(user, staff_user),
+            'routes': results,
+        }
+
+    def request(self, client, method, url, data):
+        """
+        Atlieka užklausą ir perskaito srautinio atsakymo turinį, kad
+        eksporto užklausos ir laikas būtų įskaičiuoti į matavimą.
+        """
+        response = getattr(client, method)(url, data)
+        if response.streaming:
+            b''.join(response.streaming_content)
+        return response
+
+    def meta(self, user, staff_user):
+        try:
+            commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                                    cwd=settings.BASE_DIR, check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            commit = None
+        return {
+            'commit': commit,
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'iterations': self.options['iterations'],
+            'cart_size': self.options['cart_size'],
+            'cold': self.options['cold'],
+            'user': user.username,
+            'staff_user': staff_user.username if staff_user else None,
+            'database': connection.vendor,
+            'products': Product.objects.count(),
+            'categories': Category.objects.count(),
+        }
@@ -0,0 +1,217 @@
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from pathlib import Path
+
+from django.conf import settings
+from django.core.asgi import get_asgi_application
+from django.core.management.base import BaseCommand, CommandError
+from django.core.wsgi import get_wsgi_application
+from django.db import connections
+from django.test import Client
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.urls import reverse
+
+from eshop.cache import bump_catalogue_version
+from eshop.management.commands.benchmark import percentile
+from eshop.models import Category, Product, User
+
+MODES = {
+    'wsgi': '0',
+    'asgi': '1',
+}
+
+
+def split_url(url):
+    path, _, query = url.partition('?')
+    return path, query
+
+
+class Command(BaseCommand):
+    help = ('Compares throughput and tail latency of the catalogue pages (products, categories, product, '
+            'category and search pages) served by the WSGI handler with the sync views and a thread pool '
+            'against the ASGI handler with the async views on one event loop. Each mode runs in its own '
+            'process; requests go straight to the Django handlers, without an HTTP server.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mode', choices=['both', *MODES], default='both')
+        parser.add_argument('--requests', type=int, default=200, help='Requests per page.')
+        parser.add_argument('--concurrency', type=int, default=16,
+                            help='WSGI worker threads / concurrent ASGI requests.')
+        parser.add_argument('--username', help='User to log in as (defaults to the first seeded user).')
+        parser.add_argument('--cold', action='store_true',
+                            help='Invalidate the catalogue page cache before every request.')
+        parser.add_argument('--output', help='Write the JSON report to this file instead of stdout.')
+
+    def handle(self, *args, **options):
+        self.options = options
+        if options['mode'] == 'both':
+            report = {mode: self.run_subprocess(mode) for mode in MODES}
+        else:
+            if settings.ESHOP_ASYNC_VIEWS != (options['mode'] == 'asgi'):
+                raise CommandError(f'Run --mode {options["mode"]} with ESHOP_ASYNC_VIEWS={MODES[options["mode"]]}.')
+            report = self.run_mode(options['mode'])
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                file.write(output)
+        else:
+            self.stdout.write(output)
+
+    def run_subprocess(self, mode):
+        command = [sys.executable, str(Path(settings.BASE_DIR, 'manage.py')), 'benchmark_async', '--mode', mode,
+                   '--requests', str(self.options['requests']), '--concurrency', str(self.options['concurrency'])]
+        if self.options['username']:
+            command += ['--username', self.options['username']]
+        if self.options['cold']:
+            command.append('--cold')
+        env = {**os.environ, 'ESHOP_ASYNC_VIEWS': MODES[mode]}
+        if mode == 'asgi':
+            # Persistent connections must be disabled under ASGI, as in asgi.py.
+            env['ESHOP_CONN_MAX_AGE'] = '0'
+        result = subprocess.run(command, capture_output=True, text=True, env=env)
+        if result.returncode:
+            raise CommandError(f'{mode} benchmark failed:\n{result.stderr}')
+        return json.loads(result.stdout)
+
+    def urls(self):
+        product = Product.objects.order_by('id').first()
+        category = Category.objects.order_by('id').first()
+        if product is None or category is None:
+            raise CommandError('The database has no products; run seed_catalogue first.')
+        return {
+            'products': reverse('products'),
+            'categories': reverse('categories'),
+            'product_detail': reverse('product_detail', args=[product.id]),
+            'category_products': reverse('category_products', args=[category.id]),
+            'search': f"{reverse('search')}?search_text={product.name.split()[0]}",
+        }
+
+    def login_cookies(self):
+        """
+        Prisijungia per testų klientą ir grąžina sesijos bei CSRF slapukus,
+        kad matuojamos užklausos naudotų katalogo puslapių kešą kaip
+        naršyklė.
+        """
+        users = User.objects.filter(client__isnull=False)
+        username = self.options['username']
+        user = users.filter(username=username).first() if username else users.order_by('id').first()
+        if user is None:
+            raise CommandError('No user with a client profile found; run seed_catalogue first.')
+        client = Client()
+        client.force_login(user)
+        client.get(reverse('products'))
+        return '; '.join(f'{name}={morsel.value}' for name, morsel in client.cookies.items())
+
+    def run_mode(self, mode):
+        setup_test_environment()
+        try:
+            urls = self.urls()
+            cookie = self.login_cookies()
+            run = self.run_wsgi if mode == 'wsgi' else self.run_asgi
+            pages = {}
+            for name, url in urls.items():
+                # Warm-up request: opens connections and fills the page cache.
+                run(url, cookie, 1)
+                started = time.perf_counter()
+                results = run(url, cookie, self.options['requests'])
+                elapsed = time.perf_counter() - started
+                pages[name] = self.summary(url, results, elapsed)
+        finally:
+            teardown_test_environment()
+        return {
+            'meta': {
+                'mode': mode,
+                'async_views': settings.ESHOP_ASYNC_VIEWS,
+                'requests': self.options['requests'],
+                'concurrency': self.options['concurrency'],
+                'cold': self.options['cold'],
+                'database': connections['default'].vendor,
+            },
+            'pages': pages,
+        }
+
+    def summary(self, url, results, elapsed):
+        latencies = [latency for _, latency in results]
+        return {
+            'url': url,
+            'statuses': sorted({status for status, _ in results}),
+            'requests_per_second': round(len(results) / elapsed, 1),
+            'p50_ms': round(percentile(latencies, 0.50), 3),
+            'p95_ms': round(percentile(latencies, 0.95), 3),
+            'p99_ms': round(percentile(latencies, 0.99), 3),
+            'max_ms': round(max(latencies), 3),
+        }
+
+    def run_wsgi(self, url, cookie, count):
+        application = get_wsgi_application()
+        path, query = split_url(url)
+
+        def request(_):
+            if self.options['cold']:
+                bump_catalogue_version()
+            environ = {
+                'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': query, 'SCRIPT_NAME': '',
+                'SERVER_NAME': 'testserver', 'SERVER_PORT': '80', 'SERVER_PROTOCOL': 'HTTP/1.1',
+                'HTTP_HOST': 'testserver', 'HTTP_COOKIE': cookie, 'REMOTE_ADDR': '127.0.0.1',
+                'wsgi.version': (1, 0), 'wsgi.url_scheme': 'http', 'wsgi.input': BytesIO(),
+                'wsgi.errors': sys.stderr, 'wsgi.multithread': True, 'wsgi.multiprocess': False,
+                'wsgi.run_once': False,
+            }
+            status = []
+            started = time.perf_counter()
+            body = application(environ, lambda code, headers, exc_info=None: status.append(int(code[:3])))
+            for _ in body:
+                pass
+            body.close()
+            return status[0], (time.perf_counter() - started) * 1000
+
+        with ThreadPoolExecutor(max_workers=self.options['concurrency']) as executor:
+            return list(executor.map(request, range(count)))
+
+    def run_asgi(self, url, cookie, count):
+        application = get_asgi_application()
+        path, query = split_url(url)
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+            'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'query_string': query.encode(),
+            'root_path': '', 'client': ('127.0.0.1', 0), 'server': ('testserver', 80),
+            'headers': [(b'host', b'testserver'), (b'cookie', cookie.encode())],
+        }
+
+        async def request(semaphore):
+            async with semaphore:
+                if self.options['cold']:
+                    bump_catalogue_version()
+                status = []
+                disconnected = asyncio.Event()
+                body_sent = False
+
+                async def receive():
+                    nonlocal body_sent
+                    if not body_sent:
+                        body_sent = True
+                        return {'type': 'http.request', 'body': b'', 'more_body': False}
+                    await disconnected.wait()
+                    return {'type': 'http.disconnect'}
+
+                async def send(message):
+                    if message['type'] == 'http.response.start':
+                        status.append(message['status'])
+
+                started = time.perf_counter()
+                await application(dict(scope), receive, send)
+                disconnected.set()
+                return status[0], (time.perf_counter() - started) * 1000
+
+        async def main():
+            semaphore = asyncio.Semaphore(self.options['concurrency'])
+            return await asyncio.gather(*(request(semaphore) for _ in range(count)))
+
+        return asyncio.run(main())
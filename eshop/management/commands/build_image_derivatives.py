@@ -0,0 +1,50 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from eshop.images import build_derivatives, build_queued_derivatives
+from eshop.models import Category, Product, Profile
+
+
+class Command(BaseCommand):
+    help = ('Builds resized copies of product, category and profile photos. With --queue it works '
+            'through the jobs queued when photos are saved; without it, it builds every missing copy.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--queue', action='store_true', help='Process queued jobs only.')
+        parser.add_argument('--batch-size', type=int, default=20)
+        parser.add_argument('--loop', action='store_true',
+                            help='With --queue, keep polling instead of exiting when the queue is empty.')
+        parser.add_argument('--interval', type=float, default=5,
+                            help='Seconds to sleep between polls when the queue is empty.')
+
+    def handle(self, *args, **options):
+        if options['queue']:
+            self.process_queue(options)
+        else:
+            self.build_all()
+
+    def process_queue(self, options):
+        while True:
+            built, failed = build_queued_derivatives(options['batch_size'])
+            if built or failed:
+                self.stdout.write(f'Built {built}, failed {failed}.')
+            if built + failed == options['batch_size']:
+                continue
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+
+    def build_all(self):
+        sources = [(Product, 'foto'), (Category, 'foto'), (Profile, 'picture')]
+        created = failed = 0
+        for model, field in sources:
+            names = (model.objects.exclude(**{field: ''}).exclude(**{f'{field}__isnull': True})
+                     .values_list(field, flat=True).distinct().iterator())
+            for name in names:
+                try:
+                    created += build_derivatives(name)
+                except Exception as error:
+                    failed += 1
+                    self.stderr.write(f'{name}: {error}')
+        self.stdout.write(self.style.SUCCESS(f'Created {created} derivatives, {failed} sources failed.'))
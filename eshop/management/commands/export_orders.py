@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from eshop.exports import EXPORT_CHUNK_SIZE, EXPORT_FORMATS, order_export_filters, iter_order_rows
+
+
+class Command(BaseCommand):
+    help = ('Writes order lines joined with order, client and product data to a CSV or JSONL file. '
+            'Rows are streamed from the database in chunks.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=sorted(EXPORT_FORMATS),
+                            help='Output format; guessed from the file extension by default.')
+        parser.add_argument('--date-from', help='First order date to include (YYYY-MM-DD).')
+        parser.add_argument('--date-to', help='Last order date to include (YYYY-MM-DD).')
+        parser.add_argument('--status')
+        parser.add_argument('--chunk-size', type=int, default=EXPORT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or ('jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv')
+        try:
+            filters = order_export_filters(options['date_from'], options['date_to'], options['status'])
+        except ValueError as error:
+            raise CommandError(error)
+
+        renderer, _ = EXPORT_FORMATS[file_format]
+        lines = 0
+        with open(path, 'w', newline='', encoding='utf-8') as file:
+            for line in renderer(iter_order_rows(filters, options['chunk_size'])):
+                file.write(line)
+                lines += 1
+        if file_format == 'csv':
+            lines -= 1
+        self.stdout.write(self.style.SUCCESS(f'Exported {lines} order lines to {path}.'))
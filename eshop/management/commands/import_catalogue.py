@@ -0,0 +1,160 @@
+import json
+from pathlib import Path
+
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, transaction
+
+from eshop.cache import bump_catalogue_version
+from eshop.imports import first, guess_format, read_rows
+from eshop.models import Category, Product
+
+UPDATE_FIELDS = ['name', 'description', 'one_price', 'stock_quantity', 'categories', 'foto', 'updated_date']
+OPTIONAL_FIELDS = {'description', 'stock_quantity', 'foto'}
+IMPORT_IMAGE_DIR = 'foto/import'
+
+
+class Command(BaseCommand):
+    help = ('Streams products from a CSV or JSONL file and upserts them by SKU in fixed-size batches. '
+            'Columns: sku, name, description, one_price (or price), stock_quantity (or stock), '
+            'category, image.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=['csv', 'jsonl'],
+                            help='Input format; guessed from the file extension by default.')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--images-dir', help='Directory with the image files named in the "image" column.')
+        parser.add_argument('--max-errors', type=int, default=0,
+                            help='Stop after this many bad rows (0 means never stop).')
+
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        if not path.exists():
+            raise CommandError(f'{path} does not exist.')
+        file_format = options['format'] or guess_format(path)
+        self.images_dir = Path(options['images_dir']) if options['images_dir'] else None
+        self.categories = dict(Category.objects.values_list('name', 'id'))
+        self.stored_images = {}
+        self.imported = self.failed = 0
+
+        batch = {}
+        for number, row in read_rows(path, file_format):
+            try:
+                product, fields = self.build_product(row)
+            except (ValueError, TypeError, ValidationError, json.JSONDecodeError) as error:
+                self.report_error(number, error, options['max_errors'])
+                continue
+            batch[product.sku] = (number, product, fields)
+            if len(batch) >= options['batch_size']:
+                self.write_batch(batch, options['max_errors'])
+                batch = {}
+        if batch:
+            self.write_batch(batch, options['max_errors'])
+
+        bump_catalogue_version()
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {self.imported} products, {self.failed} rows failed. '
+            f'Run build_image_derivatives to resize new images.'
+        ))
+
+    def build_product(self, row):
+        """
+        Sukuria produktą iš eilutės ir grąžina jį kartu su stulpeliais, kuriuos
+        reikia atnaujinti jau esančiam produktui. Neužpildyti aprašymas,
+        kiekis ir paveikslėlis neatnaujinami, kad nebūtų ištrinti.
+        """
+        if isinstance(row, Exception):
+            raise row
+        sku = first(row, 'sku')
+        name = first(row, 'name')
+        category = first(row, 'category')
+        if not sku or not name or not category:
+            raise ValueError('sku, name and category are required')
+        price = float(first(row, 'one_price', 'price'))
+        stock = first(row, 'stock_quantity', 'stock')
+        stock = int(stock) if stock is not None else None
+        if price < 0 or (stock or 0) < 0:
+            raise ValueError('price and stock must not be negative')
+        description = first(row, 'description')
+
+        product = Product(
+            sku=str(sku)[:64],
+            name=str(name)[:255],
+            description=description or '',
+            one_price=price,
+            stock_quantity=stock or 0,
+            categories_id=self.category_id(str(category)[:255]),
+        )
+        image = first(row, 'image')
+        if image:
+            product.foto = self.store_image(image)
+        given = {'description': description, 'stock_quantity': stock, 'foto': image}
+        fields = tuple(field for field in UPDATE_FIELDS
+                       if field not in OPTIONAL_FIELDS or given[field] is not None)
+        return product, fields
+
+    def category_id(self, name):
+        if name not in self.categories:
+            self.categories[name] = Category.objects.get_or_create(name=name)[0].pk
+        return self.categories[name]
+
+    def store_image(self, image):
+        """
+        Įkelia paveikslėlį iš --images-dir katalogo. Failo pavadinimas
+        saugykloje nesikeičia, todėl pakartotinis importas jo nedubliuoja.
+        """
+        if image in self.stored_images:
+            return self.stored_images[image]
+        if self.images_dir is None:
+            raise ValueError(f'image {image} given but --images-dir is not set')
+        source = self.images_dir / Path(image).name
+        if not source.is_file():
+            raise ValueError(f'image {source} not found')
+        name = f'{IMPORT_IMAGE_DIR}/{source.name}'
+        if not default_storage.exists(name):
+            with open(source, 'rb') as file:
+                name = default_storage.save(name, File(file))
+        if len(self.stored_images) < 10000:
+            self.stored_images[image] = name
+        return name
+
+    def upsert(self, products, fields):
+        Product.objects.bulk_create(
+            products,
+            update_conflicts=True,
+            unique_fields=['sku'],
+            update_fields=fields,
+        )
+
+    def write_batch(self, batch, max_errors):
+        """
+        Įrašo paketą viena transakcija, po vieną bulk_create kiekvienam
+        atnaujinamų stulpelių rinkiniui. Jei paketas nepavyksta, eilutės
+        įrašomos po vieną, kad viena bloga eilutė nesustabdytų importo.
+        """
+        groups = {}
+        for _, product, fields in batch.values():
+            groups.setdefault(fields, []).append(product)
+        try:
+            with transaction.atomic():
+                for fields, products in groups.items():
+                    self.upsert(products, fields)
+            self.imported += len(batch)
+        except DatabaseError:
+            for number, product, fields in batch.values():
+                try:
+                    with transaction.atomic():
+                        self.upsert([product], fields)
+                    self.imported += 1
+                except DatabaseError as error:
+                    self.report_error(number, error, max_errors)
+        self.stdout.write(f'{self.imported} imported, {self.failed} failed')
+
+    def report_error(self, number, error, max_errors):
+        self.failed += 1
+        self.stderr.write(f'Row {number}: {error}')
+        if max_errors and self.failed >= max_errors:
+            raise CommandError(f'Stopped after {self.failed} bad rows.')
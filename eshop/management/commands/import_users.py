@@ -0,0 +1,144 @@
+from pathlib import Path
+
+from django.contrib.auth.base_user import AbstractBaseUser
+from django.contrib.auth.hashers import identify_hasher, make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from eshop.imports import first, guess_format, read_rows
+from eshop.models import Client, Profile, User
+
+
+class Command(BaseCommand):
+    help = ('Streams user accounts from a CSV or JSONL file and creates User, Profile and Client rows '
+            'in bulk batches. Columns: username, email, password (already hashed, e.g. pbkdf2_sha256$...), '
+            'first_name, last_name, phone_number, address, date_joined. Existing usernames are skipped, '
+            'so an interrupted import can simply be run again.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=['csv', 'jsonl'],
+                            help='Input format; guessed from the file extension by default.')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--plain-passwords', action='store_true',
+                            help='Hash the password column instead of expecting hashes (slow).')
+        parser.add_argument('--checkpoint',
+                            help='File that stores the last imported line; rows up to it are skipped on the next run.')
+        parser.add_argument('--max-errors', type=int, default=0,
+                            help='Stop after this many bad rows (0 means never stop).')
+
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        if not path.exists():
+            raise CommandError(f'{path} does not exist.')
+        file_format = options['format'] or guess_format(path)
+        self.plain_passwords = options['plain_passwords']
+        self.max_errors = options['max_errors']
+        self.checkpoint = Path(options['checkpoint']) if options['checkpoint'] else None
+        start = int(self.checkpoint.read_text()) if self.checkpoint and self.checkpoint.exists() else 0
+        self.imported = self.skipped = self.failed = 0
+
+        batch = {}
+        number = start
+        for number, row in read_rows(path, file_format):
+            if number <= start:
+                continue
+            try:
+                user, client = self.build_user(row)
+            except (ValueError, TypeError) as error:
+                self.report_error(number, error)
+                continue
+            if user.username in batch:
+                self.report_error(number, f'duplicate username {user.username}')
+                continue
+            batch[user.username] = (number, user, client)
+            if len(batch) >= options['batch_size']:
+                self.write_batch(batch, number)
+                batch = {}
+        self.write_batch(batch, number)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {self.imported} users, {self.skipped} already existed, {self.failed} rows failed.'
+        ))
+
+    def build_user(self, row):
+        if isinstance(row, Exception):
+            raise row
+        username = first(row, 'username')
+        if not username:
+            raise ValueError('username is required')
+        password = first(row, 'password')
+        if password is None:
+            password = make_password(None)
+        elif self.plain_passwords:
+            password = make_password(password)
+        else:
+            identify_hasher(password)
+        date_joined = first(row, 'date_joined')
+        if date_joined:
+            date_joined = parse_datetime(date_joined)
+            if date_joined is None:
+                raise ValueError('invalid date_joined')
+            if timezone.is_naive(date_joined):
+                date_joined = timezone.make_aware(date_joined)
+        phone_number = first(row, 'phone_number')
+
+        user = User(
+            username=AbstractBaseUser.normalize_username(str(username))[:150],
+            email=User.objects.normalize_email(first(row, 'email') or '')[:254],
+            password=password,
+            date_joined=date_joined or timezone.now(),
+        )
+        client = Client(
+            first_name=str(first(row, 'first_name') or '')[:100],
+            last_name=str(first(row, 'last_name') or '')[:100],
+            phone_number=int(phone_number) if phone_number is not None else None,
+            address=first(row, 'address'),
+        )
+        return user, client
+
+    def write_batch(self, batch, number):
+        """
+        Įrašo paketą viena transakcija: vartotojus, jų profilius ir klientus
+        trimis bulk_create užklausomis. Signalas create_profile bulk_create
+        metu nesiunčiamas, todėl profiliai ir klientai kuriami čia. Jau
+        esantys vartotojai praleidžiami, o užimti el. paštai laikomi
+        klaidomis, kaip ir registruojantis.
+        """
+        if batch:
+            emails = {user.email for _, user, _ in batch.values() if user.email}
+            existing = User.objects.filter(Q(username__in=batch) | Q(email__in=emails)).values_list('username', 'email')
+            taken_emails = set()
+            for username, email in existing:
+                taken_emails.add(email)
+                if username in batch:
+                    del batch[username]
+                    self.skipped += 1
+            seen_emails = set()
+            rows = []
+            for line, user, client in batch.values():
+                if user.email and (user.email in taken_emails or user.email in seen_emails):
+                    self.report_error(line, f'email {user.email} is already taken')
+                    continue
+                seen_emails.add(user.email)
+                rows.append((user, client))
+
+            with transaction.atomic():
+                users = User.objects.bulk_create([user for user, _ in rows])
+                Profile.objects.bulk_create([Profile(user=user) for user in users])
+                for user, client in rows:
+                    client.user = user
+                Client.objects.bulk_create([client for _, client in rows])
+            self.imported += len(rows)
+        if self.checkpoint:
+            self.checkpoint.write_text(str(number))
+        self.stdout.write(f'{self.imported} imported, {self.skipped} skipped, {self.failed} failed')
+
+    def report_error(self, number, error):
+        self.failed += 1
+        self.stderr.write(f'Row {number}: {error}')
+        if self.max_errors and self.failed >= self.max_errors:
+            raise CommandError(f'Stopped after {self.failed} bad rows.')
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils.dateparse import parse_date
+
+from eshop.analytics import ROLLUP_BATCH_SIZE, rebuild_sales_rollups
+
+
+class Command(BaseCommand):
+    help = ('Recomputes the daily product and category sales rollups from Completed and Shipped orders. '
+            'Without dates the whole history is rebuilt. Use it after editing order lines of '
+            'completed orders or after bulk imports that bypass model signals.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date-from', help='First order date to rebuild (YYYY-MM-DD).')
+        parser.add_argument('--date-to', help='Last order date to rebuild (YYYY-MM-DD).')
+        parser.add_argument('--batch-size', type=int, default=ROLLUP_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        dates = []
+        for name in ('date_from', 'date_to'):
+            value = options[name]
+            try:
+                date = parse_date(value) if value else None
+            except ValueError:
+                date = None
+            if value and date is None:
+                raise CommandError(f'Invalid {name}: {value}')
+            dates.append(date)
+
+        with transaction.atomic():
+            products, categories = rebuild_sales_rollups(*dates, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {products} product and {categories} category rollup rows.'
+        ))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from eshop.search import rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the product full-text search index.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        rebuild_search_index(options['database'])
+        self.stdout.write(self.style.SUCCESS('Search index rebuilt.'))
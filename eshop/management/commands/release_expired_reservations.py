@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from eshop.reservations import release_expired_reservations
+
+
+class Command(BaseCommand):
+    help = 'Deletes expired cart stock reservations in batches. Run it periodically (cron) or with --loop.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--loop', action='store_true',
+                            help='Keep sweeping instead of exiting after one pass.')
+        parser.add_argument('--interval', type=float, default=60,
+                            help='Seconds to sleep between sweeps.')
+
+    def handle(self, *args, **options):
+        while True:
+            released = release_expired_reservations(options['batch_size'])
+            if released:
+                self.stdout.write(f'Released {released} expired reservations.')
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from eshop.cache import bump_catalogue_version
+from eshop.models import Product
+from eshop.ratings import repair_ratings
+
+
+class Command(BaseCommand):
+    help = ('Recalculates the stored review count, rating sum and average of every product from the '
+            'Review table, in batches of products. Use it after bulk review imports.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        last_id = 0
+        checked = repaired = 0
+        while True:
+            product_ids = list(Product.objects.filter(id__gt=last_id).order_by('id')
+                               .values_list('id', flat=True)[:options['batch_size']])
+            if not product_ids:
+                break
+            with transaction.atomic():
+                repaired += repair_ratings(product_ids)
+            last_id = product_ids[-1]
+            checked += len(product_ids)
+            self.stdout.write(f'{checked} products checked, {repaired} repaired', ending='\r')
+        self.stdout.write('')
+        bump_catalogue_version()
+        self.stdout.write(self.style.SUCCESS(f'Repaired ratings of {repaired} products.'))
@@ -0,0 +1,166 @@
+import random
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from eshop.cache import bump_catalogue_version
+from eshop.models import Category, Client, Order, OrderItem, Product, Profile, Review
+
+ADJECTIVES = ['Gentle', 'Repair', 'Volume', 'Smooth', 'Hydrate', 'Bond', 'Shine', 'Curl', 'Thick', 'Silk']
+NOUNS = ['Shampoo', 'Conditioner', 'Mask', 'Oil', 'Serum', 'Spray', 'Brush', 'Cream', 'Gel', 'Balm']
+WORDS = ['hair', 'scalp', 'care', 'keratin', 'argan', 'protein', 'colour', 'daily', 'salon', 'vegan',
+         'strength', 'moisture', 'frizz', 'heat', 'protect', 'natural', 'fresh', 'repair', 'shine', 'soft']
+
+
+def batched(items, size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class Command(BaseCommand):
+    help = ('Seeds a deterministic synthetic catalogue (categories, products, users, orders, '
+            'order items, reviews) for load testing and benchmarks.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--categories', type=int, default=20)
+        parser.add_argument('--products', type=int, default=1000)
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--orders', type=int, default=1000)
+        parser.add_argument('--order-items', type=int, default=5000)
+        parser.add_argument('--reviews', type=int, default=2000)
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--prefix', default='bench',
+                            help='Prefix for generated user names and category names.')
+        parser.add_argument('--now', default='2024-01-01T00:00:00+00:00',
+                            help='Generated order and review dates fall in the year before this moment.')
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.prefix = options['prefix']
+        try:
+            self.now = parse_datetime(options['now'])
+        except ValueError:
+            self.now = None
+        if self.now is None:
+            raise CommandError('--now must be an ISO 8601 date and time.')
+        if timezone.is_naive(self.now):
+            self.now = timezone.make_aware(self.now)
+
+        if min(options['categories'], options['products'], options['users']) < 1:
+            raise CommandError('--categories, --products and --users must be at least 1.')
+
+        with transaction.atomic():
+            category_ids = self.seed_categories(options['categories'])
+            product_ids = self.seed_products(options['products'], category_ids)
+            client_ids = self.seed_users(options['users'])
+            order_ids = self.seed_orders(options['orders'], client_ids)
+            if order_ids:
+                self.seed_order_items(options['order_items'], order_ids, product_ids)
+                call_command('backfill_order_totals', start_id=order_ids[0], batch_size=self.batch_size,
+                             stdout=self.stdout)
+                call_command('rebuild_sales_rollups', stdout=self.stdout)
+            self.seed_reviews(options['reviews'], product_ids, client_ids)
+            call_command('repair_product_ratings', batch_size=self.batch_size, stdout=self.stdout)
+            transaction.on_commit(bump_catalogue_version)
+        self.stdout.write(self.style.SUCCESS('Synthetic catalogue seeded.'))
+
+    def write(self, model, objects, total):
+        written = 0
+        for batch in batched(objects, self.batch_size):
+            model.objects.bulk_create(batch, batch_size=self.batch_size)
+            written += len(batch)
+            self.stdout.write(f'{model._meta.verbose_name_plural}: {written}/{total}', ending='\r')
+        self.stdout.write('')
+
+    def past_date(self):
+        return self.now - timedelta(seconds=self.random.randint(0, 365 * 24 * 3600))
+
+    def seed_categories(self, count):
+        names = [f'{self.prefix} {NOUNS[number % len(NOUNS)]} {number}' for number in range(count)]
+        self.write(Category, (Category(name=name, description=f'{name} category') for name in names), count)
+        return list(Category.objects.filter(name__in=names).order_by('id').values_list('id', flat=True))
+
+    def seed_products(self, count, category_ids):
+        start = Product.objects.order_by('-id').values_list('id', flat=True).first() or 0
+        products = (
+            Product(
+                name=f'{self.random.choice(ADJECTIVES)} {self.random.choice(NOUNS)} {number}',
+                description=' '.join(self.random.choices(WORDS, k=12)),
+                one_price=round(self.random.uniform(2, 120), 2),
+                stock_quantity=self.random.randint(0, 500),
+                categories_id=self.random.choice(category_ids),
+            )
+            for number in range(count)
+        )
+        self.write(Product, products, count)
+        return list(Product.objects.filter(id__gt=start).order_by('id').values_list('id', flat=True))
+
+    def seed_users(self, count):
+        password = make_password('password123')
+        usernames = [f'{self.prefix}_user_{number}' for number in range(count)]
+        users = (User(username=name, email=f'{name}@example.com', password=password) for name in usernames)
+        self.write(User, users, count)
+
+        client_ids = []
+        for batch in batched(usernames, self.batch_size):
+            user_ids = list(User.objects.filter(username__in=batch).order_by('id').values_list('id', flat=True))
+            Profile.objects.bulk_create([Profile(user_id=user_id) for user_id in user_ids])
+            Client.objects.bulk_create([Client(user_id=user_id, first_name='Bench', last_name=str(user_id))
+                                        for user_id in user_ids])
+            client_ids.extend(Client.objects.filter(user_id__in=user_ids).order_by('id')
+                              .values_list('id', flat=True))
+        return client_ids
+
+    def seed_orders(self, count, client_ids):
+        start = Order.objects.order_by('-id').values_list('id', flat=True).first() or 0
+        statuses = [status for status, _ in Order.STATUS_ORDER]
+        orders = [
+            Order(clients_id=self.random.choice(client_ids), status=self.random.choice(statuses),
+                  created_date=self.past_date())
+            for _ in range(count)
+        ]
+        dates = [order.created_date for order in orders]
+        self.write(Order, orders, count)
+        order_ids = list(Order.objects.filter(id__gt=start).order_by('id').values_list('id', flat=True))
+        self.backdate(Order, order_ids, dates)
+        return order_ids
+
+    def backdate(self, model, ids, dates):
+        """
+        Įrašo sugeneruotas sukūrimo datas jau įterptiems įrašams. Įterpiant
+        auto_now_add laukas gauna dabartinį laiką, todėl datos atnaujinamos
+        po bulk_create.
+        """
+        model.objects.bulk_update([model(pk=pk, created_date=date) for pk, date in zip(ids, dates)],
+                                  ['created_date'], batch_size=self.batch_size)
+
+    def seed_order_items(self, count, order_ids, product_ids):
+        items = (
+            OrderItem(orders_id=self.random.choice(order_ids), products_id=self.random.choice(product_ids),
+                      quantity=self.random.randint(1, 5))
+            for _ in range(count)
+        )
+        self.write(OrderItem, items, count)
+
+    def seed_reviews(self, count, product_ids, client_ids):
+        reviews = (
+            Review(products_id=self.random.choice(product_ids), clients_id=self.random.choice(client_ids),
+                   rating=self.random.randint(1, 5), comment=' '.join(self.random.choices(WORDS, k=8)),
+                   created_date=self.past_date())
+            for _ in range(count)
+        )
+        self.write(Review, reviews, count)
@@ -0,0 +1,29 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from eshop.outbox import send_batch
+
+
+class Command(BaseCommand):
+    help = 'Sends queued emails from the outbox in batches over one reused connection.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=settings.OUTBOX_BATCH_SIZE)
+        parser.add_argument('--max-attempts', type=int, default=settings.OUTBOX_MAX_ATTEMPTS)
+        parser.add_argument('--loop', action='store_true',
+                            help='Keep polling the outbox instead of exiting when it is empty.')
+        parser.add_argument('--interval', type=float, default=5,
+                            help='Seconds to sleep between polls when the outbox is empty.')
+
+    def handle(self, *args, **options):
+        while True:
+            sent, failed = send_batch(options['batch_size'], options['max_attempts'])
+            if sent or failed:
+                self.stdout.write(f'Sent {sent}, failed {failed}.')
+            if sent + failed == options['batch_size']:
+                continue
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
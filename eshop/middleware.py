@@ -0,0 +1,184 @@
+import json
+import logging
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from .routers import pin_primary, primary_pinned, unpin_primary
+
+logger = logging.getLogger('eshop.performance')
+
+INSTRUMENTATION_DEFAULTS = {
+    'ENABLED': False,
+    'SLOW_REQUEST_MS': 500,
+    'SLOW_QUERY_COUNT': 50,
+    'DUPLICATE_QUERY_THRESHOLD': 5,
+    'TOP_QUERIES': 5,
+    'SERVER_TIMING': True,
+}
+
+
+class QueryRecorder:
+    """
+    Užklausos metu įvykdytų SQL sakinių skaitiklis, prijungiamas per
+    connection.execute_wrapper(). Saugo kiekvieno sakinio trukmę ir
+    pasikartojimų skaičių.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = []
+        self.repeats = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.count += 1
+            self.duration += elapsed
+            self.statements.append((elapsed, context['connection'].alias, sql))
+            self.repeats[sql] += 1
+
+    def slowest(self, limit):
+        return sorted(self.statements, key=lambda statement: statement[0], reverse=True)[:limit]
+
+    def duplicates(self, threshold):
+        return [(sql, count) for sql, count in self.repeats.most_common() if count >= threshold]
+
+
+class QueryInstrumentationMiddleware:
+    """
+    Matuoja kiekvienos užklausos SQL sakinių skaičių ir trukmę. Rezultatai
+    grąžinami Server-Timing antraštėje, o lėtos užklausos ir pasikartojantys
+    sakiniai (N+1) įrašomi į "eshop.performance" žurnalą. Įjungiama
+    ESHOP_INSTRUMENTATION['ENABLED'] nustatymu; išjungta nenaudoja jokių
+    resursų, nes Django jos visai neįtraukia į grandinę.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.config = {**INSTRUMENTATION_DEFAULTS, **getattr(settings, 'ESHOP_INSTRUMENTATION', {})}
+        if not self.config['ENABLED']:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        recorder = QueryRecorder()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            self.install(stack, recorder)
+            response = self.get_response(request)
+        return self.finish(request, response, recorder, started)
+
+    async def __acall__(self, request):
+        """
+        Asinchroninės užklausos SQL vykdomas užklausos sync_to_async gijoje,
+        todėl skaitiklis prijungiamas prie tos gijos jungčių.
+        """
+        recorder = QueryRecorder()
+        started = time.perf_counter()
+        stack = ExitStack()
+        await sync_to_async(self.install)(stack, recorder)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+        return self.finish(request, response, recorder, started)
+
+    def install(self, stack, recorder):
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(recorder))
+
+    def finish(self, request, response, recorder, started):
+        total_ms = (time.perf_counter() - started) * 1000
+        sql_ms = recorder.duration * 1000
+
+        if self.config['SERVER_TIMING']:
+            response['Server-Timing'] = (
+                f'db;dur={sql_ms:.1f};desc="{recorder.count} queries", app;dur={total_ms:.1f}'
+            )
+
+        duplicates = recorder.duplicates(self.config['DUPLICATE_QUERY_THRESHOLD'])
+        if (total_ms >= self.config['SLOW_REQUEST_MS']
+                or recorder.count >= self.config['SLOW_QUERY_COUNT']
+                or duplicates):
+            self.log(request, response, recorder, total_ms, sql_ms, duplicates)
+        return response
+
+    def log(self, request, response, recorder, total_ms, sql_ms, duplicates):
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'duration_ms': round(total_ms, 1),
+            'sql_ms': round(sql_ms, 1),
+            'queries': recorder.count,
+            'slowest': [
+                {'ms': round(elapsed * 1000, 2), 'db': alias, 'sql': sql}
+                for elapsed, alias, sql in recorder.slowest(self.config['TOP_QUERIES'])
+            ],
+            'duplicates': [{'count': count, 'sql': sql} for sql, count in duplicates],
+        }
+        logger.warning(json.dumps(record), extra={'performance': record})
+
+
+class ReplicaPinningMiddleware:
+    """
+    Riboja eshop.routers prisirišimą prie pagrindinės bazės viena užklausa.
+    Ne GET/HEAD užklausos iš karto skaito iš pagrindinės bazės, o po
+    užklausos, kuri ką nors įrašė, klientui nustatomas trumpalaikis slapukas,
+    kad ir kitos jo užklausos (pvz., po nukreipimo) matytų pakeitimus, kol
+    kopijos juos gauna. Be DATABASE_REPLICAS į grandinę neįtraukiama.
+    """
+    cookie_name = 'eshop_primary'
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'DATABASE_REPLICAS', None):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = self.pin(request)
+        try:
+            response = self.get_response(request)
+            self.remember(request, response)
+        finally:
+            unpin_primary(token)
+        return response
+
+    async def __acall__(self, request):
+        token = self.pin(request)
+        try:
+            response = await self.get_response(request)
+            self.remember(request, response)
+        finally:
+            unpin_primary(token)
+        return response
+
+    def pin(self, request):
+        return pin_primary(self.cookie_name in request.COOKIES or request.method not in ('GET', 'HEAD'))
+
+    def remember(self, request, response):
+        if primary_pinned() and self.cookie_name not in request.COOKIES:
+            response.set_cookie(self.cookie_name, '1', max_age=settings.REPLICA_PIN_SECONDS,
+                                httponly=True, samesite='Lax')
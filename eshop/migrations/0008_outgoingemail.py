@@ -0,0 +1,35 @@
+# Generated by Django 4.2.19 on 2026-10-18 01:35
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('eshop', '0007_alter_client_address_alter_client_phone_number'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutgoingEmail',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('subject', models.CharField(max_length=255, verbose_name='Subject')),
+                ('body', models.TextField(verbose_name='Body')),
+                ('from_email', models.CharField(max_length=255, verbose_name='From')),
+                ('recipients', models.TextField(help_text='Comma separated email addresses', verbose_name='Recipients')),
+                ('status', models.CharField(choices=[('Pending', 'Pending'), ('Sent', 'Sent'), ('Failed', 'Failed')], default='Pending', max_length=10, verbose_name='Status')),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('next_attempt_date', models.DateTimeField(default=django.utils.timezone.now)),
+                ('last_error', models.TextField(blank=True)),
+                ('created_date', models.DateTimeField(auto_now_add=True)),
+                ('sent_date', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Outgoing email',
+                'verbose_name_plural': 'Outgoing emails',
+                'indexes': [models.Index(fields=['status', 'next_attempt_date'], name='eshop_outgo_status_538b12_idx')],
+            },
+        ),
+    ]
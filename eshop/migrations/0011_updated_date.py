@@ -0,0 +1,27 @@
+# Generated by Django 4.2.19 on 2026-10-18 01:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('eshop', '0010_cart'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='updated_date',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='updated_date',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['categories', 'updated_date'], name='eshop_produ_categor_7a48dd_idx'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.19 on 2026-10-18 01:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('eshop', '0011_updated_date'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['clients', 'status'], name='eshop_order_clients_9c83da_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['created_date'], name='eshop_order_created_8d8129_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='orderitem',
+            index=models.Index(fields=['orders', 'products'], name='eshop_order_orders__8eb4cc_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['name'], name='eshop_produ_name_235579_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['products', 'created_date'], name='eshop_revie_product_881be3_idx'),
+        ),
+        # Registration looks users up by email; auth.User has no index on it.
+        migrations.RunSQL(
+            'CREATE INDEX IF NOT EXISTS eshop_auth_user_email_idx ON auth_user (email)',
+            'DROP INDEX IF EXISTS eshop_auth_user_email_idx',
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.19 on 2026-10-18 01:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('eshop', '0012_hot_lookup_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='sku',
+            field=models.CharField(blank=True, help_text='Stable supplier code used by catalogue imports', max_length=64, null=True, unique=True, verbose_name='SKU'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.19 on 2026-10-18 01:51
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('eshop', '0013_product_sku'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockReservation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.PositiveIntegerField()),
+                ('expires_date', models.DateTimeField(db_index=True)),
+                ('carts', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reservations', to='eshop.cart')),
+                ('products', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reservations', to='eshop.product')),
+            ],
+            options={
+                'verbose_name': 'Stock reservation',
+                'verbose_name_plural': 'Stock reservations',
+                'indexes': [models.Index(fields=['products', 'expires_date'], name='eshop_stock_product_6ea235_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='stockreservation',
+            constraint=models.UniqueConstraint(fields=('carts', 'products'), name='unique_cart_reservation'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.19 on 2026-10-18 01:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('eshop', '0014_stockreservation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='item_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Items'),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='total',
+            field=models.FloatField(default=0, verbose_name='Total'),
+        ),
+        migrations.AddField(
+            model_name='orderitem',
+            name='unit_price',
+            field=models.FloatField(blank=True, null=True, verbose_name='Unit price'),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 4.2.19 on 2026-10-18 01:54
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('eshop', '0015_order_totals'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyProductSales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('units', models.IntegerField(default=0)),
+                ('revenue', models.FloatField(default=0)),
+                ('order_count', models.IntegerField(default=0)),
+                ('products', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to='eshop.product')),
+            ],
+            options={
+                'verbose_name': 'Daily product sales',
+                'verbose_name_plural': 'Daily product sales',
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyCategorySales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('units', models.IntegerField(default=0)),
+                ('revenue', models.FloatField(default=0)),
+                ('order_count', models.IntegerField(default=0)),
+                ('categories', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to='eshop.category')),
+            ],
+            options={
+                'verbose_name': 'Daily category sales',
+                'verbose_name_plural': 'Daily category sales',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='dailyproductsales',
+            constraint=models.UniqueConstraint(fields=('date', 'products'), name='unique_daily_product_sales'),
+        ),
+        migrations.AddConstraint(
+            model_name='dailycategorysales',
+            constraint=models.UniqueConstraint(fields=('date', 'categories'), name='unique_daily_category_sales'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.19 on 2026-10-18 02:33
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('eshop', '0017_product_ratings'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageDerivativeJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True, verbose_name='Image')),
+                ('status', models.CharField(choices=[('Pending', 'Pending'), ('Failed', 'Failed')], default='Pending', max_length=10, verbose_name='Status')),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('next_attempt_date', models.DateTimeField(default=django.utils.timezone.now)),
+                ('last_error', models.TextField(blank=True)),
+                ('created_date', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Image derivative job',
+                'verbose_name_plural': 'Image derivative jobs',
+                'indexes': [models.Index(fields=['status', 'next_attempt_date'], name='eshop_image_status_0a0f0d_idx')],
+            },
+        ),
+    ]
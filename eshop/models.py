@@ -1,6 +1,6 @@
-from django.db import models
+from django.db import models, transaction
+from django.utils import timezone
 from django.contrib.auth.models import User
-from PIL import Image
 
 
 class Client(models.Model):
@@ -29,6 +29,7 @@ class Category(models.Model):
     name = models.CharField('Name', max_length=255)
     description = models.TextField('Category description', max_length=2000, default='Category description etc.')
     foto = models.ImageField('Foto', upload_to='foto', null=True, blank=True)
+    updated_date = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         verbose_name = 'Category'
@@ -41,17 +42,30 @@ class Category(models.Model):
 class Product(models.Model):
     """
     Produktas su pavadinimu, aprašymu, kaina, kiekiu sandėlyje, kategorija, foto.
+    Atsiliepimų skaičius, vertinimų suma ir vidurkis saugomi produkte ir
+    atnaujinami kartu su atsiliepimais.
     """
+    sku = models.CharField('SKU', max_length=64, unique=True, null=True, blank=True,
+                           help_text='Stable supplier code used by catalogue imports')
     name = models.CharField('Name', max_length=255)
     description = models.TextField('Product description', max_length=2000, default='Product description etc.')
     one_price = models.FloatField()
     stock_quantity = models.IntegerField()
     categories = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='products')
     foto = models.ImageField('Foto', upload_to='foto', null=True, blank=True)
+    updated_date = models.DateTimeField(auto_now=True, db_index=True)
+    rating_count = models.PositiveIntegerField('Reviews', default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
+    rating_average = models.FloatField('Rating', default=0)
 
     class Meta:
         verbose_name = 'Product'
         verbose_name_plural = 'Products'
+        indexes = [
+            models.Index(fields=['categories', 'updated_date']),
+            models.Index(fields=['name']),
+            models.Index(fields=['-rating_average', 'id']),
+        ]
 
     def __str__(self):
         return self.name
@@ -59,7 +73,8 @@ class Product(models.Model):
 
 class Order(models.Model):
     """
-    Užsakymas, turintis statusą, klientą ir sukūrimo datą.
+    Užsakymas, turintis statusą, klientą ir sukūrimo datą. Prekių
+    skaičius ir suma išsaugomi užsakymo metu.
     """
     STATUS_ORDER = [
         ('Pending', 'Pending'),
@@ -74,10 +89,16 @@ class Order(models.Model):
                               help_text='Order is pending')
     clients = models.ForeignKey(Client, on_delete=models.CASCADE)
     created_date = models.DateTimeField(auto_now_add=True)
+    item_count = models.PositiveIntegerField('Items', default=0)
+    total = models.FloatField('Total', default=0)
 
     class Meta:
         verbose_name = 'Order'
         verbose_name_plural = 'Orders'
+        indexes = [
+            models.Index(fields=['clients', 'status']),
+            models.Index(fields=['created_date']),
+        ]
 
     def __str__(self):
         return f"Order {self.pk} - {self.clients}"
@@ -85,12 +106,19 @@ class Order(models.Model):
 
 class OrderItem(models.Model):
     """
-    Užsakymo prekių detalės, įskaitant prekę ir jos kiekį.
+    Užsakymo prekių detalės, įskaitant prekę, jos kiekį ir vieneto kainą
+    pirkimo metu.
     """
     products = models.ForeignKey(Product, on_delete=models.CASCADE)
     quantity = models.IntegerField()
+    unit_price = models.FloatField('Unit price', null=True, blank=True)
     orders = models.ForeignKey(Order, on_delete=models.CASCADE)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['orders', 'products']),
+        ]
+
     def __str__(self):
         return f"{self.products.name} - {self.quantity} pcs"
 
@@ -105,9 +133,22 @@ class Review(models.Model):
     comment = models.TextField()
     created_date = models.DateTimeField()
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['products', 'created_date']),
+        ]
+
     def __str__(self):
         return f"Review by {self.clients} for {self.products.name}"
 
+    def save(self, *args, **kwargs):
+        """
+        Įrašo atsiliepimą transakcijoje, kad produkto vertinimą atnaujinantys
+        pre_save ir post_save signalai būtų vykdomi kartu su įrašymu.
+        """
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
 
 class Profile(models.Model):
     """
@@ -119,10 +160,167 @@ class Profile(models.Model):
     def __str__(self):
         return f'{self.user.username} profile'
 
-    def save(self, *args, **kwargs):
-        super().save(*args, **kwargs)
-        if self.picture.path:
-            img = Image.open(self.picture.path)
-            thumb_size = (150, 150)
-            img.thumbnail(thumb_size)
-            img.save(self.picture.path)
+
+class Cart(models.Model):
+    """
+    Vartotojo pirkinių krepšelis. Neprisijungusio vartotojo krepšelis neturi
+    vartotojo ir yra susietas su sesija, o prisijungus sujungiamas su
+    vartotojo krepšeliu.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, null=True, blank=True)
+    created_date = models.DateTimeField(auto_now_add=True)
+    updated_date = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Cart'
+        verbose_name_plural = 'Carts'
+
+    def __str__(self):
+        return f"Cart {self.pk} - {self.user_id or 'anonymous'}"
+
+
+class CartItem(models.Model):
+    """
+    Krepšelio eilutė: prekė ir jos kiekis. Kaina neišsaugoma - sumos
+    skaičiuojamos pagal dabartinę prekės kainą.
+    """
+    carts = models.ForeignKey(Cart, on_delete=models.CASCADE, related_name='items')
+    products = models.ForeignKey(Product, on_delete=models.CASCADE)
+    quantity = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['carts', 'products'], name='unique_cart_product'),
+        ]
+
+    def __str__(self):
+        return f"{self.products_id} - {self.quantity} pcs"
+
+
+class StockReservation(models.Model):
+    """
+    Krepšelio prekės rezervacija: kiekis laikomas krepšeliui iki
+    expires_date. Laisvas prekės kiekis yra sandėlio kiekis, atėmus kitų
+    krepšelių galiojančias rezervacijas.
+    """
+    carts = models.ForeignKey(Cart, on_delete=models.CASCADE, related_name='reservations')
+    products = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='reservations')
+    quantity = models.PositiveIntegerField()
+    expires_date = models.DateTimeField(db_index=True)
+
+    class Meta:
+        verbose_name = 'Stock reservation'
+        verbose_name_plural = 'Stock reservations'
+        constraints = [
+            models.UniqueConstraint(fields=['carts', 'products'], name='unique_cart_reservation'),
+        ]
+        indexes = [
+            models.Index(fields=['products', 'expires_date']),
+        ]
+
+    def __str__(self):
+        return f"{self.products_id} - {self.quantity} pcs until {self.expires_date}"
+
+
+class DailyProductSales(models.Model):
+    """
+    Vienos prekės pardavimai per dieną: parduoti vienetai, pajamos ir
+    užsakymų skaičius. Atnaujinama, kai užsakymas tampa įvykdytu.
+    """
+    date = models.DateField()
+    products = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='daily_sales')
+    units = models.IntegerField(default=0)
+    revenue = models.FloatField(default=0)
+    order_count = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name = 'Daily product sales'
+        verbose_name_plural = 'Daily product sales'
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'products'], name='unique_daily_product_sales'),
+        ]
+
+    def __str__(self):
+        return f"{self.date} {self.products_id}: {self.units} pcs, {self.revenue} Eur"
+
+
+class DailyCategorySales(models.Model):
+    """
+    Vienos kategorijos pardavimai per dieną.
+    """
+    date = models.DateField()
+    categories = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='daily_sales')
+    units = models.IntegerField(default=0)
+    revenue = models.FloatField(default=0)
+    order_count = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name = 'Daily category sales'
+        verbose_name_plural = 'Daily category sales'
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'categories'], name='unique_daily_category_sales'),
+        ]
+
+    def __str__(self):
+        return f"{self.date} {self.categories_id}: {self.units} pcs, {self.revenue} Eur"
+
+
+class ImageDerivativeJob(models.Model):
+    """
+    Įkelto paveikslėlio sumažintų kopijų kūrimo užduotis. Įrašoma toje
+    pačioje transakcijoje kaip ir paveikslėlis, o atliekama foninio
+    proceso (build_image_derivatives --queue), todėl neprarandama
+    perkrovus serverį.
+    """
+    STATUS_JOB = [
+        ('Pending', 'Pending'),
+        ('Failed', 'Failed'),
+    ]
+    name = models.CharField('Image', max_length=255, unique=True)
+    status = models.CharField('Status', max_length=10, choices=STATUS_JOB, default='Pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_date = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_date = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Image derivative job'
+        verbose_name_plural = 'Image derivative jobs'
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_date']),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.status})"
+
+
+class OutgoingEmail(models.Model):
+    """
+    El. laiškas, laukiantis išsiuntimo. Laiškai įrašomi toje pačioje
+    transakcijoje kaip ir užsakymas, o išsiunčiami foninio proceso.
+    """
+    STATUS_EMAIL = [
+        ('Pending', 'Pending'),
+        ('Sent', 'Sent'),
+        ('Failed', 'Failed'),
+    ]
+    subject = models.CharField('Subject', max_length=255)
+    body = models.TextField('Body')
+    from_email = models.CharField('From', max_length=255)
+    recipients = models.TextField('Recipients', help_text='Comma separated email addresses')
+    status = models.CharField('Status', max_length=10, choices=STATUS_EMAIL, default='Pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_date = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_date = models.DateTimeField(auto_now_add=True)
+    sent_date = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Outgoing email'
+        verbose_name_plural = 'Outgoing emails'
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_date']),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} -> {self.recipients} ({self.status})"
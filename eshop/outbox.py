@@ -0,0 +1,109 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.utils import timezone
+
+from .models import OutgoingEmail
+
+
+def queue_email(subject, body, recipients, from_email=None):
+    """
+    Funkcija įrašo el. laišką į siuntimo eilę. Kviečiama transakcijos viduje,
+    todėl laiškas išsaugomas tik tada, kai išsaugomas ir pats užsakymas.
+    """
+    return OutgoingEmail.objects.create(
+        subject=subject,
+        body=body,
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+        recipients=','.join(recipients),
+    )
+
+
+def retry_delay(attempts):
+    """
+    Funkcija grąžina laukimo laiką iki kito bandymo: jis dvigubėja po
+    kiekvieno nesėkmingo bandymo, bet neviršija OUTBOX_MAX_RETRY_DELAY.
+    """
+    delay = settings.OUTBOX_RETRY_DELAY * 2 ** (attempts - 1)
+    return timedelta(seconds=min(delay, settings.OUTBOX_MAX_RETRY_DELAY))
+
+
+def claim_batch(batch_size):
+    """
+    Funkcija paima paketą laiškų, kurių siuntimo laikas jau atėjo.
+    Kiekvienas laiškas paimamas sąlyginiu UPDATE: kitas bandymas
+    nukeliamas OUTBOX_CLAIM_TIMEOUT sekundėmis tik jei laiškas vis dar
+    laukia ir jo laikas atėjęs. Grąžinami tik laiškai, kuriuos pavyko
+    paimti, todėl keli siuntėjai (ir SQLite, kuris nepalaiko
+    select_for_update) nesiunčia to paties laiško, o nutrūkusio siuntėjo
+    laiškai po šio laiko vėl paimami.
+    """
+    now = timezone.now()
+    lease = now + timedelta(seconds=settings.OUTBOX_CLAIM_TIMEOUT)
+    due = OutgoingEmail.objects.filter(status='Pending', next_attempt_date__lte=now)
+    candidates = list(due.order_by('next_attempt_date', 'id').values_list('pk', flat=True)[:batch_size])
+    claimed = [pk for pk in candidates if due.filter(pk=pk).update(next_attempt_date=lease)]
+    emails = OutgoingEmail.objects.in_bulk(claimed)
+    return [emails[pk] for pk in claimed]
+
+
+def send_batch(batch_size=None, max_attempts=None):
+    """
+    Funkcija išsiunčia vieną laiškų paketą per vieną SMTP (ar kitą
+    EMAIL_BACKEND) jungtį ir užfiksuoja kiekvieno laiško būseną.
+    Nepavykę laiškai atidedami vėlesniam bandymui, o išnaudojus bandymus
+    pažymimi kaip "Failed". Grąžina (išsiųsta, nepavyko) porą.
+    """
+    batch_size = batch_size or settings.OUTBOX_BATCH_SIZE
+    max_attempts = max_attempts or settings.OUTBOX_MAX_ATTEMPTS
+    emails = claim_batch(batch_size)
+    if not emails:
+        return 0, 0
+
+    sent = failed = 0
+    connection = get_connection()
+    try:
+        connection.open()
+    except Exception as error:
+        for email in emails:
+            mark_failed(email, error, max_attempts)
+        return 0, len(emails)
+
+    try:
+        for email in emails:
+            message = EmailMessage(
+                email.subject,
+                email.body,
+                email.from_email,
+                email.recipients.split(','),
+                connection=connection,
+            )
+            try:
+                message.send()
+            except Exception as error:
+                mark_failed(email, error, max_attempts)
+                failed += 1
+            else:
+                email.status = 'Sent'
+                email.attempts += 1
+                email.sent_date = timezone.now()
+                email.last_error = ''
+                email.save(update_fields=['status', 'attempts', 'sent_date', 'last_error'])
+                sent += 1
+    finally:
+        connection.close()
+    return sent, failed
+
+
+def mark_failed(email, error, max_attempts):
+    """
+    Funkcija užfiksuoja nesėkmingą siuntimo bandymą ir suplanuoja kitą.
+    """
+    email.attempts += 1
+    email.last_error = str(error)
+    if email.attempts >= max_attempts:
+        email.status = 'Failed'
+    else:
+        email.next_attempt_date = timezone.now() + retry_delay(email.attempts)
+    email.save(update_fields=['status', 'attempts', 'next_attempt_date', 'last_error'])
@@ -0,0 +1,189 @@
+from django.conf import settings
+from django.core import signing
+from django.core.paginator import Paginator
+from django.utils.functional import cached_property
+from rest_framework.pagination import CursorPagination
+from django.db.models import Q
+
+CURSOR_SALT = 'eshop.pagination.cursor'
+COUNT_LIMIT = 10000
+
+
+class CursorPage:
+    """
+    Vienas puslapis, gautas puslapiuojant pagal raktą (keyset). Turi
+    nepermatomus žetonus kitam ir ankstesniam puslapiui, bet neturi puslapių
+    skaičiaus, nes jam reikėtų COUNT(*) užklausos.
+    """
+    cursor_mode = True
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+
+def _position(obj, ordering):
+    return [getattr(obj, field.lstrip('-')) for field in ordering]
+
+
+def _after(ordering, values):
+    """
+    Funkcija sudaro sąlygą "eilutė yra po nurodytos pozicijos" pagal
+    rikiavimo laukus, pvz. (a > x) OR (a = x AND b > y).
+    """
+    condition = Q()
+    for index, field in enumerate(ordering):
+        name = field.lstrip('-')
+        lookup = 'lt' if field.startswith('-') else 'gt'
+        step = Q(**{f'{name}__{lookup}': values[index]})
+        for previous, value in zip(ordering[:index], values[:index]):
+            step &= Q(**{previous.lstrip('-'): value})
+        condition |= step
+    return condition
+
+
+def _reverse(ordering):
+    return [field[1:] if field.startswith('-') else f'-{field}' for field in ordering]
+
+
+def encode_cursor(values, direction, ordering):
+    return signing.dumps({'v': values, 'd': direction, 'o': list(ordering)}, salt=CURSOR_SALT, compress=True)
+
+
+def decode_cursor(cursor, ordering):
+    """
+    Funkcija iššifruoja žetoną. Žetonas, sudarytas kitam rikiavimui (pvz.,
+    pakeitus ?sort=), laikomas netinkamu, kaip ir suklastotas - tada
+    rodomas pirmas puslapis.
+    """
+    try:
+        data = signing.loads(cursor, salt=CURSOR_SALT)
+        values, direction = data['v'], data['d']
+        if data['o'] != list(ordering) or len(values) != len(ordering):
+            return None, None
+        return values, direction
+    except (signing.BadSignature, KeyError, TypeError):
+        return None, None
+
+
+def _cursor_query(queryset, cursor, per_page, ordering):
+    values, direction = decode_cursor(cursor, ordering) if cursor else (None, None)
+    if direction == 'previous':
+        queryset = queryset.filter(_after(_reverse(ordering), values)).order_by(*_reverse(ordering))
+    else:
+        if direction == 'next':
+            queryset = queryset.filter(_after(ordering, values))
+        queryset = queryset.order_by(*ordering)
+    return queryset[:per_page + 1], direction
+
+
+def _cursor_page(rows, direction, per_page, ordering):
+    has_more = len(rows) > per_page
+    if direction == 'previous':
+        rows = rows[:per_page][::-1]
+        next_cursor = encode_cursor(_position(rows[-1], ordering), 'next', ordering) if rows else None
+        previous_cursor = encode_cursor(_position(rows[0], ordering), 'previous', ordering) if has_more else None
+        return CursorPage(rows, next_cursor, previous_cursor)
+
+    rows = rows[:per_page]
+    next_cursor = encode_cursor(_position(rows[-1], ordering), 'next', ordering) if has_more else None
+    previous_cursor = (encode_cursor(_position(rows[0], ordering), 'previous', ordering)
+                       if direction == 'next' and rows else None)
+    return CursorPage(rows, next_cursor, previous_cursor)
+
+
+def cursor_paginate(queryset, cursor, per_page, ordering=('id',)):
+    """
+    Funkcija grąžina vieną CursorPage puslapį. Vietoje OFFSET naudojama
+    sąlyga pagal paskutinio matyto įrašo rikiavimo laukų reikšmes, todėl
+    bet kuris puslapis kainuoja tiek pat, kiek pirmasis. Paskutinis
+    rikiavimo laukas turi būti unikalus.
+    """
+    ordering = list(ordering)
+    queryset, direction = _cursor_query(queryset, cursor, per_page, ordering)
+    return _cursor_page(list(queryset), direction, per_page, ordering)
+
+
+async def acursor_paginate(queryset, cursor, per_page, ordering=('id',)):
+    """
+    Asinchroninė cursor_paginate versija (async ORM).
+    """
+    ordering = list(ordering)
+    queryset, direction = _cursor_query(queryset, cursor, per_page, ordering)
+    return _cursor_page([row async for row in queryset], direction, per_page, ordering)
+
+
+def paginate_catalogue(request, queryset, per_page, ordering=('id',)):
+    """
+    Funkcija puslapiuoja katalogo produktus pagal CATALOGUE_PAGINATION
+    nustatymą: "offset" - įprastas Paginator su puslapių numeriais,
+    "cursor" - puslapiavimas pagal raktą be COUNT(*) užklausos.
+    """
+    if settings.CATALOGUE_PAGINATION == 'cursor':
+        return cursor_paginate(queryset, request.GET.get('cursor'), per_page, ordering)
+    paginator = Paginator(queryset.order_by(*ordering), per_page)
+    return paginator.get_page(request.GET.get('page'))
+
+
+async def apaginate(queryset, per_page, number):
+    """
+    Asinchroninis Paginator.get_page(): eilučių skaičius ir puslapio
+    eilutės gaunamos async ORM užklausomis, todėl šablonas puslapio
+    duomenų bazėje nebeskaito.
+    """
+    paginator = Paginator(queryset, per_page)
+    paginator.count = await queryset.acount()
+    page = paginator.get_page(number)
+    page.object_list = [row async for row in page.object_list]
+    return page
+
+
+async def apaginate_catalogue(request, queryset, per_page, ordering=('id',)):
+    """
+    Asinchroninė paginate_catalogue versija.
+    """
+    if settings.CATALOGUE_PAGINATION == 'cursor':
+        return await acursor_paginate(queryset, request.GET.get('cursor'), per_page, ordering)
+    return await apaginate(queryset.order_by(*ordering), per_page, request.GET.get('page'))
+
+
+class CappedCountPaginator(Paginator):
+    """
+    Puslapiuotojas, kuris skaičiuoja ne daugiau nei COUNT_LIMIT eilučių.
+    COUNT(*) vykdomas per LIMIT použklausą, todėl didelėje lentelėje
+    nereikia nuskaityti visų eilučių. Toliau už ribą esančių puslapių
+    nerodoma - reikia susiaurinti paiešką ar filtrus.
+    """
+    count_limit = COUNT_LIMIT
+
+    @cached_property
+    def count(self):
+        if isinstance(self.object_list, list):
+            return len(self.object_list)
+        return self.object_list[:self.count_limit].count()
+
+
+class ApiCursorPagination(CursorPagination):
+    """
+    API sąrašų puslapiavimas pagal raktą (id). Puslapio dydį galima keisti
+    page_size parametru, bet ne daugiau nei API_MAX_PAGE_SIZE.
+    """
+    ordering = 'id'
+    page_size_query_param = 'page_size'
+
+    @property
+    def max_page_size(self):
+        return settings.API_MAX_PAGE_SIZE
@@ -0,0 +1,45 @@
+from django.db.models import Case, Count, F, FloatField, Sum, When
+from django.db.models.functions import Cast
+from django.utils import timezone
+
+from .models import Product, Review
+
+
+def adjust_rating(product_id, count, total):
+    """
+    Funkcija pakeičia produkto atsiliepimų skaičių ir vertinimų sumą
+    nurodytais pokyčiais viena UPDATE užklausa ir perskaičiuoja vidurkį.
+    F() išraiškos naudoja esamas stulpelių reikšmes, todėl lygiagretūs
+    pakeitimai neprarandami.
+    """
+    Product.objects.filter(pk=product_id).update(
+        rating_count=F('rating_count') + count,
+        rating_sum=F('rating_sum') + total,
+        rating_average=Case(
+            When(rating_count=-count, then=0.0),
+            default=Cast(F('rating_sum') + total, FloatField()) / (F('rating_count') + count),
+        ),
+        updated_date=timezone.now(),
+    )
+
+
+def repair_ratings(product_ids):
+    """
+    Funkcija perskaičiuoja nurodytų produktų vertinimus iš atsiliepimų
+    lentelės viena agreguojančia užklausa. Grąžina pataisytų produktų
+    skaičių.
+    """
+    totals = {row['products_id']: row for row in
+              Review.objects.filter(products_id__in=product_ids)
+              .values('products_id').annotate(count=Count('id'), total=Sum('rating')).order_by()}
+    products = []
+    for product in Product.objects.filter(pk__in=product_ids).only('id', 'rating_count', 'rating_sum', 'rating_average'):
+        row = totals.get(product.pk, {'count': 0, 'total': 0})
+        average = row['total'] / row['count'] if row['count'] else 0
+        if (product.rating_count, product.rating_sum, product.rating_average) != (row['count'], row['total'], average):
+            product.rating_count = row['count']
+            product.rating_sum = row['total']
+            product.rating_average = average
+            products.append(product)
+    Product.objects.bulk_update(products, ['rating_count', 'rating_sum', 'rating_average'])
+    return len(products)
@@ -0,0 +1,60 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import StockReservation
+
+
+def reservation_expiry():
+    return timezone.now() + timedelta(seconds=settings.CART_RESERVATION_TTL)
+
+
+def held_by_others(cart, product=OuterRef('pk')):
+    """
+    Išraiška, grąžinanti kitų krepšelių galiojančių prekės rezervacijų
+    sumą. Naudojamas (products, expires_date) indeksas, todėl vienai
+    prekei nuskaitomos tik jos rezervacijos.
+    """
+    holds = StockReservation.objects.filter(products=product, expires_date__gt=timezone.now())
+    if cart is not None:
+        holds = holds.exclude(carts=cart)
+    total = holds.order_by().values('products').annotate(total=Sum('quantity')).values('total')
+    return Coalesce(Subquery(total), Value(0))
+
+
+def hold_stock(cart, quantities):
+    """
+    Funkcija įrašo ar atnaujina krepšelio rezervacijas ({produkto ID:
+    kiekis}) su nauju galiojimo laiku. Nulinis kiekis rezervaciją
+    pašalina. Kviečiama toje pačioje transakcijoje, kurioje patikrintas
+    laisvas kiekis.
+    """
+    removed = [product_id for product_id, quantity in quantities.items() if quantity == 0]
+    if removed:
+        StockReservation.objects.filter(carts=cart, products_id__in=removed).delete()
+    expires_date = reservation_expiry()
+    StockReservation.objects.bulk_create(
+        [StockReservation(carts=cart, products_id=product_id, quantity=quantity, expires_date=expires_date)
+         for product_id, quantity in quantities.items() if quantity > 0],
+        update_conflicts=True,
+        unique_fields=['carts', 'products'],
+        update_fields=['quantity', 'expires_date'],
+    )
+
+
+def release_expired_reservations(batch_size=1000):
+    """
+    Funkcija ištrina pasibaigusias rezervacijas paketais, kad ilgas
+    DELETE neužrakintų lentelės. Grąžina ištrintų rezervacijų skaičių.
+    """
+    now = timezone.now()
+    released = 0
+    while True:
+        ids = list(StockReservation.objects.filter(expires_date__lte=now)
+                   .values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return released
+        released += StockReservation.objects.filter(id__in=ids).delete()[0]
@@ -0,0 +1,53 @@
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+REPLICATED_MODELS = {'eshop.product', 'eshop.category', 'eshop.review'}
+
+_primary_pinned = ContextVar('eshop_primary_pinned', default=False)
+
+
+def pin_primary(pinned=True):
+    """
+    Nuo šiol (iki užklausos pabaigos) visi skaitymai vykdomi pagrindinėje
+    duomenų bazėje. Grąžina žymę, kuria būseną galima atstatyti.
+    """
+    return _primary_pinned.set(pinned)
+
+
+def unpin_primary(token):
+    _primary_pinned.reset(token)
+
+
+def primary_pinned():
+    return _primary_pinned.get()
+
+
+class ReplicaRouter:
+    """
+    Katalogo modelių (Product, Category, Review) skaitymus siunčia į
+    atsitiktinę DATABASE_REPLICAS kopiją, o visus kitus skaitymus ir visus
+    įrašymus - į pagrindinę bazę. Po pirmo įrašymo, taip pat atviros
+    transakcijos metu skaitoma iš pagrindinės bazės, kad užklausa matytų
+    savo pakeitimus.
+    """
+
+    def db_for_read(self, model, **hints):
+        if not settings.DATABASE_REPLICAS or model._meta.label_lower not in REPLICATED_MODELS:
+            return DEFAULT_DB_ALIAS
+        if _primary_pinned.get() or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def db_for_write(self, model, **hints):
+        if settings.DATABASE_REPLICAS and not _primary_pinned.get():
+            _primary_pinned.set(True)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
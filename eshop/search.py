@@ -0,0 +1,100 @@
+import re
+
+from django.db import connections
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from .models import Product
+
+FTS_TABLE = 'eshop_product_fts'
+
+FTS_SCHEMA = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        name, description,
+        content='eshop_product', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_insert AFTER INSERT ON eshop_product BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, name, description) VALUES (new.id, new.name, new.description);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_delete AFTER DELETE ON eshop_product BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, description)
+        VALUES ('delete', old.id, old.name, old.description);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_update AFTER UPDATE OF name, description ON eshop_product BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, description)
+        VALUES ('delete', old.id, old.name, old.description);
+        INSERT INTO {FTS_TABLE}(rowid, name, description) VALUES (new.id, new.name, new.description);
+    END""",
+]
+
+FTS_TRIGGERS = [f'{FTS_TABLE}_insert', f'{FTS_TABLE}_delete', f'{FTS_TABLE}_update']
+
+# Name matches weigh more than description matches in the bm25 ranking.
+FTS_RANK = f'bm25({FTS_TABLE}, 10.0, 1.0)'
+
+
+def uses_fts(connection):
+    return connection.vendor == 'sqlite'
+
+
+def install_search_index(connection, rebuild=False):
+    """
+    Funkcija sukuria pilno teksto paieškos lentelę ir trigerius, kurie ją
+    sinchronizuoja su produktų lentele. SQLite ištrina trigerius, kai
+    migracija perkuria produktų lentelę, todėl trūkstami trigeriai
+    sukuriami iš naujo ir indeksas perstatomas.
+    """
+    if not uses_fts(connection):
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'eshop_product'"
+        )
+        existing = {row[0] for row in cursor.fetchall()}
+        if not set(FTS_TRIGGERS) <= existing:
+            rebuild = True
+        for statement in FTS_SCHEMA:
+            cursor.execute(statement)
+        if rebuild:
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def rebuild_search_index(using='default'):
+    """
+    Funkcija perstato pilno teksto paieškos indeksą iš produktų lentelės.
+    """
+    install_search_index(connections[using], rebuild=True)
+
+
+def search_terms(query):
+    """
+    Funkcija paverčia vartotojo užklausą saugia FTS5 užklausa: kiekvienas
+    žodis ieškomas kaip priešdėlis, o visi žodžiai turi atitikti.
+    """
+    words = re.findall(r'\w+', query or '')
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def search_products(query):
+    """
+    Funkcija grąžina produktus, atitinkančius užklausą pagal pavadinimą ir
+    aprašymą, surikiuotus pagal atitikimą. SQLite naudoja FTS5 indeksą,
+    kitos duomenų bazės - paprastą paiešką.
+    """
+    terms = search_terms(query)
+    if not terms:
+        return Product.objects.none()
+
+    if not uses_fts(connections[Product.objects.db]):
+        condition = Q()
+        for word in re.findall(r'\w+', query):
+            condition &= Q(name__icontains=word) | Q(description__icontains=word)
+        return Product.objects.filter(condition).order_by('id')
+
+    matches = RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', (terms,))
+    rank = RawSQL(
+        f'SELECT {FTS_RANK} FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s AND rowid = eshop_product.id',
+        (terms,),
+    )
+    return Product.objects.filter(id__in=matches).annotate(rank=rank).order_by('rank', 'id')
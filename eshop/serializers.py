@@ -0,0 +1,94 @@
+from rest_framework import serializers
+
+from .cart import MAX_CART_OPERATIONS
+from .models import Category, Product, CartItem
+
+
+def requested_fields(request):
+    """
+    Funkcija grąžina ?fields= parametru prašomų laukų aibę arba None, jei
+    parametras nenurodytas.
+    """
+    if request is None:
+        return None
+    fields = request.query_params.get('fields')
+    if not fields:
+        return None
+    return {field.strip() for field in fields.split(',') if field.strip()}
+
+
+class SparseFieldsMixin:
+    """
+    Palieka tik ?fields= parametru prašomus laukus, todėl nereikalingi
+    laukai neserializuojami ir neskaitomi iš duomenų bazės. Nežinomi laukai
+    atmetami su 400 klaida.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        requested = requested_fields(self.context.get('request'))
+        if requested:
+            unknown = requested - set(self.fields)
+            if unknown:
+                raise serializers.ValidationError({'fields': f"Unknown fields: {', '.join(sorted(unknown))}."})
+            for name in set(self.fields) - requested:
+                self.fields.pop(name)
+
+    def model_fields(self):
+        """
+        Grąžina modelio laukų kelius (pvz. categories__name), kurių reikia
+        likusiems laukams. Naudojama QuerySet.only() argumentams.
+        """
+        names = {field.attname: field.name for field in self.Meta.model._meta.concrete_fields}
+        names.update((name, name) for name in list(names.values()))
+        paths = []
+        for field in self.fields.values():
+            first, _, rest = field.source.partition('.')
+            if first in names:
+                paths.append('__'.join(filter(None, [names[first], rest.replace('.', '__')])))
+        return paths
+
+
+class ProductSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    category = serializers.IntegerField(source='categories_id', read_only=True)
+    category_name = serializers.CharField(source='categories.name', read_only=True)
+
+    class Meta:
+        model = Product
+        fields = ['id', 'sku', 'name', 'description', 'one_price', 'stock_quantity', 'category',
+                  'category_name', 'foto', 'rating_count', 'rating_average', 'updated_date']
+        read_only_fields = fields
+
+
+class CategorySerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    product_count = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = Category
+        fields = ['id', 'name', 'description', 'foto', 'product_count', 'updated_date']
+        read_only_fields = fields
+
+
+class CartItemSerializer(serializers.ModelSerializer):
+    product = serializers.IntegerField(source='products_id', read_only=True)
+    name = serializers.CharField(source='products.name', read_only=True)
+    one_price = serializers.FloatField(source='products.one_price', read_only=True)
+    line_total = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = CartItem
+        fields = ['product', 'name', 'one_price', 'quantity', 'line_total']
+
+
+class CartItemInputSerializer(serializers.Serializer):
+    product = serializers.IntegerField()
+    quantity = serializers.IntegerField(min_value=1, default=1)
+
+
+class CartOperationSerializer(serializers.Serializer):
+    product_id = serializers.IntegerField()
+    quantity = serializers.IntegerField()
+    op = serializers.ChoiceField(choices=['increment', 'set'], default='increment')
+
+
+class CartOperationsSerializer(serializers.Serializer):
+    operations = CartOperationSerializer(many=True, allow_empty=False, max_length=MAX_CART_OPERATIONS)
@@ -1,7 +1,18 @@
-from django.db.models.signals import post_save
+from django.conf import settings
+from django.contrib.auth.signals import user_logged_in
+from django.db import connections, transaction
+from django.db.backends.signals import connection_created
+from django.db.models import QuerySet
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete, post_migrate
 from django.dispatch import receiver
 
-from .models import Profile, User, Client
+from .analytics import SOLD_STATUSES, is_sold, record_order_sales
+from .cache import bump_catalogue_version
+from .cart import merge_session_cart
+from .images import derivatives_ready, schedule_derivatives
+from .ratings import adjust_rating
+from .search import FTS_TABLE, install_search_index
+from .models import Profile, User, Client, Product, Category, Order, OrderItem, Review
 
 
 @receiver(post_save, sender=User)
@@ -9,3 +20,147 @@ def create_profile(sender, instance, created, **kwargs):
     if created:
         Profile.objects.create(user=instance)
         Client.objects.create(user=instance)
+
+
+@receiver(user_logged_in)
+def merge_cart_on_login(sender, request, user, **kwargs):
+    if request is not None:
+        merge_session_cart(request, user)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_catalogue_pages(sender, **kwargs):
+    transaction.on_commit(bump_catalogue_version)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=Profile)
+def build_image_derivatives(sender, instance, **kwargs):
+    image = instance.picture if sender is Profile else instance.foto
+    if image and not derivatives_ready(image.name):
+        schedule_derivatives(image.name)
+
+
+@receiver(pre_save, sender=Order)
+def remember_order_status(sender, instance, raw=False, update_fields=None, **kwargs):
+    if instance.pk and not raw and (update_fields is None or 'status' in update_fields):
+        instance._previous_status = (Order.objects.filter(pk=instance.pk)
+                                     .values_list('status', flat=True).first())
+
+
+@receiver(post_save, sender=Order)
+def update_sales_rollups(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if raw or (update_fields is not None and 'status' not in update_fields):
+        return
+    was_sold = is_sold(getattr(instance, '_previous_status', None))
+    if is_sold(instance.status) != was_sold:
+        record_order_sales(instance, -1 if was_sold else 1)
+
+
+@receiver(pre_delete, sender=Order)
+def remove_order_sales(sender, instance, **kwargs):
+    if is_sold(instance.status):
+        record_order_sales(instance, -1)
+
+
+def _sold_orders(*order_ids):
+    return list(Order.objects.filter(pk__in={pk for pk in order_ids if pk}, status__in=SOLD_STATUSES))
+
+
+@receiver(pre_save, sender=OrderItem)
+def remove_item_order_sales(sender, instance, raw=False, **kwargs):
+    """
+    Parduoto užsakymo eilutės pakeitimas: prieš įrašant iš suvestinių
+    atimamas užsakymas (ir ankstesnis, jei eilutė perkelta), o po
+    įrašymo pridedamas iš naujo, todėl suvestinės gauna tik skirtumą.
+    """
+    if raw:
+        return
+    previous = (OrderItem.objects.filter(pk=instance.pk).values_list('orders_id', flat=True).first()
+                if instance.pk else None)
+    instance._sold_orders = _sold_orders(previous, instance.orders_id)
+    for order in instance._sold_orders:
+        record_order_sales(order, -1)
+
+
+@receiver(post_save, sender=OrderItem)
+def add_item_order_sales(sender, instance, raw=False, **kwargs):
+    for order in getattr(instance, '_sold_orders', []):
+        record_order_sales(order, 1)
+    instance._sold_orders = []
+
+
+def _deletes_orders(origin):
+    model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    return issubclass(model, (Order, Client, User))
+
+
+@receiver(pre_delete, sender=OrderItem)
+def remove_deleted_item_sales(sender, instance, origin=None, **kwargs):
+    """
+    Trinant eilutes, kiekvienas parduotas užsakymas iš suvestinių atimamas
+    vieną kartą, o ištrynus visas to paties trynimo eilutes pridedamas be
+    jų. Kai trinamas pats užsakymas, suvestines tvarko remove_order_sales.
+    """
+    if origin is None or _deletes_orders(origin):
+        return
+    orders = origin.__dict__.setdefault('_rollup_orders', {})
+    if instance.orders_id not in orders:
+        orders[instance.orders_id] = next(iter(_sold_orders(instance.orders_id)), None)
+        if orders[instance.orders_id] is not None:
+            record_order_sales(orders[instance.orders_id], -1)
+
+
+@receiver(post_delete, sender=OrderItem)
+def add_deleted_item_sales(sender, instance, origin=None, **kwargs):
+    order = getattr(origin, '_rollup_orders', {}).pop(instance.orders_id, None)
+    if order is not None:
+        record_order_sales(order, 1)
+
+
+@receiver(pre_save, sender=Review)
+def remember_review_rating(sender, instance, raw=False, **kwargs):
+    if instance.pk and not raw:
+        instance._previous_rating = (Review.objects.select_for_update().filter(pk=instance.pk)
+                                     .values_list('products_id', 'rating').first())
+
+
+@receiver(post_save, sender=Review)
+def update_product_rating(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_previous_rating', None)
+    if previous is None:
+        adjust_rating(instance.products_id, 1, instance.rating)
+    elif previous[0] == instance.products_id:
+        adjust_rating(instance.products_id, 0, instance.rating - previous[1])
+    else:
+        adjust_rating(previous[0], -1, -previous[1])
+        adjust_rating(instance.products_id, 1, instance.rating)
+    instance._previous_rating = (instance.products_id, instance.rating)
+    transaction.on_commit(bump_catalogue_version)
+
+
+@receiver(post_delete, sender=Review)
+def remove_product_rating(sender, instance, **kwargs):
+    adjust_rating(instance.products_id, -1, -instance.rating)
+    transaction.on_commit(bump_catalogue_version)
+
+
+@receiver(connection_created)
+def configure_sqlite(sender, connection, **kwargs):
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            for pragma, value in getattr(settings, 'SQLITE_PRAGMAS', {}).items():
+                cursor.execute(f'PRAGMA {pragma} = {value}')
+
+
+@receiver(post_migrate)
+def repair_search_index(sender, using, **kwargs):
+    connection = connections[using]
+    if sender.name == 'eshop' and FTS_TABLE in connection.introspection.table_names():
+        install_search_index(connection)
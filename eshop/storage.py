@@ -0,0 +1,51 @@
+import gzip
+from pathlib import Path
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_SUFFIXES = ('.css', '.js', '.mjs', '.map', '.svg', '.json', '.txt', '.xml', '.html', '.ico', '.ttf')
+MIN_COMPRESS_SIZE = 256
+
+
+def compress_file(path):
+    """
+    Funkcija šalia failo įrašo .gz ir (jei įdiegtas brotli paketas) .br
+    variantus. Variantas įrašomas tik tada, kai jis mažesnis už originalą.
+    Grąžina sukurtų failų sąrašą.
+    """
+    data = path.read_bytes()
+    if len(data) < MIN_COMPRESS_SIZE:
+        return []
+    variants = [('.gz', gzip.compress(data, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        variants.append(('.br', brotli.compress(data, quality=11)))
+    written = []
+    for suffix, compressed in variants:
+        if len(compressed) < len(data):
+            target = path.with_name(path.name + suffix)
+            target.write_bytes(compressed)
+            written.append(target)
+    return written
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    Statinių failų saugykla, kuri collectstatic metu prie failų pavadinimų
+    prideda turinio maišą (manifestas) ir kiekvienam tekstiniam failui
+    iš anksto paruošia suspaustus .gz ir .br variantus, kad jų nereikėtų
+    spausti kiekvienai užklausai.
+    """
+    def post_process(self, paths, dry_run=False, **options):
+        compressed = set()
+        for name, hashed_name, processed in super().post_process(paths, dry_run, **options):
+            if not dry_run and isinstance(hashed_name, str) and hashed_name.endswith(COMPRESSIBLE_SUFFIXES):
+                for original in (name, hashed_name):
+                    if original not in compressed:
+                        compress_file(Path(self.path(original)))
+                        compressed.add(original)
+            yield name, hashed_name, processed
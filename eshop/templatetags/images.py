@@ -0,0 +1,43 @@
+from django import template
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.templatetags.static import static
+from django.utils.html import format_html, format_html_join
+
+from eshop.images import derivative_formats, derivative_name, derivatives_ready
+
+register = template.Library()
+
+
+@register.simple_tag
+def picture(image, size, alt='', css_class='', sizes='100vw'):
+    """
+    Žyma atvaizduoja <picture> elementą su išvestinių paveikslėlių srcset
+    sąrašu. Naršyklė pasirenka tinkamą dydį ir formatą, o kol išvestiniai
+    paveikslėliai nesukurti, rodomas originalas. Priima paveikslėlio lauką
+    arba failo pavadinimą saugykloje.
+    """
+    name = getattr(image, 'name', image)
+    if not name:
+        return format_html('<img class="{}" src="{}" alt="{}"/>', css_class, static('img/no-image.png'), alt)
+    formats = derivative_formats()
+    digest = derivatives_ready(name) if formats else None
+    if digest is None:
+        return format_html('<img class="{}" src="{}" alt="{}"/>', css_class, default_storage.url(name), alt)
+
+    widths = settings.IMAGE_DERIVATIVE_SIZES
+    candidates = [candidate for candidate, pixels in widths.items() if pixels >= widths[size]] or [size]
+    sources = format_html_join(
+        '', '<source type="image/{}" srcset="{}" sizes="{}"/>',
+        (
+            (fmt, ', '.join(
+                f'{default_storage.url(derivative_name(name, candidate, fmt, digest))} {widths[candidate]}w'
+                for candidate in candidates
+            ), sizes)
+            for fmt in formats
+        ),
+    )
+    return format_html(
+        '<picture>{}<img class="{}" src="{}" alt="{}" loading="lazy"/></picture>',
+        sources, css_class, default_storage.url(derivative_name(name, size, formats[-1], digest)), alt,
+    )
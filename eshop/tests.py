@@ -1,3 +1,1216 @@
-from django.test import TestCase
+import csv
+import importlib
+import json
+import os
+import re
+import tempfile
+from contextlib import contextmanager
+from inspect import iscoroutinefunction
+from datetime import datetime, timedelta, timezone as dt_timezone
+from io import BytesIO, StringIO
+from pathlib import Path
+from smtplib import SMTPException
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.mail.backends.locmem import EmailBackend
+from django.core.management import CommandError, call_command
+from django.db import connection, transaction
+from django.template import Context, Template
+from django.test import AsyncClient, Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import clear_url_caches, resolve
+from django.utils import timezone
+from PIL import Image
+
+from mainproject import urls as project_urls
+from . import urls
+from .analytics import rebuild_sales_rollups
+from .cache import CATALOGUE_REPLICATING_KEY, catalogue_version
+from .cart import CartError, apply_cart_operations, merge_carts
+from .exports import ORDER_EXPORT_COLUMNS, iter_order_rows
+from .images import build_queued_derivatives, derivatives_ready, schedule_derivatives
+from .models import (Category, Product, Order, OrderItem, Review, Cart, CartItem, OutgoingEmail,
+                     StockReservation, ImageDerivativeJob, DailyProductSales, DailyCategorySales)
+from .outbox import claim_batch, queue_email, send_batch
+from .pagination import cursor_paginate
+
+LARGE_TABLES = {
+    'auth_user',
+    'eshop_cartitem',
+    'eshop_order',
+    'eshop_orderitem',
+    'eshop_product',
+    'eshop_review',
+    'eshop_stockreservation',
+}
+
+SCAN = re.compile(r'^SCAN (?:TABLE )?(\w+)(.*)$')
+
+
+@contextmanager
+def capture_statements(using=connection):
+    """
+    Surenka visas vykdomas SQL užklausas kartu su parametrais, kad jas būtų
+    galima paleisti su EXPLAIN QUERY PLAN.
+    """
+    statements = []
+
+    def wrapper(execute, sql, params, many, context):
+        statements.append((sql, params))
+        return execute(sql, params, many, context)
+
+    with using.execute_wrapper(wrapper):
+        yield statements
+
+
+def full_table_scans(statements, tables=LARGE_TABLES, using=connection):
+    """
+    Grąžina užklausas, kurių planas nuskaito visą didelę lentelę. Indekso
+    naudojimas (SCAN ... USING INDEX) nelaikomas pilnu nuskaitymu, kaip ir
+    nuskaitymas su LIMIT, kai rezultatų nereikia papildomai rikiuoti.
+    """
+    problems = []
+    with using.cursor() as cursor:
+        for sql, params in statements:
+            if not sql.lstrip().upper().startswith(('SELECT', 'UPDATE', 'DELETE')):
+                continue
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            details = [row[-1] for row in cursor.fetchall()]
+            stops_early = ' LIMIT ' in sql.upper() and not any('TEMP B-TREE' in detail for detail in details)
+            for detail in details:
+                match = SCAN.match(detail)
+                if match and match.group(1) in tables and 'USING' not in match.group(2) and not stops_early:
+                    problems.append(f'{detail}: {sql}')
+    return problems
+
+
+class QueryPlanTests(TestCase):
+    """
+    Tikrina, kad pagrindinės kiekvieno rodinio užklausos naudoja indeksus.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('buyer', 'buyer@example.com', 'password123')
+        cls.category = Category.objects.create(name='Shampoo')
+        cls.products = [
+            Product.objects.create(name=f'Shampoo {number}', description='Gentle hair shampoo',
+                                   one_price=10, stock_quantity=50, categories=cls.category)
+            for number in range(20)
+        ]
+        order = Order.objects.create(clients=cls.user.client, status='Completed')
+        OrderItem.objects.create(orders=order, products=cls.products[0], quantity=1)
+        Review.objects.create(products=cls.products[0], clients=cls.user.client, rating=5,
+                              comment='Great', created_date=timezone.now())
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def assertNoFullTableScans(self, method, url, data=None):
+        with capture_statements() as statements:
+            response = getattr(self.client, method)(url, data)
+        self.assertLess(response.status_code, 400)
+        self.assertEqual(full_table_scans(statements), [])
+
+    def test_catalogue_views(self):
+        product = self.products[0]
+        for url in ['/eshop/products/', '/eshop/categories/', f'/eshop/category/{self.category.id}/',
+                    f'/eshop/product/{product.id}/', '/eshop/profile/']:
+            with self.subTest(url=url):
+                self.assertNoFullTableScans('get', url)
+
+    @override_settings(CATALOGUE_PAGINATION='cursor')
+    def test_cursor_pages(self):
+        response = self.client.get('/eshop/products/')
+        cursor = response.context['products'].next_cursor
+        self.assertNoFullTableScans('get', '/eshop/products/', {'cursor': cursor})
+
+    def test_search(self):
+        self.assertNoFullTableScans('get', '/eshop/search/', {'search_text': 'hair'})
+
+    def test_cart_and_checkout(self):
+        product = self.products[1]
+        self.assertNoFullTableScans('post', f'/eshop/add_to_cart/{product.id}/')
+        self.assertNoFullTableScans('get', '/eshop/cart/')
+        self.assertNoFullTableScans('get', '/eshop/checkout/')
+        self.client.post(f'/eshop/add_to_cart/{product.id}/')
+        self.assertNoFullTableScans('get', f'/eshop/remove_from_cart/{product.id}/')
+
+    def test_order_history(self):
+        order = Order.objects.filter(clients=self.user.client).first()
+        self.assertNoFullTableScans('get', '/eshop/orders/')
+        self.assertNoFullTableScans('get', f'/eshop/orders/{order.id}/')
+
+    def test_api(self):
+        product = self.products[0]
+        for url in ['/api/v1/products/', f'/api/v1/products/?category={self.category.id}&fields=id,name',
+                    f'/api/v1/products/{product.id}/', '/api/v1/categories/', '/api/v1/cart/']:
+            with self.subTest(url=url):
+                self.assertNoFullTableScans('get', url)
+
+    def test_registration(self):
+        self.client.logout()
+        self.assertNoFullTableScans('post', '/eshop/register/', {
+            'username': 'newbuyer', 'email': 'new@example.com',
+            'password': 'password123', 'password2': 'password123',
+        })
+
+
+class CheckoutTests(TestCase):
+    """
+    Tikrina, kad užsakymas sukuriamas viena transakcija: sandėlio kiekiai
+    sumažinami, o trūkstant bent vienos prekės atmetamas visas užsakymas.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('buyer', 'buyer@example.com', 'password123')
+        category = Category.objects.create(name='Shampoo')
+        cls.products = [
+            Product.objects.create(name=f'Shampoo {number}', one_price=2, stock_quantity=3, categories=category)
+            for number in range(30)
+        ]
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def fill_cart(self, quantity=2):
+        for product in self.products:
+            for _ in range(quantity):
+                self.client.post(f'/eshop/add_to_cart/{product.id}/')
+
+    def test_checkout(self):
+        self.fill_cart()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/eshop/checkout/')
+        self.assertRedirects(response, '/eshop/order_success/', fetch_redirect_response=False)
+        order = Order.objects.get(clients=self.user.client)
+        self.assertEqual(OrderItem.objects.filter(orders=order).count(), 30)
+        self.assertEqual((order.item_count, order.total), (60, 120))
+        self.assertEqual(set(Product.objects.values_list('stock_quantity', flat=True)), {1})
+        self.assertFalse(CartItem.objects.exists())
+        # Stock updates are one per line; lookups and inserts do not grow with the cart.
+        self.assertLessEqual(len(queries), 30 + 15)
+
+    def test_out_of_stock_rejects_order(self):
+        self.fill_cart()
+        Product.objects.filter(pk=self.products[-1].pk).update(stock_quantity=1)
+        response = self.client.get('/eshop/checkout/', follow=True)
+        self.assertRedirects(response, '/eshop/cart/')
+        self.assertIn('Sorry, only 1 of Shampoo 29', ''.join(str(message) for message in response.context['messages']))
+        self.assertFalse(OrderItem.objects.exists())
+        self.assertEqual(Product.objects.get(pk=self.products[0].pk).stock_quantity, 3)
+        self.assertEqual(CartItem.objects.count(), 30)
+
+
+class CataloguePageCacheTests(TestCase):
+    """
+    Tikrina, kad katalogo puslapiai kešuojami ir pasikeitus prekei ar
+    kategorijai iš karto sugeneruojami iš naujo.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('buyer', 'buyer@example.com', 'password123')
+        cls.category = Category.objects.create(name='Shampoo')
+        cls.product = Product.objects.create(name='Alpha', one_price=2, stock_quantity=3, categories=cls.category)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+        # The first response sets the CSRF cookie that is part of the cache key.
+        self.client.get('/eshop/products/')
+
+    def test_cached_page(self):
+        for url in ['/eshop/products/', '/eshop/categories/', f'/eshop/category/{self.category.id}/']:
+            with self.subTest(url=url):
+                with CaptureQueriesContext(connection) as rendered:
+                    first = self.client.get(url)
+                with CaptureQueriesContext(connection) as cached:
+                    second = self.client.get(url)
+                self.assertEqual(first.content, second.content)
+                self.assertLess(len(cached), len(rendered))
+                # Only the cheap freshness check (MAX(updated_date)) may read products.
+                self.assertFalse(any('"eshop_product"."name"' in query['sql'] for query in cached))
+
+    def test_save_invalidates_pages(self):
+        self.client.get('/eshop/products/')
+        self.product.name = 'Beta'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.save()
+        self.assertContains(self.client.get('/eshop/products/'), 'Beta')
+        self.category.name = 'Conditioner'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category.save()
+        self.assertContains(self.client.get('/eshop/categories/'), 'Conditioner')
+
+    def test_cart_count_is_part_of_key(self):
+        self.client.get('/eshop/products/')
+        self.client.post(f'/eshop/add_to_cart/{self.product.id}/', follow=True)
+        self.assertContains(self.client.get('/eshop/products/'), '<span id="cart-count">1</span>')
+
+    def test_version_changes_on_commit(self):
+        version = catalogue_version()
+        with self.captureOnCommitCallbacks() as callbacks:
+            with transaction.atomic():
+                self.product.name = 'Beta'
+                self.product.save()
+                self.category.save()
+            self.assertEqual(catalogue_version(), version)
+        self.assertEqual(len(callbacks), 2)
+        for callback in callbacks:
+            callback()
+        self.assertNotEqual(catalogue_version(), version)
+
+    @override_settings(DATABASE_REPLICAS=['default'])
+    def test_pages_cached_while_replicas_catch_up_are_dropped(self):
+        self.product.name = 'Beta'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.save()
+        self.assertContains(self.client.get('/eshop/products/'), 'Beta')
+        # Stands in for a replica that served the page before it received the change.
+        Product.objects.filter(pk=self.product.pk).update(name='Gamma')
+        self.assertContains(self.client.get('/eshop/products/'), 'Beta')
+        # REPLICA_PIN_SECONDS have passed.
+        cache.delete(CATALOGUE_REPLICATING_KEY)
+        self.assertContains(self.client.get('/eshop/products/'), 'Gamma')
+
+
+class SearchTests(TestCase):
+    """
+    Tikrina pilno teksto paiešką: rikiavimą pagal atitikimą, indekso
+    sinchronizavimą su prekėmis ir netinkamas užklausas.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('buyer', 'buyer@example.com', 'password123')
+        category = Category.objects.create(name='Hair')
+        cls.shampoo = Product.objects.create(name='Olaplex šampūnas', description='For dry hair', one_price=2,
+                                             stock_quantity=3, categories=category)
+        cls.brush = Product.objects.create(name='Brush', description='Olaplex compatible brush', one_price=2,
+                                           stock_quantity=3, categories=category)
+        Product.objects.create(name='Comb', description='Wooden', one_price=2, stock_quantity=3, categories=category)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def search(self, text=None):
+        response = self.client.get('/eshop/search/', {} if text is None else {'search_text': text})
+        self.assertEqual(response.status_code, 200)
+        return [product.name for product in response.context['products']]
+
+    def test_ranking_and_prefixes(self):
+        self.assertEqual(self.search('olap'), ['Olaplex šampūnas', 'Brush'])
+        self.assertEqual(self.search('sampunas'), ['Olaplex šampūnas'])
+
+    def test_index_follows_changes(self):
+        self.brush.description = 'Plain brush'
+        self.brush.save()
+        self.assertEqual(self.search('olaplex'), ['Olaplex šampūnas'])
+        self.shampoo.delete()
+        self.assertEqual(self.search('olaplex'), [])
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(self.search('wooden'), ['Comb'])
+
+    def test_bad_queries(self):
+        self.assertEqual(self.search(), [])
+        self.assertEqual(self.search('olaplex "AND( NEAR'), [])
+        self.assertEqual(self.search('  '), [])
+
+
+class CursorPaginationTests(TestCase):
+    """
+    Tikrina puslapiavimą pagal raktą: puslapiai pirmyn ir atgal apima visas
+    eilutes be pasikartojimų, o svetimi ar sugadinti žetonai grąžina
+    pirmą puslapį.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('buyer', 'buyer@example.com', 'password123')
+        cls.category = Category.objects.create(name='Shampoo')
+        for number in range(20):
+            Product.objects.create(name=f'Shampoo {number % 3}', one_price=number % 4, stock_quantity=3,
+                                   rating_average=number % 5, categories=cls.category)
+
+    def test_walk_forward_and_back(self):
+        for ordering in [('id',), ('-one_price', 'name', 'id'), ('-rating_average', 'id')]:
+            with self.subTest(ordering=ordering):
+                expected = list(Product.objects.order_by(*ordering).values_list('id', flat=True))
+                page = cursor_paginate(Product.objects.all(), None, 8, ordering)
+                seen = [product.id for product in page]
+                while page.has_next():
+                    page = cursor_paginate(Product.objects.all(), page.next_cursor, 8, ordering)
+                    seen += [product.id for product in page]
+                self.assertEqual(seen, expected)
+
+                back = []
+                while page.has_previous():
+                    page = cursor_paginate(Product.objects.all(), page.previous_cursor, 8, ordering)
+                    back = [product.id for product in page] + back
+                self.assertEqual(back, expected[:16])
+
+    @override_settings(CATALOGUE_PAGINATION='cursor')
+    def test_foreign_cursor_falls_back_to_first_page(self):
+        cache.clear()
+        self.client.force_login(self.user)
+        cursor = self.client.get('/eshop/products/').context['products'].next_cursor
+        first_page = [product.id for product in
+                      cursor_paginate(Product.objects.all(), None, 8, ('-rating_average', 'id'))]
+        for url, data in [('/eshop/products/', {'sort': 'rating', 'cursor': cursor}),
+                          ('/eshop/products/', {'cursor': 'garbage'}),
+                          (f'/eshop/category/{self.category.id}/', {'cursor': cursor[:-2]})]:
+            with self.subTest(data=data):
+                response = self.client.get(url, data)
+                self.assertEqual(response.status_code, 200)
+                self.assertFalse(response.context['products'].has_previous())
+        cache.clear()
+        response = self.client.get('/eshop/products/', {'sort': 'rating', 'cursor': cursor})
+        self.assertEqual([product.id for product in response.context['products']], first_page)
+
+
+class ApiFieldsTests(TestCase):
+    """
+    Tikrina API ?fields= parametrą: grąžinami tik prašomi laukai, o
+    nežinomi laukai atmetami su 400 klaida, kurioje jie išvardyti.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('buyer', 'buyer@example.com', 'password123')
+        category = Category.objects.create(name='Shampoo')
+        cls.product = Product.objects.create(name='Alpha', one_price=2, stock_quantity=3, categories=category)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_requested_fields(self):
+        response = self.client.get('/api/v1/products/', {'fields': 'id, name'})
+        self.assertEqual(response.json()['results'], [{'id': self.product.id, 'name': 'Alpha'}])
+        response = self.client.get(f'/api/v1/products/{self.product.id}/', {'fields': 'category_name'})
+        self.assertEqual(response.json(), {'category_name': 'Shampoo'})
+
+    def test_unknown_fields(self):
+        for url in ['/api/v1/products/', f'/api/v1/products/{self.product.id}/', '/api/v1/categories/']:
+            with self.subTest(url=url):
+                response = self.client.get(url, {'fields': 'id,price,colour'})
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json(), {'fields': 'Unknown fields: colour, price.'})
+
+
+class CartTests(TestCase):
+    """
+    Tikrina duomenų bazės krepšelį: eilučių atnaujinimą, sumas pagal
+    dabartines kainas, anoniminio krepšelio sujungimą prisijungus ir API
+    operacijas - visos arba nė viena, su CSRF patikra.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('buyer', 'buyer@example.com', 'password123')
+        category = Category.objects.create(name='Shampoo')
+        cls.products = [Product.objects.create(name=f'Shampoo {number}', one_price=2, stock_quantity=10,
+                                               categories=category)
+                        for number in range(2)]
+
+    def cart_lines(self, user):
+        return dict(CartItem.objects.filter(carts__user=user).values_list('products_id', 'quantity'))
+
+    def test_lines_and_live_totals(self):
+        self.client.force_login(self.user)
+        for _ in range(2):
+            self.client.post(f'/eshop/add_to_cart/{self.products[0].id}/')
+        self.assertEqual(self.cart_lines(self.user), {self.products[0].id: 2})
+        self.assertEqual(self.client.get('/eshop/cart/').context['total_price'], 4)
+        Product.objects.filter(pk=self.products[0].pk).update(one_price=5)
+        self.assertEqual(self.client.get('/eshop/cart/').context['total_price'], 10)
+        self.client.get(f'/eshop/remove_from_cart/{self.products[0].id}/')
+        self.assertEqual(self.cart_lines(self.user), {})
+
+    def test_anonymous_cart_merges_on_login(self):
+        self.client.force_login(self.user)
+        self.client.post(f'/eshop/add_to_cart/{self.products[0].id}/')
+        self.client.logout()
+
+        self.client.post(f'/eshop/add_to_cart/{self.products[0].id}/')
+        self.client.post(f'/eshop/add_to_cart/{self.products[1].id}/')
+        self.assertEqual(Cart.objects.filter(user=None).count(), 1)
+        self.client.login(username='buyer', password='password123')
+        self.assertEqual(self.cart_lines(self.user), {self.products[0].id: 2, self.products[1].id: 1})
+        self.assertFalse(Cart.objects.filter(user=None).exists())
+
+    def test_merge_keeps_reservations_and_caps_at_stock(self):
+        Product.objects.filter(pk__in=[product.pk for product in self.products]).update(stock_quantity=3)
+        user_cart = Cart.objects.create(user=self.user)
+        apply_cart_operations(user_cart, [{'product_id': self.products[0].id, 'quantity': 2},
+                                          {'product_id': self.products[1].id, 'quantity': 2}])
+        anonymous_cart = Cart.objects.create()
+        apply_cart_operations(anonymous_cart, [{'product_id': self.products[0].id, 'quantity': 1}])
+        other_cart = Cart.objects.create()
+        apply_cart_operations(other_cart, [{'product_id': self.products[1].id, 'quantity': 1}])
+        CartItem.objects.create(carts=anonymous_cart, products=self.products[1], quantity=2)
+
+        merge_carts(anonymous_cart, user_cart)
+        self.assertEqual(self.cart_lines(self.user), {self.products[0].id: 3, self.products[1].id: 2})
+        held = dict(StockReservation.objects.filter(carts=user_cart).values_list('products_id', 'quantity'))
+        self.assertEqual(held, {self.products[0].id: 3, self.products[1].id: 2})
+        self.assertFalse(StockReservation.objects.filter(carts_id=anonymous_cart.pk).exists())
+
+    def post_operations(self, operations, client=None):
+        return (client or self.client).post('/api/v1/cart/operations/', {'operations': operations},
+                                            content_type='application/json')
+
+    def test_invalid_operation_leaves_cart_unchanged(self):
+        self.client.force_login(self.user)
+        self.post_operations([{'product_id': self.products[0].id, 'quantity': 2}])
+        response = self.post_operations([
+            {'product_id': self.products[0].id, 'quantity': 3},
+            {'product_id': self.products[1].id, 'quantity': 11, 'op': 'set'},
+            {'product_id': 0, 'quantity': 1},
+        ])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(len(response.json()['operations']), 2)
+        self.assertEqual(self.cart_lines(self.user), {self.products[0].id: 2})
+        held = dict(StockReservation.objects.filter(carts__user=self.user).values_list('products_id', 'quantity'))
+        self.assertEqual(held, {self.products[0].id: 2})
+
+    def test_set_operations(self):
+        self.client.force_login(self.user)
+        response = self.post_operations([{'product_id': self.products[0].id, 'quantity': 4, 'op': 'set'},
+                                         {'product_id': self.products[1].id, 'quantity': 1}])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['total'], 10)
+        response = self.post_operations([{'product_id': self.products[0].id, 'quantity': 0, 'op': 'set'}])
+        self.assertEqual(response.json()['count'], 1)
+        self.assertEqual(self.cart_lines(self.user), {self.products[1].id: 1})
+        self.assertFalse(StockReservation.objects.filter(products=self.products[0]).exists())
+
+    def test_stock_held_by_other_carts(self):
+        other_cart = Cart.objects.create()
+        apply_cart_operations(other_cart, [{'product_id': self.products[0].id, 'quantity': 7}])
+        user_cart = Cart.objects.create(user=self.user)
+        with self.assertRaises(CartError) as error:
+            apply_cart_operations(user_cart, [{'product_id': self.products[0].id, 'quantity': 4}])
+        self.assertIn('Only 3 is available.', error.exception.messages[0])
+        self.assertEqual(self.cart_lines(self.user), {})
+
+        apply_cart_operations(user_cart, [{'product_id': self.products[0].id, 'quantity': 3}])
+        self.assertEqual(self.cart_lines(self.user), {self.products[0].id: 3})
+
+    def test_anonymous_post_requires_csrf_token(self):
+        client = Client(enforce_csrf_checks=True)
+        operation = [{'product_id': self.products[0].id, 'quantity': 1}]
+        self.assertEqual(self.post_operations(operation, client).status_code, 403)
+        self.assertEqual(client.post('/api/v1/cart/', {'product': self.products[0].id, 'quantity': 1},
+                                     content_type='application/json').status_code, 403)
+        self.assertFalse(CartItem.objects.exists())
+
+        client.get('/accounts/login/')
+        token = client.cookies['csrftoken'].value
+        response = client.post('/api/v1/cart/operations/', {'operations': operation},
+                               content_type='application/json', HTTP_X_CSRFTOKEN=token)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['count'], 1)
+
+
+class ConditionalGetTests(TestCase):
+    """
+    Tikrina ETag ir Last-Modified antraštes: nepasikeitęs puslapis grąžina
+    304 be puslapio užklausų, o pakeitus prekę - naują turinį.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('buyer', 'buyer@example.com', 'password123')
+        cls.category = Category.objects.create(name='Shampoo')
+        cls.product = Product.objects.create(name='Alpha', one_price=2, stock_quantity=3, categories=cls.category)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+        self.client.get('/eshop/products/')
+
+    def test_not_modified(self):
+        for url in ['/eshop/products/', f'/eshop/category/{self.category.id}/', f'/eshop/product/{self.product.id}/']:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertTrue(response.has_header('Last-Modified'))
+                with CaptureQueriesContext(connection) as queries:
+                    not_modified = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+                self.assertEqual(not_modified.status_code, 304)
+                self.assertFalse(any('"eshop_product"."name"' in query['sql'] for query in queries))
+                self.assertEqual(
+                    self.client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']).status_code, 304)
+
+                with self.captureOnCommitCallbacks(execute=True):
+                    self.product.save()
+                self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 200)
+
+    def assert_modified(self, url, change):
+        etag = self.client.get(url)['ETag']
+        change()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_review_changes_update_product_page(self):
+        url = f'/eshop/product/{self.product.id}/'
+        review = Review.objects.create(products=self.product, clients=self.user.client, rating=4,
+                                       comment='Good', created_date=timezone.now())
+        review.comment = 'Very good'
+        self.assert_modified(url, review.save)
+        self.assertContains(self.client.get(url), 'Very good')
+        self.assert_modified(url, review.delete)
+        self.assertNotContains(self.client.get(url), 'Very good')
+
+
+class AsyncViewTests(TestCase):
+    """
+    Tikrina asinchroninius katalogo rodinius (ESHOP_ASYNC_VIEWS) per
+    AsyncClient.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('buyer', 'buyer@example.com', 'password123')
+        cls.category = Category.objects.create(name='Shampoo')
+        cls.product = Product.objects.create(name='Alpha shampoo', one_price=2, stock_quantity=3,
+                                             categories=cls.category)
+        Review.objects.create(products=cls.product, clients=cls.user.client, rating=5, comment='Lovely',
+                              created_date=timezone.now())
+
+    def setUp(self):
+        cache.clear()
+        self.use_async_views(True)
+        self.addCleanup(self.use_async_views, False)
+        self.async_client.force_login(self.user)
+
+    def use_async_views(self, enabled):
+        with override_settings(ESHOP_ASYNC_VIEWS=enabled):
+            importlib.reload(urls)
+            importlib.reload(project_urls)
+        clear_url_caches()
+
+    async def test_pages(self):
+        pages = {
+            '/eshop/products/': 'Alpha shampoo',
+            '/eshop/categories/': 'Shampoo',
+            f'/eshop/category/{self.category.id}/': 'Alpha shampoo',
+            f'/eshop/product/{self.product.id}/': 'Lovely',
+            '/eshop/search/?search_text=alpha': 'Alpha shampoo',
+        }
+        for url, text in pages.items():
+            with self.subTest(url=url):
+                self.assertTrue(iscoroutinefunction(resolve(url.partition('?')[0]).func))
+                response = await self.async_client.get(url)
+                self.assertContains(response, text)
+        for url in ['/eshop/product/999/', '/eshop/category/999/']:
+            with self.subTest(url=url):
+                self.assertEqual((await self.async_client.get(url)).status_code, 404)
+
+    async def test_login_required(self):
+        response = await AsyncClient().get('/eshop/products/')
+        self.assertRedirects(response, '/accounts/login/?next=/eshop/products/', fetch_redirect_response=False)
+
+
+class FailingEmailBackend(EmailBackend):
+    def send_messages(self, messages):
+        raise SMTPException('Relay unavailable')
+
+
+@override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+                   OUTBOX_RETRY_DELAY=60, OUTBOX_MAX_RETRY_DELAY=3600)
+class OutboxTests(TestCase):
+    """
+    Tikrina laiškų eilės siuntimą, pakartotinius bandymus ir paimtų
+    laiškų apsaugą nuo dvigubo siuntimo.
+    """
+
+    def test_send(self):
+        for number in range(7):
+            queue_email(f'Order {number}', 'Thank you', ['buyer@example.com'])
+        call_command('send_outbox', '--batch-size', '3', stdout=StringIO())
+        self.assertEqual(len(mail.outbox), 7)
+        self.assertEqual(OutgoingEmail.objects.filter(status='Sent', attempts=1).count(), 7)
+
+    def test_claimed_emails_are_not_claimed_again(self):
+        for number in range(3):
+            queue_email(f'Order {number}', 'Thank you', ['buyer@example.com'])
+        first = claim_batch(2)
+        second = claim_batch(2)
+        self.assertEqual(len(first), 2)
+        self.assertEqual([email.pk for email in second], [OutgoingEmail.objects.order_by('id').last().pk])
+        self.assertEqual(claim_batch(2), [])
+
+    def test_concurrent_claims_do_not_overlap(self):
+        for number in range(4):
+            queue_email(f'Order {number}', 'Thank you', ['buyer@example.com'])
+        competing = []
+
+        def claim_in_between(execute, sql, params, many, context):
+            # Another sender claims the same due emails after this one has selected them.
+            if sql.startswith('UPDATE') and not competing:
+                competing.append(None)
+                competing.extend(claim_batch(3))
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(claim_in_between):
+            first = claim_batch(3)
+        second = competing[1:]
+        self.assertEqual(len(second), 3)
+        self.assertEqual(len(first), 0)
+        self.assertEqual(claim_batch(4), [OutgoingEmail.objects.order_by('id').last()])
+
+    @override_settings(EMAIL_BACKEND='eshop.tests.FailingEmailBackend')
+    def test_retry_with_backoff_then_failed(self):
+        email = queue_email('Order', 'Thank you', ['buyer@example.com'])
+        for attempt, delay in [(1, 60), (2, 120)]:
+            started = timezone.now()
+            self.assertEqual(send_batch(max_attempts=3), (0, 1))
+            email.refresh_from_db()
+            self.assertEqual((email.status, email.attempts), ('Pending', attempt))
+            self.assertIn('Relay unavailable', email.last_error)
+            self.assertAlmostEqual((email.next_attempt_date - started).total_seconds(), delay, delta=5)
+            self.assertEqual(send_batch(max_attempts=3), (0, 0))
+            OutgoingEmail.objects.update(next_attempt_date=timezone.now() - timedelta(seconds=1))
+        send_batch(max_attempts=3)
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), ('Failed', 3))
+        self.assertEqual(send_batch(max_attempts=3), (0, 0))
+
+
+class OrderExportTests(TestCase):
+    """
+    Tikrina užsakymų eksportą: prieigą tik personalui, CSV ir JSONL
+    turinį, filtrus, komandą ir tai, kad skaitant dalimis užklausų
+    skaičius nepriklauso nuo eilučių skaičiaus.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user('staff', 'staff@example.com', 'password123', is_staff=True)
+        cls.buyer = User.objects.create_user('buyer', 'buyer@example.com', 'password123')
+        cls.buyer.client.first_name, cls.buyer.client.last_name = 'Ona', 'Jonaite'
+        cls.buyer.client.save()
+        category = Category.objects.create(name='Shampoo')
+        cls.products = [
+            Product.objects.create(name='Alpha', sku='SH-1', one_price=2.5, stock_quantity=10, categories=category),
+            Product.objects.create(name='Beta', one_price=4, stock_quantity=10, categories=category),
+        ]
+        cls.completed = Order.objects.create(clients=cls.buyer.client, status='Completed')
+        OrderItem.objects.create(orders=cls.completed, products=cls.products[0], quantity=2, unit_price=2)
+        OrderItem.objects.create(orders=cls.completed, products=cls.products[1], quantity=1)
+        cls.pending = Order.objects.create(clients=cls.buyer.client)
+        OrderItem.objects.create(orders=cls.pending, products=cls.products[0], quantity=3, unit_price=2.5)
+        Order.objects.filter(pk=cls.pending.pk).update(
+            created_date=datetime(2024, 1, 5, 12, tzinfo=dt_timezone.utc))
+
+    def export(self, **params):
+        self.client.force_login(self.staff)
+        response = self.client.get('/eshop/export/orders/', params)
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content).decode()
+
+    def test_staff_only(self):
+        self.assertEqual(self.client.get('/eshop/export/orders/').status_code, 302)
+        self.client.force_login(self.buyer)
+        self.assertEqual(self.client.get('/eshop/export/orders/').status_code, 302)
+
+    def test_csv(self):
+        rows = list(csv.reader(StringIO(self.export())))
+        self.assertEqual(rows[0], ORDER_EXPORT_COLUMNS)
+        self.assertEqual(len(rows), 4)
+        first = dict(zip(ORDER_EXPORT_COLUMNS, rows[1]))
+        self.assertEqual(
+            {key: first[key] for key in ('order_id', 'status', 'first_name', 'last_name', 'email', 'sku',
+                                         'product_name', 'quantity', 'unit_price', 'line_total')},
+            {'order_id': str(self.completed.pk), 'status': 'Completed', 'first_name': 'Ona',
+             'last_name': 'Jonaite', 'email': 'buyer@example.com', 'sku': 'SH-1', 'product_name': 'Alpha',
+             'quantity': '2', 'unit_price': '2.0', 'line_total': '4.0'},
+        )
+        second = dict(zip(ORDER_EXPORT_COLUMNS, rows[2]))
+        self.assertEqual((second['sku'], second['unit_price'], second['line_total']), ('', '4.0', '4.0'))
+
+    def test_jsonl_and_filters(self):
+        rows = [json.loads(line) for line in self.export(format='jsonl', status='Pending').splitlines()]
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['order_id'], self.pending.pk)
+        self.assertEqual(rows[0]['line_total'], 7.5)
+        self.assertTrue(rows[0]['order_date'].startswith('2024-01-05T12:00:00'))
+
+        rows = self.export(format='jsonl', date_from='2024-01-05', date_to='2024-01-05').splitlines()
+        self.assertEqual([json.loads(line)['order_id'] for line in rows], [self.pending.pk])
+        for params in ({'format': 'xml'}, {'date_from': '2024-02-30'}, {'status': 'Lost'}):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get('/eshop/export/orders/', params).status_code, 400)
+
+    def test_chunked_rows_use_one_query(self):
+        for _ in range(2):
+            with CaptureQueriesContext(connection) as queries:
+                rows = list(iter_order_rows({}, chunk_size=1))
+            self.assertEqual(len(queries), 1)
+            order = Order.objects.create(clients=self.buyer.client)
+            OrderItem.objects.bulk_create([OrderItem(orders=order, products=self.products[1], quantity=1)
+                                           for _ in range(5)])
+        self.assertEqual(len(rows), 8)
+
+    def test_command(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'orders.jsonl')
+            stdout = StringIO()
+            call_command('export_orders', path, '--status', 'Completed', '--chunk-size', '1', stdout=stdout)
+            self.assertIn('Exported 2 order lines', stdout.getvalue())
+            with open(path, encoding='utf-8') as file:
+                rows = [json.loads(line) for line in file]
+        self.assertEqual([row['product_name'] for row in rows], ['Alpha', 'Beta'])
+        with self.assertRaises(CommandError):
+            call_command('export_orders', path, '--date-to', 'tomorrow', stdout=StringIO())
+
+
+class SalesDashboardTests(TestCase):
+    """
+    Tikrina, kad pardavimų ataskaita netinkamas datas atmeta su 400.
+    """
+
+    def test_dates(self):
+        self.client.force_login(User.objects.create_user('staff', 'staff@example.com', 'password123',
+                                                         is_staff=True))
+        response = self.client.get('/eshop/dashboard/sales/', {'date_from': '2024-02-01', 'date_to': '2024-02-29'})
+        self.assertEqual(response.status_code, 200)
+        for date_from in ('2024-02-30', '2024-13-01', 'yesterday'):
+            with self.subTest(date_from=date_from):
+                response = self.client.get('/eshop/dashboard/sales/', {'date_from': date_from})
+                self.assertEqual(response.status_code, 400)
+        with self.assertRaises(CommandError):
+            call_command('rebuild_sales_rollups', '--date-from', '2024-02-30', stdout=StringIO())
+
+
+class SalesRollupTests(TestCase):
+    """
+    Tikrina, kad dienos suvestinės sutampa su parduotų užsakymų eilutėmis,
+    kai užsakymas sukuriamas jau parduotas, o eilutės pridedamos, keičiamos
+    ir trinamos vėliau.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.client_profile = User.objects.create_user('buyer', 'buyer@example.com', 'password123').client
+        cls.category = Category.objects.create(name='Shampoo')
+        cls.products = [Product.objects.create(name=f'Shampoo {number}', one_price=2, stock_quantity=10,
+                                               categories=cls.category)
+                        for number in range(2)]
+
+    def rollups(self):
+        products = sorted(DailyProductSales.objects.values_list('products_id', 'units', 'revenue', 'order_count'))
+        categories = list(DailyCategorySales.objects.values_list('categories_id', 'units', 'revenue', 'order_count'))
+        return products, categories
+
+    def assertRollups(self, products, categories):
+        self.assertEqual(self.rollups(), (products, categories))
+        rebuild_sales_rollups()
+        self.assertEqual(self.rollups(), (products, categories))
+
+    def test_items_of_sold_order(self):
+        first, second = self.products
+        order = Order.objects.create(clients=self.client_profile, status='Completed')
+        item = OrderItem.objects.create(orders=order, products=first, quantity=2, unit_price=5)
+        OrderItem.objects.create(orders=order, products=second, quantity=1, unit_price=3)
+        self.assertRollups([(first.id, 2, 10, 1), (second.id, 1, 3, 1)], [(self.category.id, 3, 13, 1)])
+
+        item.quantity = 4
+        item.save()
+        OrderItem.objects.create(orders=order, products=first, quantity=1, unit_price=5)
+        self.assertRollups([(first.id, 5, 25, 1), (second.id, 1, 3, 1)], [(self.category.id, 6, 28, 1)])
+
+        other = Order.objects.create(clients=self.client_profile, status='Shipped')
+        OrderItem.objects.create(orders=other, products=second, quantity=1, unit_price=3)
+        item.delete()
+        self.assertRollups([(first.id, 1, 5, 1), (second.id, 2, 6, 2)], [(self.category.id, 3, 11, 2)])
+
+        OrderItem.objects.filter(orders=order).delete()
+        self.assertRollups([(second.id, 1, 3, 1)], [(self.category.id, 1, 3, 1)])
+        other.delete()
+        self.assertRollups([], [])
+
+    def test_pending_order_is_counted_when_sold(self):
+        order = Order.objects.create(clients=self.client_profile)
+        OrderItem.objects.create(orders=order, products=self.products[0], quantity=2, unit_price=5)
+        self.assertRollups([], [])
+        order.status = 'Shipped'
+        order.save()
+        self.assertRollups([(self.products[0].id, 2, 10, 1)], [(self.category.id, 2, 10, 1)])
+
+
+class QueryInstrumentationTests(TestCase):
+    """
+    Tikrina, kad įjungta užklausų matavimo tarpinė programinė įranga
+    grąžina Server-Timing antraštę ir žurnale pažymi užklausas su daug
+    SQL sakinių, o išjungta į atsakymus nieko neprideda.
+    """
+
+    def setUp(self):
+        cache.clear()
+        category = Category.objects.create(name='Shampoo')
+        for number in range(3):
+            Product.objects.create(name=f'Product {number}', one_price=2, stock_quantity=3, categories=category)
+        self.client.force_login(User.objects.create_user('buyer', 'buyer@example.com', 'password123'))
+
+    @override_settings(ESHOP_INSTRUMENTATION={'ENABLED': True, 'SLOW_QUERY_COUNT': 3})
+    def test_server_timing_and_log(self):
+        with self.assertLogs('eshop.performance', 'WARNING') as logs:
+            response = self.client.get('/eshop/products/')
+        self.assertRegex(response['Server-Timing'], r'^db;dur=[\d.]+;desc="\d+ queries", app;dur=[\d.]+$')
+        record = logs.records[0].performance
+        self.assertEqual((record['path'], record['status']), ('/eshop/products/', 200))
+        self.assertGreaterEqual(record['queries'], 3)
+        self.assertTrue(record['slowest'])
+
+    @override_settings(ESHOP_INSTRUMENTATION={'ENABLED': False})
+    def test_disabled(self):
+        response = self.client.get('/eshop/products/')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Server-Timing', response)
+
+
+class ImportCatalogueTests(TestCase):
+    """
+    Tikrina, kad importas atnaujina produktus pagal SKU ir nekeičia
+    stulpelių, kurių eilutėje nėra.
+    """
+
+    def import_rows(self, text):
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory, 'catalogue.csv')
+            path.write_text(text)
+            call_command('import_catalogue', str(path), stdout=StringIO(), stderr=StringIO())
+
+    def test_missing_columns_keep_stored_values(self):
+        category = Category.objects.create(name='Shampoo')
+        Product.objects.create(sku='X1', name='Old', description='keep me', one_price=2, stock_quantity=7,
+                               categories=category, foto='foto/1.png')
+        self.import_rows('sku,name,price,category\nX1,New,3.5,Shampoo\nX2,Other,1,Shampoo\n')
+        product = Product.objects.get(sku='X1')
+        self.assertEqual((product.name, product.one_price, product.description, product.foto.name,
+                          product.stock_quantity), ('New', 3.5, 'keep me', 'foto/1.png', 7))
+        self.assertEqual(Product.objects.get(sku='X2').stock_quantity, 0)
+
+        self.import_rows('sku,name,price,category,description,stock\nX1,New,3.5,Shampoo,Updated,4\n')
+        product.refresh_from_db()
+        self.assertEqual((product.description, product.stock_quantity, product.foto.name),
+                         ('Updated', 4, 'foto/1.png'))
+
+
+class BenchmarkCommandTests(TestCase):
+    """
+    Tikrina, kad benchmark komanda išmatuoja visus maršrutus (personalo
+    maršrutus - prisijungus personalo vartotoju) ir atšaukia savo pakeitimus.
+    """
+
+    def test_every_route(self):
+        user = User.objects.create_user('buyer', 'buyer@example.com', 'password123')
+        category = Category.objects.create(name='Shampoo')
+        for number in range(2):
+            Product.objects.create(name=f'Shampoo {number}', one_price=2, stock_quantity=10, categories=category)
+        out = StringIO()
+        call_command('benchmark', '--iterations', '1', '--cart-size', '2', '--username', user.username, stdout=out)
+        routes = json.loads(out.getvalue())['routes']
+        self.assertEqual(set(routes), {pattern.name for pattern in urls.urlpatterns})
+        self.assertEqual(routes['order_detail']['status'], 200)
+        self.assertFalse(Order.objects.exists())
+        for name in ('export_orders', 'sales_dashboard'):
+            self.assertIn('skipped', routes[name])
+
+        User.objects.create_user('staff', 'staff@example.com', 'password123', is_staff=True)
+        out = StringIO()
+        call_command('benchmark', '--iterations', '1', '--cart-size', '2', '--username', user.username, stdout=out)
+        report = json.loads(out.getvalue())
+        self.assertEqual(report['meta']['staff_user'], 'staff')
+        for name in ('export_orders', 'sales_dashboard'):
+            self.assertEqual(report['routes'][name]['status'], 200)
+        with self.assertRaises(CommandError):
+            call_command('benchmark', '--staff-username', user.username, stdout=StringIO())
+
+
+class ImportUsersTests(TestCase):
+    """
+    Tikrina, kad vartotojų importas sukuria vartotojus su profiliais ir
+    klientais, o pakartotinis paleidimas jų nedubliuoja.
+    """
+
+    def test_import_twice(self):
+        rows = ('{"username": "anna", "email": "anna@example.com", "password": "password123", "first_name": "Anna"}\n'
+                '{"username": "ben", "email": "anna@example.com", "password": "password123"}\n'
+                'not json\n')
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory, 'users.jsonl')
+            path.write_text(rows)
+            for _ in range(2):
+                call_command('import_users', str(path), '--plain-passwords', stdout=StringIO(), stderr=StringIO())
+        user = User.objects.get(username='anna')
+        self.assertEqual((user.client.first_name, User.objects.count()), ('Anna', 1))
+        self.assertTrue(user.check_password('password123'))
+        self.assertTrue(hasattr(user, 'profile'))
+
+
+class AssetTests(TestCase):
+    """
+    Tikrina įkeltų failų pateikimą: sąlyginius ir intervalų atsakus, iš
+    anksto suspaustus variantus ir Cache-Control antraštes.
+    """
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.root = Path(directory.name, 'media')
+        (self.root / 'foto').mkdir(parents=True)
+        self.data = bytes(range(256)) * 4
+        (self.root / 'foto' / 'file.txt').write_bytes(self.data)
+        settings = override_settings(MEDIA_ROOT=self.root, ESHOP_SENDFILE={
+            'BACKEND': None, 'MEDIA_LOCATION': '/protected/media/', 'STATIC_LOCATION': '/protected/static/'})
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def get(self, path='foto/file.txt', **headers):
+        response = self.client.get(f'/media/{path}', **headers)
+        body = b''.join(response.streaming_content) if response.streaming else response.content
+        return response, body
+
+    def test_full_and_not_modified(self):
+        response, body = self.get()
+        self.assertEqual((response.status_code, body), (200, self.data))
+        self.assertEqual(response['Cache-Control'], 'public, max-age=0, must-revalidate')
+        self.assertEqual(self.get(HTTP_IF_NONE_MATCH=response['ETag'])[0].status_code, 304)
+
+        (self.root / 'foto' / 'file.0123456789ab.txt').write_bytes(self.data)
+        response, _ = self.get('foto/file.0123456789ab.txt')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+
+    def test_ranges(self):
+        etag = self.get()[0]['ETag']
+        for header, status, expected in [
+            ('bytes=0-9', 206, self.data[:10]),
+            ('bytes=1000-', 206, self.data[1000:]),
+            ('bytes=-5', 206, self.data[-5:]),
+            ('bytes=1020-5000', 206, self.data[1020:]),
+            ('bytes=5-3', 200, self.data),
+            ('bytes=0-1,5-6', 200, self.data),
+            ('bytes=2000-', 416, b''),
+        ]:
+            with self.subTest(range=header):
+                response, body = self.get(HTTP_RANGE=header)
+                self.assertEqual((response.status_code, body), (status, expected))
+        self.assertEqual(self.get(HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE=etag)[0].status_code, 206)
+        response, body = self.get(HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"old"')
+        self.assertEqual((response.status_code, body), (200, self.data))
+
+    def test_precompressed(self):
+        (self.root / 'foto' / 'file.txt.gz').write_bytes(b'gzip')
+        (self.root / 'foto' / 'file.txt.br').write_bytes(b'brotli')
+        for header, expected in [
+            ('gzip, deflate, br', b'brotli'),
+            ('br;q=0, gzip', b'gzip'),
+            ('gzip;q=0', self.data),
+            ('identity', self.data),
+            ('*', b'brotli'),
+            ('*, br;q=0', b'gzip'),
+            ('', self.data),
+        ]:
+            with self.subTest(accept_encoding=header):
+                response, body = self.get(HTTP_ACCEPT_ENCODING=header)
+                self.assertEqual(body, expected)
+                self.assertEqual(response.has_header('Content-Encoding'), body != self.data)
+
+    def test_path_traversal(self):
+        (self.root.parent / 'secret.txt').write_text('secret')
+        for path in ['../secret.txt', 'foto/../../secret.txt', '..%2Fsecret.txt', 'foto/missing.txt', 'foto']:
+            with self.subTest(path=path):
+                self.assertEqual(self.client.get(f'/media/{path}').status_code, 404)
+
+
+@override_settings(IMAGE_DERIVATIVE_FORMATS=('webp',))
+class ImageDerivativeTests(TestCase):
+    """
+    Tikrina paveikslėlių kopijų eilę, jų pavadinimus pagal originalo
+    versiją ir {% picture %} žymą.
+    """
+
+    def setUp(self):
+        cache.clear()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings = override_settings(MEDIA_ROOT=directory.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.category = Category.objects.create(name='Shampoo')
+
+    def save_image(self, name, colour):
+        buffer = BytesIO()
+        Image.new('RGB', (400, 300), colour).save(buffer, 'PNG')
+        if default_storage.exists(name):
+            default_storage.delete(name)
+        return default_storage.save(name, ContentFile(buffer.getvalue()))
+
+    def picture(self, name):
+        return Template("{% load images %}{% picture name 'card' alt='Photo' %}").render(Context({'name': name}))
+
+    def test_queue_and_picture(self):
+        name = self.save_image('foto/photo.png', 'red')
+        Product.objects.create(name='Alpha', one_price=2, stock_quantity=3, categories=self.category, foto=name)
+        self.assertTrue(ImageDerivativeJob.objects.filter(name=name, status='Pending').exists())
+        self.assertIn('src="/media/foto/photo.png"', self.picture(name))
+
+        call_command('build_image_derivatives', '--queue', stdout=StringIO())
+        self.assertFalse(ImageDerivativeJob.objects.exists())
+        html = self.picture(name)
+        self.assertIn('<picture><source type="image/webp"', html)
+        url = re.search(r'src="(/media/derivatives/[^"]+)"', html).group(1)
+        self.assertRegex(url, r'/photo-card\.[0-9a-f]{12}\.webp$')
+        self.assertEqual(self.client.get(url)['Cache-Control'], 'public, max-age=31536000, immutable')
+
+    def test_replaced_image_gets_new_derivatives(self):
+        name = self.save_image('foto/photo.png', 'red')
+        schedule_derivatives(name)
+        build_queued_derivatives(10)
+        first = self.picture(name)
+
+        os.utime(default_storage.path(name), (1, 1))
+        self.assertEqual(self.save_image(name, 'blue'), name)
+        self.assertIsNone(derivatives_ready(name))
+        self.assertIn('src="/media/foto/photo.png"', self.picture(name))
+        schedule_derivatives(name)
+        build_queued_derivatives(10)
+        self.assertNotEqual(self.picture(name), first)
+        self.assertIn('<picture>', self.picture(name))
+
+    def test_failed_job_is_retried_then_failed(self):
+        schedule_derivatives('foto/missing.png')
+        self.assertEqual(build_queued_derivatives(10, max_attempts=2), (0, 1))
+        job = ImageDerivativeJob.objects.get()
+        self.assertEqual((job.status, job.attempts), ('Pending', 1))
+        self.assertGreater(job.next_attempt_date, timezone.now())
+        self.assertEqual(build_queued_derivatives(10, max_attempts=2), (0, 0))
+        ImageDerivativeJob.objects.update(next_attempt_date=timezone.now())
+        self.assertEqual(build_queued_derivatives(10, max_attempts=2), (0, 1))
+        self.assertEqual(ImageDerivativeJob.objects.get().status, 'Failed')
+
+
+class SeedCatalogueTests(TestCase):
+    """
+    Tikrina, kad tas pats --seed sugeneruoja tas pačias užsakymų ir
+    atsiliepimų datas, kad ir kada komanda paleista.
+    """
+
+    def seed(self, prefix):
+        call_command('seed_catalogue', '--categories', '2', '--products', '5', '--users', '3', '--orders', '10',
+                     '--order-items', '20', '--reviews', '10', '--prefix', prefix, stdout=StringIO())
+        orders = Order.objects.filter(clients__user__username__startswith=f'{prefix}_')
+        reviews = Review.objects.filter(clients__user__username__startswith=f'{prefix}_')
+        return (list(orders.order_by('id').values_list('created_date', flat=True)),
+                list(reviews.order_by('id').values_list('created_date', flat=True)))
+
+    def test_dates_are_deterministic(self):
+        orders, reviews = self.seed('first')
+        self.assertEqual(len(orders), 10)
+        self.assertTrue(all(date <= datetime(2024, 1, 1, tzinfo=dt_timezone.utc) for date in orders + reviews))
+        self.assertEqual(self.seed('second'), (orders, reviews))
+
+    def test_bad_now(self):
+        with self.assertRaises(CommandError):
+            call_command('seed_catalogue', '--now', '2024-02-30T00:00:00', stdout=StringIO())
+
+
+class AdminQueryBudgetTests(TestCase):
+    """
+    Tikrina, kad administratoriaus sąrašų užklausų skaičius nepriklauso nuo
+    rodomų eilučių skaičiaus.
+    """
+    QUERY_BUDGET = 6
+    CHANGELISTS = ['product', 'category', 'client', 'order', 'orderitem', 'review', 'profile',
+                   'outgoingemail', 'cart', 'stockreservation']
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password123')
+        category = Category.objects.create(name='Shampoo')
+        for number in range(10):
+            user = User.objects.create_user(f'buyer{number}', f'buyer{number}@example.com', 'password123')
+            product = Product.objects.create(name=f'Shampoo {number}', one_price=10 * number,
+                                             stock_quantity=number, categories=category)
+            order = Order.objects.create(clients=user.client)
+            OrderItem.objects.create(orders=order, products=product, quantity=1)
+            Review.objects.create(products=product, clients=user.client, rating=5,
+                                  comment='Great', created_date=timezone.now())
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def test_changelists(self):
+        for model in self.CHANGELISTS:
+            for query in ['', '?stock=low&price=10-50' if model == 'product' else '?q=1']:
+                with self.subTest(model=model, query=query):
+                    url = f'/admin/eshop/{model}/{query}'
+                    with self.assertNumQueriesAtMost(self.QUERY_BUDGET):
+                        response = self.client.get(url)
+                    self.assertEqual(response.status_code, 200)
+
+    @contextmanager
+    def assertNumQueriesAtMost(self, budget):
+        with capture_statements() as statements:
+            yield
+        self.assertLessEqual(len(statements), budget, '\n'.join(sql for sql, _ in statements))
+
+
+class ProductAdminActionTests(TestCase):
+    """
+    Tikrina masinius produktų veiksmus administravime: kainos keitimą
+    procentais, kiekio pridėjimą ir nustatymą bei netinkamų kiekių atmetimą.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password123')
+        category = Category.objects.create(name='Shampoo')
+        cls.products = [Product.objects.create(name=f'Shampoo {number}', one_price=10 * number,
+                                               stock_quantity=number, categories=category)
+                        for number in (1, 5)]
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def run_action(self, action, amount=None):
+        data = {'action': action, '_selected_action': [product.pk for product in self.products]}
+        if amount is not None:
+            data['amount'] = amount
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/admin/eshop/product/', data, follow=True)
+        self.assertEqual(response.status_code, 200)
+        return [str(message) for message in response.context['messages']]
+
+    def values(self, field):
+        return list(Product.objects.order_by('id').values_list(field, flat=True))
+
+    def test_change_price_by_percent(self):
+        version = catalogue_version()
+        self.assertEqual(self.run_action('change_price_by_percent', '12.5'), ['2 products updated.'])
+        self.assertEqual(self.values('one_price'), [11.25, 56.25])
+        self.assertNotEqual(catalogue_version(), version)
+
+        self.assertEqual(self.run_action('change_price_by_percent', '-100'),
+                         ['Price cannot be reduced by 100% or more.'])
+        self.assertEqual(self.run_action('change_price_by_percent'), ['Enter an amount for this action.'])
+        self.assertEqual(self.values('one_price'), [11.25, 56.25])
+
+    def test_add_stock(self):
+        self.assertEqual(self.run_action('add_stock', '4'), ['2 products updated.'])
+        self.assertEqual(self.values('stock_quantity'), [5, 9])
+        self.assertEqual(self.run_action('add_stock', '-6'), ['1 products updated.'])
+        self.assertEqual(self.values('stock_quantity'), [5, 3])
+
+    def test_set_stock(self):
+        self.assertEqual(self.run_action('set_stock', '7'), ['2 products updated.'])
+        self.assertEqual(self.values('stock_quantity'), [7, 7])
+        self.assertEqual(self.run_action('set_stock', '-1'), ['Stock quantity cannot be negative.'])
+        self.assertEqual(self.values('stock_quantity'), [7, 7])
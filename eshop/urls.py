@@ -1,18 +1,25 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import async_views, views
+
+catalogue = async_views if settings.ESHOP_ASYNC_VIEWS else views
 
 urlpatterns = [
     path('', views.main_page, name='home'),
-    path('products/', views.products, name='products'),
-    path('categories/', views.categories, name='categories'),
+    path('products/', catalogue.products, name='products'),
+    path('categories/', catalogue.categories, name='categories'),
     path('register/', views.register_user, name='register'),
-    path('product/<int:id>/', views.product_detail, name='product_detail'),
+    path('product/<int:id>/', catalogue.product_detail, name='product_detail'),
     path('profile/', views.get_user_profile, name='profile'),
-    path('search/', views.search, name='search'),
-    path('category/<int:category_id>/', views.category_products, name='category_products'),
+    path('search/', catalogue.search, name='search'),
+    path('category/<int:category_id>/', catalogue.category_products, name='category_products'),
     path('cart/', views.view_cart, name='cart'),
     path('add_to_cart/<int:product_id>/', views.add_to_cart, name='add_to_cart'),
     path('remove_from_cart/<int:product_id>/', views.remove_from_cart, name='remove_from_cart'),
     path('checkout/', views.checkout, name='checkout'),
     path('order_success/', views.order_success, name='order_success'),
+    path('orders/', views.order_history, name='order_history'),
+    path('orders/<int:order_id>/', views.order_detail, name='order_detail'),
+    path('export/orders/', views.export_orders, name='export_orders'),
+    path('dashboard/sales/', views.sales_dashboard, name='sales_dashboard'),
 ]
\ No newline at end of file
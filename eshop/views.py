@@ -1,17 +1,36 @@
-from django.core.mail import send_mail
-from django.conf import settings
+from datetime import timedelta
+
 from django.shortcuts import render, get_object_or_404, redirect
+from django.http import HttpResponseBadRequest, StreamingHttpResponse
 from django.contrib import messages
-from django.db.models import Q
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from django.db.models import F, Q, Count, OuterRef, Subquery
 from django.core.paginator import Paginator
 from django.views.decorators.csrf import csrf_protect
 from django.contrib.auth.decorators import login_required
+from django.contrib.admin.views.decorators import staff_member_required
 
-from .models import Product, Category, User, Order, OrderItem
+from .models import Product, Category, User, Order, OrderItem, Review
 from .utils import check_password
+from .outbox import queue_email
+from .cache import cache_catalogue_page, bump_catalogue_version
+from .conditional import catalogue_condition, category_products_condition, product_detail_condition
+from .search import search_products
+from .pagination import paginate_catalogue, cursor_paginate
+from .reservations import held_by_others
+from .cart import CartError, get_cart, apply_cart_operations, cart_lines, cart_total
+from .exports import EXPORT_FORMATS, order_export_filters, iter_order_rows
+from .analytics import sales_report
 from .forms import ProfileUpdateForm, UserUpdateForm, ClientUpdateForm
 
 
+PRODUCT_SORTS = {
+    'rating': ('-rating_average', 'id'),
+}
+
+
 def main_page(request):
     """
     Pagrindinio puslapio rodymas.
@@ -20,52 +39,72 @@ def main_page(request):
 
 
 @login_required
+@catalogue_condition
+@cache_catalogue_page
 def products(request):
     """
     Rodomi visi produktai su puslapiavimu.
     Funkcija ištraukia visus produktus iš duomenų bazės, apdoroja juos
     puslapiavimui ir perduoda į šabloną, kad vartotojas galėtų matyti tik
-    nustatytą dalį produktų vienu metu(8 vnt. per puslapį).
+    nustatytą dalį produktų vienu metu(8 vnt. per puslapį). Puslapiavimo
+    būdas parenkamas CATALOGUE_PAGINATION nustatymu. Su ?sort=rating
+    produktai rikiuojami pagal produkte saugomą vertinimų vidurkį.
     """
-    all_products = Product.objects.all()
-    paginator = Paginator(all_products, 8)
-    page_number = request.GET.get('page')
-    paged_products = paginator.get_page(page_number)
+    sort = request.GET.get('sort')
+    paged_products = paginate_catalogue(request, Product.objects.all(), 8, PRODUCT_SORTS.get(sort, ('id',)))
 
-    context = {'products': paged_products}
+    context = {'products': paged_products, 'sort': sort if sort in PRODUCT_SORTS else None}
     return render(request, 'products.html', context)
 
 
 @login_required
+@category_products_condition
+@cache_catalogue_page
 def category_products(request, category_id):
     """
     Funkcija gauna produktus pagal kategorijos ID ir atvaizduoja juos
-    kategorijos puslapyje.
+    kategorijos puslapyje po 8 vnt. per puslapį.
     """
     category = get_object_or_404(Category, id=category_id)
-    products = Product.objects.filter(categories=category)
+    products = paginate_catalogue(request, Product.objects.filter(categories=category), 8)
     return render(request, 'category_products.html', {'category': category, 'products': products})
 
 
 @login_required
+@cache_catalogue_page
 def categories(request):
     """
     Funkcija ištraukia visų kategorijų sąrašą ir perduoda į šabloną,
-    kad vartotojas galėtų matyti visas kategorijas.
+    kad vartotojas galėtų matyti visas kategorijas. Produktų skaičius,
+    turimų sandėlyje produktų skaičius ir paveikslėlis gaunami ta pačia
+    užklausa.
     """
-    categories = Category.objects.all()
+    cover = (Product.objects.filter(categories=OuterRef('pk'))
+             .exclude(foto='').exclude(foto__isnull=True)
+             .order_by('id').values('foto')[:1])
+    categories = (Category.objects
+                  .annotate(product_count=Count('products'),
+                            in_stock_count=Count('products', filter=Q(products__stock_quantity__gt=0)),
+                            product_foto=Subquery(cover))
+                  .order_by('name', 'id'))
     context = {'categories': categories}
     return render(request, 'categories.html', context)
 
 
 @login_required
+@product_detail_condition
 def product_detail(request, id):
     """
     Funkcija gauna konkretų produktą pagal jo ID ir atvaizduoja jo detales
-    aprašytas šablone.
+    aprašytas šablone. Vertinimų vidurkis ir skaičius saugomi produkte, o
+    atsiliepimai rodomi nuo naujausio po 5 vnt. per puslapį.
     """
-    product = get_object_or_404(Product, id=id)
-    context = {'product': product}
+    product = get_object_or_404(Product.objects.select_related('categories'), id=id)
+    reviews = (Review.objects.filter(products=product)
+               .select_related('clients__user')
+               .order_by('-created_date', '-id'))
+    paged_reviews = Paginator(reviews, 5).get_page(request.GET.get('reviews_page'))
+    context = {'product': product, 'reviews': paged_reviews}
     return render(request, 'product_detail.html', context)
 
 
@@ -73,12 +112,15 @@ def product_detail(request, id):
 def search(request):
     """
     Funkcija gauna vartotoja įvestą paieškos užklausą ir ieško produktų
-    pagal pavadinimą.
+    pagal pavadinimą ir aprašymą. Rezultatai surikiuojami pagal atitikimą
+    ir puslapiuojami po 8 vnt.
     """
-    query = request.GET.get('search_text')
-    search_results = Product.objects.filter(
-        Q(name__icontains=query))
-    context = {'query': query, 'products': search_results}
+    query = request.GET.get('search_text', '').strip()
+    paginator = Paginator(search_products(query), 8)
+    page_number = request.GET.get('page')
+    paged_products = paginator.get_page(page_number)
+
+    context = {'query': query, 'products': paged_products}
     return render(request, 'products.html', context)
 
 
@@ -107,11 +149,13 @@ def register_user(request):
             messages.error(request, 'Passwords do not match')
             return redirect('register')
 
-        if User.objects.filter(username=username).exists():
+        taken = list(User.objects.filter(Q(username=username) | Q(email=email))
+                     .values_list('username', flat=True)[:2])
+        if username in taken:
             messages.error(request, f'Username {username} is already taken')
             return redirect('register')
 
-        if User.objects.filter(email=email).exists():
+        if taken:
             messages.error(request, f'Email {email} is already taken')
             return redirect('register')
 
@@ -154,68 +198,119 @@ def get_user_profile(request):
     return render(request, 'profile.html', context=context)
 
 
-@login_required
 def add_to_cart(request, product_id):
     """
     Funkcija leidžia vartotojui pridėti prekę į krepšelį. Jei prekė jau yra,
     jos kiekis padidėja. Jei prekės nėra, ji pridedama su 1 vnt. Taip pat
     jei saugomas prekių kiekis nepakankamas gauname pranešimą.
     """
-    cart = request.session.get('cart', {})
-    product = Product.objects.get(id=product_id)
-
-    if product.stock_quantity <= 0:
-        messages.error(request, f"Sorry, {product.name} is out of stock.")
+    try:
+        [(product, quantity)] = apply_cart_operations(get_cart(request, create=True),
+                                                      [{'product_id': product_id, 'quantity': 1}])
+    except CartError as error:
+        for message in error.messages:
+            messages.error(request, message)
         return redirect('products')
 
-    if str(product_id) in cart:
-        if cart[str(product_id)]['quantity'] < product.stock_quantity:
-            cart[str(product_id)]['quantity'] += 1
-            messages.success(request, f"Added another {product.name} to your cart.")
-        else:
-            messages.error(request, f"Sorry, you can't add more of {product.name}. "
-                                    f"Only {product.stock_quantity} is available.")
+    if quantity > 1:
+        messages.success(request, f"Added another {product.name} to your cart.")
     else:
-        if product.stock_quantity > 0:
-            cart[str(product_id)] = {
-                'name': product.name,
-                'price': product.one_price,
-                'quantity': 1,
-                'image': product.foto.url if product.foto else None
-            }
-            messages.success(request, f"Added {product.name} to your cart.")
-        else:
-            messages.error(request, f"Sorry, {product.name} is out of stock.")
-    request.session['cart'] = cart
+        messages.success(request, f"Added {product.name} to your cart.")
     return redirect('products')
 
 
-@login_required
 def remove_from_cart(request, product_id):
     """
     Funkcija leidžia vartotojui pašalinti prekę iš krepšelio pagal prekei
     skirtą ID. Jei prekė randama krepšelyje, ji bus pašalinama ir krepšelis
     atnaujinamas.
     """
-    cart = request.session.get('cart', {})
-    if str(product_id) in cart:
-        del cart[str(product_id)]
-        request.session['cart'] = cart
+    cart = get_cart(request)
+    try:
+        removed = cart and apply_cart_operations(cart, [{'product_id': product_id, 'quantity': 0, 'op': 'set'}])
+    except CartError:
+        removed = None
+    if removed and removed[0][0].in_cart:
         messages.success(request, "Product has been removed from cart.")
     else:
         messages.error(request, "Cannot find product in the cart.")
     return redirect('cart')
 
 
-@login_required
 def view_cart(request):
     """
     Funkcija leidžia vartotojui peržiūrėti prekes, esančias jo krepšelyje
     ir rodyti bendrą krepšelio vertę (visų prekių kainų suma pagal kiekį).
+    Sumos skaičiuojamos duomenų bazėje pagal dabartines prekių kainas.
     """
-    cart = request.session.get('cart', {})
-    total_price = sum(item['price'] * item['quantity'] for item in cart.values())
-    return render(request, 'cart.html', {'cart': cart, 'total_price': total_price})
+    cart = get_cart(request)
+    context = {'cart_items': cart_lines(cart), 'total_price': cart_total(cart)}
+    return render(request, 'cart.html', context)
+
+
+class OutOfStock(Exception):
+    """
+    Klaida, kai bent vienos krepšelio prekės sandėlyje nepakanka.
+    Saugo pranešimus kiekvienai netinkamai krepšelio eilutei.
+    """
+    def __init__(self, messages):
+        super().__init__(messages)
+        self.messages = messages
+
+
+def release_order_stock(order):
+    """
+    Funkcija grąžina į sandėlį neužbaigto užsakymo prekių kiekius ir
+    ištrina užsakymo eilutes, kad užsakymą būtų galima užpildyti iš naujo.
+    """
+    order_items = OrderItem.objects.filter(orders=order)
+    for product_id, quantity in order_items.values_list('products_id', 'quantity'):
+        Product.objects.filter(pk=product_id).update(
+            stock_quantity=F('stock_quantity') + quantity,
+            updated_date=timezone.now(),
+        )
+    order_items.delete()
+    transaction.on_commit(bump_catalogue_version)
+
+
+def reserve_stock(lines, cart):
+    """
+    Funkcija sumažina prekių kiekį sandėlyje pagal krepšelio eilutes
+    ({produkto ID: kiekis}). Kiekis mažinamas sąlyginiu UPDATE, kuris
+    įskaito kitų krepšelių galiojančias rezervacijas, todėl du pirkėjai
+    negali nupirkti to paties paskutinio vieneto. Jei bent vienos
+    prekės nepakanka, iškeliama OutOfStock klaida su pranešimu kiekvienai
+    eilutei, o transakcija atšaukiama. Jei kuri nors prekė išparduodama,
+    po transakcijos pakeičiama katalogo versija. Grąžina {ID: produktas}
+    žodyną, iš kurio imamos užsakymo eilučių kainos.
+    """
+    products = (Product.objects
+                .annotate(available_stock=F('stock_quantity') - held_by_others(cart))
+                .in_bulk(lines.keys()))
+    errors = []
+    sold_out = False
+    for product_id in sorted(lines):
+        quantity = lines[product_id]
+        product = products.get(product_id)
+        if product is None:
+            errors.append("A product in your cart is no longer available.")
+            continue
+        updated = Product.objects.filter(
+            pk=product_id,
+            stock_quantity__gte=held_by_others(cart) + quantity,
+        ).update(
+            stock_quantity=F('stock_quantity') - quantity,
+            updated_date=timezone.now(),
+        )
+        if not updated:
+            errors.append(f"Sorry, only {max(product.available_stock, 0)} of {product.name} "
+                          f"is available, but your cart has {quantity}.")
+        sold_out = sold_out or product.stock_quantity <= quantity
+    if errors:
+        raise OutOfStock(errors)
+    if sold_out:
+        transaction.on_commit(bump_catalogue_version)
+    return products
 
 
 @login_required
@@ -223,43 +318,52 @@ def checkout(request):
     """
     Funkcija apdoroja užsakymą ir apmokėjimo procesą(dalinai). Jei krepšelis
     yra tuščias, vartotojui pateikiama klaidos žinutė. Jei užsakymas dar nėra
-    sukurtas, sukuriamas naujas užsakymas su "Pending" būsena. Po sėkmingo
-    užsakymo sukūrimo ištrinamas krepšelis iš sesijos ir išsiunčiama
-    patvirtinimo žinutė el. paštu.
+    sukurtas, sukuriamas naujas užsakymas su "Pending" būsena. Užsakymo eilutės
+    ir sandėlio kiekiai atnaujinami vienoje transakcijoje - jei bent vienos
+    prekės nepakanka, atmetamas visas užsakymas. Po sėkmingo
+    užsakymo sukūrimo išvalomas krepšelis ir jo rezervacijos, o patvirtinimo žinutė
+    el. paštu įrašoma į siuntimo eilę. Eilutėse išsaugoma pirkimo kaina,
+    o užsakyme - prekių skaičius ir suma.
     """
     client = request.user.client
-    order = Order.objects.filter(clients=client, status='Pending').first()
-    cart = request.session.get('cart', {})
+    cart = get_cart(request)
+    lines = dict(cart.items.values_list('products_id', 'quantity')) if cart else {}
 
-    if not cart:
+    if not lines:
         messages.error(request, "Your cart is empty. Please add items to your cart before proceeding to checkout.")
         return redirect('cart')
 
-    if not order:
-        order = Order.objects.create(
-            clients=client,
-            status='Pending'
-        )
-    order_items = OrderItem.objects.filter(orders=order)
-    order_items.delete()
-
-    for item in cart.values():
-        product = Product.objects.get(name=item['name'])
-        OrderItem.objects.create(
-            orders=order,
-            products=product,
-            quantity=item['quantity']
-        )
+    try:
+        with transaction.atomic():
+            order = Order.objects.filter(clients=client, status='Pending').first()
+            if order:
+                release_order_stock(order)
+            else:
+                order = Order.objects.create(
+                    clients=client,
+                    status='Pending'
+                )
+            products = reserve_stock(lines, cart)
+            order_items = OrderItem.objects.bulk_create([
+                OrderItem(orders=order, products_id=product_id, quantity=quantity,
+                          unit_price=products[product_id].one_price)
+                for product_id, quantity in lines.items()
+            ])
+            order.item_count = sum(item.quantity for item in order_items)
+            order.total = round(sum(item.quantity * item.unit_price for item in order_items), 2)
+            order.save(update_fields=['item_count', 'total'])
+            queue_email(
+                'Your Order Confirmation',
+                'Thank you for your order: The payment instructions are HERE.',
+                [request.user.email],
+            )
+            cart.items.all().delete()
+            cart.reservations.all().delete()
+    except OutOfStock as error:
+        for message in error.messages:
+            messages.error(request, message)
+        return redirect('cart')
 
-    send_mail(
-        'Your Order Confirmation',
-        f'Thank you for your order: The payment instructions are HERE.',
-        settings.DEFAULT_FROM_EMAIL,
-        [request.user.email],
-        fail_silently=False,
-    )
-    if 'cart' in request.session:
-        del request.session['cart']
     return redirect('order_success')
 
 
@@ -269,3 +373,76 @@ def order_success(request):
     Funkcija atvaizduoja užsakymo sėkmės pusalpį, kai užsakymas yra užbaigtas
     """
     return render(request, 'order_success.html')
+
+
+@staff_member_required
+def export_orders(request):
+    """
+    Funkcija personalui srautu grąžina užsakymų eilučių eksportą CSV arba
+    JSONL formatu. Galima filtruoti pagal datą (date_from, date_to) ir
+    būseną (status). Eilutės siunčiamos klientui jas skaitant iš duomenų
+    bazės, todėl visas eksportas atmintyje nelaikomas.
+    """
+    file_format = request.GET.get('format', 'csv')
+    if file_format not in EXPORT_FORMATS:
+        return HttpResponseBadRequest(f'Unknown format: {file_format}')
+    try:
+        filters = order_export_filters(request.GET.get('date_from'), request.GET.get('date_to'),
+                                       request.GET.get('status'))
+    except ValueError as error:
+        return HttpResponseBadRequest(str(error))
+
+    renderer, content_type = EXPORT_FORMATS[file_format]
+    response = StreamingHttpResponse(renderer(iter_order_rows(filters)), content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="orders.{file_format}"'
+    return response
+
+
+@login_required
+def order_history(request):
+    """
+    Funkcija rodo prisijungusio vartotojo užsakymus nuo naujausio po 10 vnt.
+    per puslapį. Prekių skaičius ir suma saugomi užsakyme, todėl puslapiui
+    pakanka vienos užklausos.
+    """
+    orders = Order.objects.filter(clients__user=request.user)
+    paged_orders = cursor_paginate(orders, request.GET.get('cursor'), 10, ordering=('-id',))
+    return render(request, 'orders.html', {'orders': paged_orders})
+
+
+@login_required
+def order_detail(request, order_id):
+    """
+    Funkcija rodo vieno vartotojo užsakymo eilutes su pirkimo metu
+    išsaugotomis kainomis.
+    """
+    order = get_object_or_404(Order, id=order_id, clients__user=request.user)
+    order_items = (OrderItem.objects.filter(orders=order)
+                   .select_related('products')
+                   .annotate(line_total=F('quantity') * F('unit_price'))
+                   .order_by('id'))
+    return render(request, 'order_detail.html', {'order': order, 'order_items': order_items})
+
+
+@staff_member_required
+def sales_dashboard(request):
+    """
+    Funkcija personalui rodo pardavimų ataskaitą pasirinktam laikotarpiui
+    (numatyta - paskutinės 7 dienos): pardavimus kiekvieną dieną ir
+    populiariausias prekes bei kategorijas. Duomenys skaitomi tik iš
+    dienos suvestinių, todėl užsakymų istorijos dydis įtakos neturi.
+    """
+    today = timezone.localdate()
+    date_from = request.GET.get('date_from') or (today - timedelta(days=6)).isoformat()
+    date_to = request.GET.get('date_to') or today.isoformat()
+    try:
+        dates = parse_date(date_from), parse_date(date_to)
+    except ValueError:
+        dates = None, None
+    if None in dates:
+        return HttpResponseBadRequest('Dates must be in YYYY-MM-DD format.')
+
+    context = {'date_from': dates[0], 'date_to': dates[1], **sales_report(*dates)}
+    context['total_units'] = sum(day['units'] for day in context['days'])
+    context['total_revenue'] = sum(day['revenue'] for day in context['days'])
+    return render(request, 'sales_dashboard.html', context)
@@ -12,5 +12,8 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mainproject.settings')
+# Persistent connections are not safe under ASGI; set ESHOP_ASYNC_VIEWS=1 to
+# serve the catalogue with the async views.
+os.environ.setdefault('ESHOP_CONN_MAX_AGE', '0')
 
 application = get_asgi_application()
@@ -12,7 +12,6 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 
 from pathlib import Path
 import os
-from .secret import SECRET_KEY, EMAIL, EMAIL_PASSWORD, HOST
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -25,6 +24,13 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = True
 
+# SECURITY WARNING: keep the secret key used in production secret!
+# Secrets come from the environment; the fallback key is for local development only.
+SECRET_KEY = os.environ.get('DJANGO_SECRET_KEY') or ('django-insecure-local-development-key' if DEBUG else '')
+EMAIL = os.environ.get('ESHOP_EMAIL', 'shop@example.com')
+EMAIL_PASSWORD = os.environ.get('ESHOP_EMAIL_PASSWORD', '')
+HOST = os.environ.get('ESHOP_EMAIL_HOST', 'localhost')
+
 ALLOWED_HOSTS = []
 
 
@@ -33,6 +39,7 @@ ALLOWED_HOSTS = []
 INSTALLED_APPS = [
     'eshop',
     'tinymce',
+    'rest_framework',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -43,6 +50,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'eshop.middleware.QueryInstrumentationMiddleware',
+    'eshop.middleware.ReplicaPinningMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -64,6 +73,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'eshop.context_processors.cart',
             ],
         },
     },
@@ -75,13 +85,94 @@ WSGI_APPLICATION = 'mainproject.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
+# "timeout" is how long (seconds) SQLite waits for a lock before raising
+# "database is locked". Connections are kept open for CONN_MAX_AGE seconds
+# instead of being opened for every request; asgi.py sets it to 0, because
+# persistent connections must be disabled under ASGI.
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            'timeout': 20,
+        },
+        'CONN_MAX_AGE': int(os.environ.get('ESHOP_CONN_MAX_AGE', 600)),
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+# PRAGMAs applied to every new SQLite connection (eshop.signals). WAL lets
+# readers work while a checkout writes; synchronous=NORMAL is safe in WAL
+# mode and avoids an fsync per transaction. WAL is stored in the database
+# file itself, so it is only enabled with ESHOP_SQLITE_WAL=1 and the
+# db.sqlite3 shipped with the repository is left unchanged.
+SQLITE_PRAGMAS = {
+    'temp_store': 'MEMORY',
+}
+if os.environ.get('ESHOP_SQLITE_WAL') == '1':
+    SQLITE_PRAGMAS.update({'journal_mode': 'WAL', 'synchronous': 'NORMAL'})
+
+# Read replicas for catalogue reads (eshop.routers.ReplicaRouter), given as
+# a comma separated list of SQLite files, e.g. a second local copy of
+# db.sqlite3. Carts, orders and auth always use the primary database.
+DATABASE_REPLICAS = []
+for number, name in enumerate(filter(None, os.environ.get('ESHOP_DB_REPLICAS', '').split(',')), start=1):
+    DATABASES[f'replica{number}'] = dict(DATABASES['default'], NAME=name.strip(), TEST={'MIRROR': 'default'})
+    DATABASE_REPLICAS.append(f'replica{number}')
+
+DATABASE_ROUTERS = ['eshop.routers.ReplicaRouter']
+
+# After a request that writes, the client keeps reading from the primary for
+# this many seconds (cookie), so replica lag does not hide its own changes.
+# Catalogue pages cached during this time after a change are not reused
+# once it has passed (eshop.cache.catalogue_version).
+REPLICA_PIN_SECONDS = 5
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# The catalogue page cache relies on a version counter stored here, so
+# deployments with several worker processes need a shared backend
+# (Redis, Memcached, database) instead of the per-process local memory.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+CATALOGUE_CACHE_TIMEOUT = 60 * 60
+
+# 'offset' - numbered pages, 'cursor' - keyset pagination without COUNT(*).
+CATALOGUE_PAGINATION = 'offset'
+
+# Serve the catalogue pages (products, categories, product and search pages)
+# with the async views in eshop.async_views. Meant for ASGI servers; under
+# WSGI every async view would be run through async_to_sync. Off by default:
+# with the Django 4.2 async ORM they benchmark slower than the sync views.
+ESHOP_ASYNC_VIEWS = os.environ.get('ESHOP_ASYNC_VIEWS') == '1'
+
+# JSON API under /api/v1/ (eshop.api). Only the JSON renderer is enabled,
+# the browsable API renders forms for every request.
+REST_FRAMEWORK = {
+    'DEFAULT_AUTHENTICATION_CLASSES': [
+        'rest_framework.authentication.SessionAuthentication',
+    ],
+    'DEFAULT_PERMISSION_CLASSES': [
+        'rest_framework.permissions.IsAuthenticated',
+    ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'rest_framework.renderers.JSONRenderer',
+    ],
+    'DEFAULT_PAGINATION_CLASS': 'eshop.pagination.ApiCursorPagination',
+    'PAGE_SIZE': 50,
+}
+API_MAX_PAGE_SIZE = 500
+
+# Seconds a cart line holds stock for its cart. Expired holds are removed
+# by `manage.py release_expired_reservations`.
+CART_RESERVATION_TTL = 15 * 60
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -119,9 +210,49 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# Production asset mode (ESHOP_STATIC_MANIFEST=1): `manage.py collectstatic`
+# copies static files to STATIC_ROOT under content-hashed names with .gz
+# (and .br when the brotli package is installed) variants next to them.
+ESHOP_STATIC_MANIFEST = os.environ.get('ESHOP_STATIC_MANIFEST') == '1'
+STATIC_ROOT = Path(BASE_DIR, 'staticfiles')
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': ('eshop.storage.CompressedManifestStaticFilesStorage' if ESHOP_STATIC_MANIFEST
+                    else 'django.contrib.staticfiles.storage.StaticFilesStorage'),
+    },
+}
+
 MEDIA_ROOT = Path(BASE_DIR, 'eshop/media')
 MEDIA_URL = '/media/'
 
+# Resized copies of uploaded product, category and profile photos
+# (longest side in pixels). Saving a photo queues a job that
+# `manage.py build_image_derivatives --queue --loop` builds; failed jobs
+# are retried with the outbox back-off (OUTBOX_RETRY_DELAY).
+IMAGE_DERIVATIVE_DIR = 'derivatives'
+IMAGE_DERIVATIVE_SIZES = {
+    'avatar': 150,
+    'card': 320,
+    'detail': 800,
+}
+IMAGE_DERIVATIVE_FORMATS = ('avif', 'webp')
+IMAGE_DERIVATIVE_QUALITY = 75
+IMAGE_DERIVATIVE_MAX_ATTEMPTS = 5
+# A claimed job is not picked up by another builder for this many seconds.
+IMAGE_DERIVATIVE_CLAIM_TIMEOUT = 300
+
+# Static and media files are served by eshop.assets. Set ESHOP_SENDFILE to
+# 'x-accel-redirect' (nginx) or 'x-sendfile' (Apache, lighttpd) to let the
+# front server send the file; the locations are nginx internal locations.
+ESHOP_SENDFILE = {
+    'BACKEND': os.environ.get('ESHOP_SENDFILE') or None,
+    'MEDIA_LOCATION': '/protected/media/',
+    'STATIC_LOCATION': '/protected/static/',
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
@@ -138,6 +269,14 @@ EMAIL_HOST_USER = EMAIL
 EMAIL_HOST_PASSWORD = EMAIL_PASSWORD
 DEFAULT_FROM_EMAIL = EMAIL
 
+# Outgoing emails are queued in the outbox and sent by `manage.py send_outbox`.
+OUTBOX_BATCH_SIZE = 50
+OUTBOX_MAX_ATTEMPTS = 5
+OUTBOX_RETRY_DELAY = 60
+OUTBOX_MAX_RETRY_DELAY = 3600
+# A claimed email is not picked up by another sender for this many seconds.
+OUTBOX_CLAIM_TIMEOUT = 300
+
 TINYMCE_DEFAULT_CONFIG = {
     'height': 360,
     'width': 1120,
@@ -167,3 +306,32 @@ TINYMCE_DEFAULT_CONFIG = {
 }
 
 CRISPY_TEMPLATE_PACK = 'bootstrap4'
+
+# Per-request SQL instrumentation (eshop.middleware.QueryInstrumentationMiddleware).
+# Adds a Server-Timing header and logs slow requests and repeated (N+1)
+# queries to the "eshop.performance" logger.
+ESHOP_INSTRUMENTATION = {
+    'ENABLED': os.environ.get('ESHOP_INSTRUMENTATION') == '1',
+    'SLOW_REQUEST_MS': 500,
+    'SLOW_QUERY_COUNT': 50,
+    'DUPLICATE_QUERY_THRESHOLD': 5,
+    'TOP_QUERIES': 5,
+    'SERVER_TIMING': True,
+}
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'eshop.performance': {
+            'handlers': ['console'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+    },
+}
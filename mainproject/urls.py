@@ -17,17 +17,20 @@ Including another URLconf
 
 
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, re_path, include
 from django.conf import settings
-from django.conf.urls.static import static
 from django.views.generic import RedirectView
 
+from eshop.assets import serve_media, serve_static
+
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('eshop/', include('eshop.urls')),
+    path('api/v1/', include('eshop.api_urls')),
     path('', RedirectView.as_view(url='eshop/', permanent=True)),
     path('accounts/', include('django.contrib.auth.urls')),
     path('tinymce/', include('tinymce.urls')),
-] + static(settings.STATIC_URL, document_root=settings.STATIC_ROOT) \
-  + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+    re_path(r'^%s(?P<path>.+)$' % settings.STATIC_URL.lstrip('/'), serve_static, name='static'),
+    re_path(r'^%s(?P<path>.+)$' % settings.MEDIA_URL.lstrip('/'), serve_media, name='media'),
+]